@@ -1,21 +1,43 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any
+import functools
 import logging
+from monitoring.tracing import get_tracer
 
 logger = logging.getLogger(__name__)
 
+def _traced_process(process):
+    @functools.wraps(process)
+    async def wrapper(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self.span("process"):
+            return await process(self, data)
+    return wrapper
+
 class BaseAgent(ABC):
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
-    
+        self.tracer = get_tracer()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every agent's process() is timed without touching its body
+        if 'process' in cls.__dict__:
+            cls.process = _traced_process(cls.__dict__['process'])
+
     @abstractmethod
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Process the input data and return results"""
         pass
-    
+
+    def span(self, name: str, **args):
+        """Time a sub-step: ``with self.span("llm_call"): ...``"""
+        return self.tracer.span(self.__class__.__name__, name, **args)
+
     async def log_processing(self, input_data: Dict[str, Any], result: Dict[str, Any]):
-        """Log processing details"""
+        """Log processing details for a sample of emails (all failures)"""
+        if result.get('status') == 'success' and not self.tracer.should_log():
+            return
         self.logger.info(
             f"Processing completed - Input: {input_data.get('id', 'N/A')} "
             f"Result: {result.get('status', 'unknown')}"
-        ) 
\ No newline at end of file
+        )
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from monitoring.metrics import calendar_requests
+
+logger = logging.getLogger(__name__)
+
+Interval = Tuple[datetime, datetime]
+
+
+def to_utc(value: str) -> datetime:
+    """Naive UTC datetime from an RFC 3339 timestamp or an all-day ``YYYY-MM-DD`` date"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def rfc3339(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat() + 'Z'
+
+
+def find_free_slots(
+    day: datetime,
+    busy_times: List[Interval],
+    duration: int,
+    start_hour: int = 9,
+    end_hour: int = 17,
+    step_minutes: int = 30
+) -> List[datetime]:
+    """Start times within working hours on ``day`` that overlap no busy interval"""
+    length = timedelta(minutes=duration)
+    slot = day.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+    day_end = day.replace(hour=end_hour, minute=0, second=0, microsecond=0)
+    slots = []
+    while slot + length <= day_end:
+        if all(slot + length <= start or slot >= end for start, end in busy_times):
+            slots.append(slot)
+        slot += timedelta(minutes=step_minutes)
+    return slots
+
+
+class CalendarAvailability:
+    """Busy intervals of one calendar over any date range, in one round-trip at most.
+
+    With ``use_cache`` the calendar's events are mirrored locally: the first
+    call does a full sync, later ones send only the stored sync token and
+    apply the changes (no call at all within ``sync_interval`` seconds), and
+    an expired token (HTTP 410) falls back to a full sync. Events that ended
+    more than ``lookback_days`` ago are dropped on every sync. Without the cache
+    each lookup is a single free/busy query spanning the whole range. API
+    calls are blocking, so they run in a thread executor.
+    """
+
+    def __init__(
+        self,
+        calendar_service: Any,
+        calendar_id: str = 'primary',
+        use_cache: bool = True,
+        sync_interval: float = 60.0,
+        lookback_days: int = 1,
+        page_size: int = 2500
+    ):
+        self.service = calendar_service
+        self.calendar_id = calendar_id
+        self.use_cache = use_cache
+        self.sync_interval = sync_interval
+        self.lookback_days = lookback_days
+        self.page_size = page_size
+
+        self._events: Dict[str, Interval] = {}
+        self._sync_token: Optional[str] = None
+        self._synced_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_settings(cls, calendar_service: Any) -> 'CalendarAvailability':
+        return cls(
+            calendar_service,
+            calendar_id=settings.CALENDAR_ID,
+            use_cache=settings.CALENDAR_CACHE_ENABLED,
+            sync_interval=settings.CALENDAR_SYNC_INTERVAL_SECONDS
+        )
+
+    async def busy(self, time_min: datetime, time_max: datetime) -> List[Interval]:
+        """Sorted busy intervals overlapping [time_min, time_max), as naive UTC datetimes"""
+        loop = asyncio.get_running_loop()
+        if not self.use_cache:
+            return await loop.run_in_executor(None, self._query_free_busy, time_min, time_max)
+
+        await self.refresh()
+        return sorted(
+            (start, end) for start, end in self._events.values()
+            if start < time_max and end > time_min
+        )
+
+    async def refresh(self, force: bool = False):
+        """Apply calendar changes since the last sync, unless it was under ``sync_interval`` ago"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not force and self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            await asyncio.get_running_loop().run_in_executor(None, self._sync)
+            self._synced_at = time.monotonic()
+
+    def _sync(self):
+        # Changes go into a copy that replaces the mirror at the end, so readers never see half a sync
+        time_min = datetime.now(timezone.utc) - timedelta(days=self.lookback_days)
+        events = None
+        if self._sync_token is not None:
+            try:
+                events = self._sync_pages(dict(self._events), 'incremental_sync', syncToken=self._sync_token)
+            except Exception as e:
+                if getattr(getattr(e, 'resp', None), 'status', None) != 410:
+                    raise
+                logger.info(f"Calendar sync token for {self.calendar_id} expired, running a full sync")
+        if events is None:
+            events = self._sync_pages({}, 'full_sync', timeMin=rfc3339(time_min))
+        # Incremental syncs never drop past events, so the mirror would grow for as long as it runs
+        cutoff = time_min.replace(tzinfo=None)
+        self._events = {event_id: interval for event_id, interval in events.items() if interval[1] >= cutoff}
+
+    def _sync_pages(self, events: Dict[str, Interval], kind: str, **query) -> Dict[str, Interval]:
+        page_token = None
+        while True:
+            calendar_requests.labels(kind=kind).inc()
+            response = self.service.events().list(
+                calendarId=self.calendar_id,
+                singleEvents=True,
+                maxResults=self.page_size,
+                pageToken=page_token,
+                **query
+            ).execute()
+            for event in response.get('items', []):
+                self._apply(events, event)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                self._sync_token = response.get('nextSyncToken', self._sync_token)
+                return events
+
+    def _apply(self, events: Dict[str, Interval], event: Dict[str, Any]):
+        # Cancelled events arrive as tombstones; free ("transparent") events never block a slot
+        if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+            events.pop(event['id'], None)
+            return
+        start, end = event['start'], event['end']
+        events[event['id']] = (
+            to_utc(start.get('dateTime', start.get('date'))),
+            to_utc(end.get('dateTime', end.get('date')))
+        )
+
+    def _query_free_busy(self, time_min: datetime, time_max: datetime) -> List[Interval]:
+        calendar_requests.labels(kind='freebusy').inc()
+        response = self.service.freebusy().query(body={
+            'timeMin': rfc3339(time_min),
+            'timeMax': rfc3339(time_max),
+            'items': [{'id': self.calendar_id}]
+        }).execute()
+        periods = response.get('calendars', {}).get(self.calendar_id, {}).get('busy', [])
+        return sorted((to_utc(period['start']), to_utc(period['end'])) for period in periods)
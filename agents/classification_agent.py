@@ -1,8 +1,15 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from typing import Dict, Any, List, Optional
+import os
 import numpy as np
+from config.settings import settings
+from ml_models.backends import create_backend
+from ml_models.batching import MicroBatcher, estimate_token_length
+from ml_models.cascade import CascadeClassifier
+from ml_models.classification_cache import ClassificationCache
+from ml_models.priority_scorer import PriorityScorer
+from ml_models.text_preparation import PreparedText, TextPreparer
+from src.models.classifier import EmailClassifier as NaiveBayesClassifier
 
 class ClassificationAgent(BaseAgent):
     CATEGORIES = [
@@ -14,28 +21,106 @@ class ClassificationAgent(BaseAgent):
     
     PRIORITY_LEVELS = ["LOW", "MEDIUM", "HIGH", "URGENT"]
 
-    def __init__(self):
+    def __init__(self, cascade_classifier: NaiveBayesClassifier = None):
         super().__init__()
         self.model_name = "deepseek-ai/deepseek-base"
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(
-            self.model_name,
-            num_labels=len(self.CATEGORIES)
-        )
+        # Loaded lazily and shared with every other classifier using this model;
+        # INFERENCE_BACKEND picks eager fp32, int8 quantized or ONNX Runtime
+        self.backend = create_backend(self.model_name, num_labels=len(self.CATEGORIES))
+        self.text_preparer = TextPreparer.from_settings()
         
         # Priority classification model
         self.priority_model = self._load_priority_model()
+        self.priority_scorer = PriorityScorer.from_config(self.PRIORITY_LEVELS)
+
+        # Concurrent process() calls share padded forward passes
+        self.batcher = MicroBatcher(
+            self._classify_category_batch,
+            max_batch_size=settings.CLASSIFICATION_BATCH_MAX_SIZE,
+            max_wait_ms=settings.CLASSIFICATION_BATCH_MAX_WAIT_MS,
+            length_buckets=settings.CLASSIFICATION_LENGTH_BUCKETS,
+            length_fn=lambda prepared: estimate_token_length(prepared.text),
+            name="classification_agent"
+        )
+
+        # Optional cheap first tier; the transformer only sees low-confidence emails
+        self.cascade = None
+        self.cheap_category_cache = None
+        if cascade_classifier is None and settings.CLASSIFICATION_CASCADE_ENABLED:
+            # Picks up the persisted model, if one was saved
+            cascade_classifier = NaiveBayesClassifier()
+        label_map = settings.CASCADE_LABEL_MAP
+        if cascade_classifier is not None and cascade_classifier.categories is None:
+            self.logger.warning("Cascade classification needs a trained Naive Bayes model; using the transformer only")
+            cascade_classifier = None
+        if cascade_classifier is not None and not self._maps_onto_categories(cascade_classifier.categories, label_map):
+            # Every answer would escalate as an unknown label, so the cheap tier would only add latency
+            self.logger.warning(
+                f"Naive Bayes labels {sorted(cascade_classifier.categories)} do not map onto {self.CATEGORIES}; "
+                f"set CASCADE_LABEL_MAP. Using the transformer only"
+            )
+            cascade_classifier = None
+        if cascade_classifier is not None:
+            self.cascade = CascadeClassifier(
+                cascade_classifier.classify_with_probabilities,
+                labels=self.CATEGORIES,
+                threshold=settings.MIN_CONFIDENCE_THRESHOLD,
+                always_escalate=settings.CASCADE_ALWAYS_ESCALATE,
+                label_map=label_map
+            )
+            # Cheap-tier answers are cached apart from the transformer's, keyed by the NB model
+            self.cheap_category_cache = self._create_cache(
+                "category_cheap",
+                f"naive-bayes:{self._cheap_model_version(cascade_classifier)}:"
+                f"{settings.MIN_CONFIDENCE_THRESHOLD}:{sorted(label_map.items())}",
+                self.CATEGORIES
+            )
+
+        # Repeated notifications and templates skip the model entirely. Priority
+        # rules are one regex pass, cheaper than hashing the email for a lookup
+        self.category_cache = self._create_cache(
+            "category",
+            f"{self.model_name}:{self.backend.name}",
+            self.CATEGORIES
+        )
+
+    @property
+    def tokenizer(self):
+        return self.backend.tokenizer
+
+    @property
+    def model(self):
+        return self.backend.model
+
+    def warm_up(self):
+        """Load the model and tokenizer now rather than on the first email"""
+        self.backend.tokenizer
+        self.backend.model
 
     async def process(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            # Combine subject and body for better context
-            full_text = f"{email_data['subject']}\n\n{email_data['body']}"
+            # Combine subject and body for better context, bounded before tokenization.
+            # Embeddings are computed at intake with the sentence encoder's own tokenizer,
+            # so these token ids stay with the category model rather than on email_data
+            prepared = self.text_preparer.prepare(email_data['subject'], email_data['body'])
             
             # Get category classification
-            category_result = self._classify_category(full_text)
+            category_result = await self._cached_category(email_data)
+            if category_result is None:
+                if self.cascade is not None:
+                    category_result = await self.cascade.classify(
+                        prepared.text,
+                        lambda text: self.batcher.submit(prepared)
+                    )
+                else:
+                    category_result = await self.batcher.submit(prepared)
+                cache = self.cheap_category_cache if category_result.get('tier') == 'cheap' else self.category_cache
+                await cache.put_async(email_data['subject'], email_data['body'], category_result)
             
             # Get priority classification
-            priority_result = self._classify_priority(full_text)
+            with self.span("priority_rules"):
+                # Keyword rules are one cheap pass, so they see the whole email, not the model window
+                priority_result = self._classify_priority(f"{email_data['subject']}\n\n{email_data['body']}")
             
             # Determine next agent
             next_agent = self._determine_next_agent(category_result['category'])
@@ -62,55 +147,51 @@ class ClassificationAgent(BaseAgent):
             self.logger.error(f"Classification error: {str(e)}")
             return {'status': 'error', 'error': str(e)}
 
+    async def _cached_category(self, email_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """A cached category from the transformer, else from the cheap tier"""
+        result = await self.category_cache.get_async(email_data['subject'], email_data['body'])
+        if result is None and self.cheap_category_cache is not None:
+            result = await self.cheap_category_cache.get_async(email_data['subject'], email_data['body'])
+        return result
+
     def _classify_category(self, text: str) -> Dict[str, Any]:
         """Classify email into categories"""
-        inputs = self.tokenizer(
-            text,
-            truncation=True,
-            padding=True,
-            return_tensors="pt",
-            max_length=512
-        )
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            probabilities = torch.softmax(outputs.logits, dim=1)
-            category_idx = torch.argmax(probabilities).item()
-            confidence = probabilities[0][category_idx].item()
+        return self._classify_category_batch([self.text_preparer.prepare_text(text)])[0]
+
+    def _classify_category_batch(self, prepared: List[PreparedText]) -> List[Dict[str, Any]]:
+        """Classify a padded batch of emails in a single forward pass"""
+        tokenizer = self.tokenizer
+        with self.span("tokenize", batch_size=len(prepared)):
+            token_ids = [self.text_preparer.token_ids(item, tokenizer) for item in prepared]
+        with self.span("forward", batch_size=len(prepared)):
+            probabilities = self.backend.predict_proba_encoded(token_ids)
+        category_indices = np.argmax(probabilities, axis=1)
             
-        return {
-            'category': self.CATEGORIES[category_idx],
-            'confidence': confidence,
-            'all_probabilities': {
-                cat: prob.item()
-                for cat, prob in zip(self.CATEGORIES, probabilities[0])
-            }
-        }
+        results = []
+        for row, category_idx in zip(probabilities, category_indices.tolist()):
+            results.append({
+                'category': self.CATEGORIES[category_idx],
+                'confidence': float(row[category_idx]),
+                'all_probabilities': {
+                    cat: float(prob)
+                    for cat, prob in zip(self.CATEGORIES, row)
+                }
+            })
+        return results
 
     def _classify_priority(self, text: str) -> Dict[str, Any]:
         """Classify email priority"""
-        # Use keywords and rules for priority classification
-        keywords = {
-            'URGENT': ['urgent', 'asap', 'emergency', 'immediate'],
-            'HIGH': ['important', 'priority', 'critical'],
-            'MEDIUM': ['please', 'when possible', 'need'],
-            'LOW': ['fyi', 'update', 'newsletter']
-        }
-        
-        text_lower = text.lower()
-        scores = {level: 0.0 for level in self.PRIORITY_LEVELS}
-        
-        for level, words in keywords.items():
-            for word in words:
-                if word in text_lower:
-                    scores[level] += 1
-                    
-        max_priority = max(scores.items(), key=lambda x: x[1])
-        
-        return {
-            'priority': max_priority[0],
-            'confidence': max_priority[1] / sum(scores.values()) if sum(scores.values()) > 0 else 0.5
-        }
+        # Weighted keyword rules from config.yaml, matched in a single pass
+        return self.priority_scorer.score(text)
+
+    async def evaluate_cascade(self, samples: List[tuple]) -> Dict[str, Any]:
+        """Measure cascade accuracy against the transformer on labelled samples"""
+        if self.cascade is None:
+            raise ValueError("Cascade classification is not enabled")
+        return await self.cascade.evaluate(
+            samples,
+            lambda text: self.batcher.submit(self.text_preparer.prepare_text(text))
+        )
 
     def _determine_next_agent(self, category: str) -> str:
         """Determine which agent should handle the email next"""
@@ -122,6 +203,29 @@ class ClassificationAgent(BaseAgent):
         }
         return agent_mapping.get(category, "InquiryResponderAgent")
 
+    def _create_cache(self, name: str, model_name: str, labels: List[str]) -> ClassificationCache:
+        """Create a classification cache scoped to a model and its label set"""
+        return ClassificationCache(
+            name=name,
+            model_name=model_name,
+            labels=labels,
+            model_version=settings.CLASSIFICATION_MODEL_VERSION,
+            max_entries=settings.CLASSIFICATION_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CLASSIFICATION_CACHE_TTL_SECONDS,
+            disk_path=settings.CLASSIFICATION_CACHE_DISK_PATH
+        )
+
+    def _maps_onto_categories(self, labels: List[str], label_map: Dict[str, str]) -> bool:
+        """Whether any cheap-tier label lands on one of this agent's categories"""
+        return any(label_map.get(label, label) in self.CATEGORIES for label in labels)
+
+    def _cheap_model_version(self, classifier: NaiveBayesClassifier) -> str:
+        """Identify the saved NB model, so retraining it invalidates cached cheap answers"""
+        model_file = getattr(classifier, 'model_file', None)
+        if model_file and os.path.exists(model_file):
+            return f"{os.path.abspath(model_file)}@{os.path.getmtime(model_file)}"
+        return f"{type(classifier).__name__}@{id(classifier)}"
+
     def _load_priority_model(self):
         """Load or initialize priority classification model"""
         # Implement priority model loading
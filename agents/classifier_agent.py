@@ -1,7 +1,9 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator
 import numpy as np
+from ml_models.backends import create_backend
+from ml_models.batching import iter_chunks
+from ml_models.inference_executor import get_inference_executor
+from ml_models.text_preparation import TextPreparer
 
 class EmailClassifier:
     CATEGORIES = [
@@ -14,39 +16,55 @@ class EmailClassifier:
 
     def __init__(self):
         self.model_name = "deepseek-ai/deepseek-base"
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(
-            self.model_name,
-            num_labels=len(self.CATEGORIES)
-        )
-        
+        self.backend = create_backend(self.model_name, num_labels=len(self.CATEGORIES))
+        self.text_preparer = TextPreparer.from_settings()
+
+    @property
+    def tokenizer(self):
+        return self.backend.tokenizer
+
+    @property
+    def model(self):
+        return self.backend.model
+
     def classify_email(self, email_content: Dict[str, Any]) -> Dict[str, Any]:
         """
         Classifies an email based on its content and metadata
         """
-        # Combine subject and content for better context
-        full_text = f"{email_content['subject']}\n\n{email_content['content']}"
-        
-        # Tokenize and predict
-        inputs = self.tokenizer(
-            full_text,
-            truncation=True,
-            padding=True,
-            return_tensors="pt",
-            max_length=512
-        )
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            probabilities = torch.softmax(outputs.logits, dim=1)
-            category_idx = torch.argmax(probabilities).item()
-            confidence = probabilities[0][category_idx].item()
-        
-        return {
-            "category": self.CATEGORIES[category_idx],
-            "confidence": confidence,
-            "all_probabilities": {
-                cat: prob.item()
-                for cat, prob in zip(self.CATEGORIES, probabilities[0])
-            }
-        } 
\ No newline at end of file
+        return next(self.classify_many([email_content], batch_size=1))
+
+    def classify_many(
+        self,
+        email_contents: Iterable[Dict[str, Any]],
+        batch_size: int = 32
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily classifies many emails, one padded forward pass per batch
+        """
+        tokenizer = self.tokenizer
+        for chunk in iter_chunks(email_contents, batch_size):
+            # Combine subject and content for better context, tokenize once
+            token_ids = [
+                self.text_preparer.token_ids(
+                    self.text_preparer.prepare(email['subject'], email['content']),
+                    tokenizer
+                )
+                for email in chunk
+            ]
+            
+            for probabilities in self.backend.predict_proba_encoded(token_ids):
+                category_idx = int(np.argmax(probabilities))
+                yield {
+                    "category": self.CATEGORIES[category_idx],
+                    "confidence": float(probabilities[category_idx]),
+                    "all_probabilities": {
+                        cat: float(prob)
+                        for cat, prob in zip(self.CATEGORIES, probabilities)
+                    }
+                }
+
+    async def classify_email_async(self, email_content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Classifies an email on the shared inference executor
+        """
+        return await get_inference_executor().run(self.classify_email, email_content)
@@ -18,7 +18,8 @@ class EmailIntakeAgent(BaseAgent):
         """Process incoming email and extract relevant information"""
         try:
             # Parse email content
-            parsed_email = self._parse_email(email_data)
+            with self.span("parse"):
+                parsed_email = self._parse_email(email_data)
             
             # Extract entities
             entities = self._extract_entities(parsed_email['body'])
@@ -35,6 +36,9 @@ class EmailIntakeAgent(BaseAgent):
                     'body': cleaned_content,
                     'recipients': parsed_email['recipients'],
                     'timestamp': parsed_email['timestamp'],
+                    'message_id_header': parsed_email['message_id_header'],
+                    'in_reply_to': parsed_email['in_reply_to'],
+                    'references': parsed_email['references'],
                     'entities': entities,
                     'attachments': parsed_email['attachments']
                 }
@@ -57,6 +61,9 @@ class EmailIntakeAgent(BaseAgent):
             'body': self._get_email_body(msg),
             'recipients': msg['to'],
             'timestamp': msg['date'],
+            'message_id_header': msg['message-id'],
+            'in_reply_to': msg['in-reply-to'],
+            'references': msg['references'],
             'attachments': self._get_attachments(msg)
         }
 
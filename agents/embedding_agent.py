@@ -0,0 +1,46 @@
+from .base_agent import BaseAgent
+from typing import Dict, Any, List
+from config.settings import settings
+from ml_models.batching import MicroBatcher
+from ml_models.embeddings import TextEmbedder, get_text_embedder
+
+class EmailEmbeddingAgent(BaseAgent):
+    """Embeds each email body once, for the local knowledge base index to search with"""
+
+    def __init__(self, embedder: TextEmbedder = None):
+        super().__init__()
+        self.embedder = embedder or get_text_embedder()
+        
+        # Concurrent emails share one encoder pass
+        self.batcher = MicroBatcher(
+            self._embed_batch,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+            length_buckets=settings.CLASSIFICATION_LENGTH_BUCKETS,
+            name="embedding_agent"
+        )
+
+    def warm_up(self):
+        """Load the encoder now rather than on the first email"""
+        self.embedder.dim
+
+    async def process(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            embedding = await self.batcher.submit(email_data['body'] or '')
+            
+            result = {
+                'status': 'success',
+                'embedding': embedding
+            }
+            
+            await self.log_processing(email_data, result)
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Embedding error: {str(e)}")
+            return {'status': 'error', 'error': str(e)}
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of bodies; plain lists keep parsed data JSON-serializable"""
+        with self.span("embed", batch_size=len(texts)):
+            return self.embedder.embed(texts).tolist()
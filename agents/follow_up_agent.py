@@ -1,37 +1,52 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any
-import openai
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+import asyncio
+import time
+from ml_models.llm_client import LLMClient, get_llm_client
+from ml_models.response_cache import response_source
+from ml_models.prompt_builder import PromptBuilder
+from .streaming import CachedGeneration, ResponseStream
+from config.settings import settings
+from workflow.conversation_store import ConversationStore, normalize_sender, parse_message_ids
 from datetime import datetime
 
 class FollowUpAgent(BaseAgent):
-    def __init__(self, vector_db_client):
+    def __init__(self, vector_db_client, llm_client: LLMClient = None, conversation_store: ConversationStore = None):
         super().__init__()
         self.vector_db = vector_db_client
+        self.conversation_store = conversation_store
+        self.llm = llm_client or get_llm_client()
+        self.generation = CachedGeneration(self.__class__.__name__, self.llm, "deepseek-r1", 600, 0.7)
+        self.prompt_builder = PromptBuilder.from_settings()
         self.templates = self._load_templates()
 
     async def process(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # Get conversation history
-            history = await self._get_conversation_history(email_data['sender'])
+            with self.span("history_lookup"):
+                history = await self._get_conversation_history(email_data)
             
             # Generate follow-up response
-            response_content = await self._generate_follow_up(
-                email_data,
-                history
-            )
+            with self.span("llm_call"):
+                response_content, source = await self._generate_follow_up(
+                    email_data,
+                    history
+                )
             
             # Format response
-            formatted_response = self._format_response(
-                response_content,
-                email_data,
-                history
-            )
+            with self.span("format"):
+                formatted_response = self._format_response(
+                    response_content,
+                    email_data,
+                    history
+                )
             
             result = {
                 'status': 'success',
                 'response': {
                     'content': formatted_response,
                     'type': 'FOLLOW_UP',
+                    'source': source,
                     'conversation_id': history.get('conversation_id'),
                     'timestamp': datetime.now().isoformat()
                 }
@@ -42,13 +57,60 @@ class FollowUpAgent(BaseAgent):
             
         except Exception as e:
             self.logger.error(f"Error generating follow-up: {str(e)}")
-            return {'status': 'error', 'error': str(e)}
+            # LLM timeouts and 5xx are worth retrying later; the durable queue parks the rest
+            return {'status': 'error', 'error': str(e), 'transient': getattr(e, 'transient', False)}
 
-    async def _get_conversation_history(self, sender: str) -> Dict[str, Any]:
-        """Retrieve conversation history from vector database"""
+    async def process_stream(self, email_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Like process(), but yields the formatted response as it is generated"""
+        started = time.monotonic()
         try:
+            with self.span("history_lookup"):
+                history = await self._get_conversation_history(email_data)
+            
+            chunks, cached = await self.generation.stream(
+                self._create_follow_up_prompt(email_data, history),
+                email_data['body'],
+                self._cache_scope(email_data, history)
+            )
+            stream = ResponseStream(
+                self.__class__.__name__,
+                chunks,
+                lambda content: self._format_response(content, email_data, history),
+                started
+            )
+            with self.span("llm_stream"):
+                async for text in stream:
+                    yield {'type': 'delta', 'text': text}
+            
+            result = {
+                'status': 'success',
+                'response': {
+                    'content': stream.text,
+                    'type': 'FOLLOW_UP',
+                    'source': response_source(cached),
+                    'conversation_id': history.get('conversation_id'),
+                    'timestamp': datetime.now().isoformat()
+                }
+            }
+            
+            await self.log_processing(email_data, result)
+            yield {'type': 'done', **result}
+            
+        except Exception as e:
+            self.logger.error(f"Error streaming follow-up: {str(e)}")
+            yield {'type': 'error', 'status': 'error', 'error': str(e)}
+
+    async def _get_conversation_history(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Retrieve conversation history, newest first"""
+        try:
+            if self.conversation_store is not None:
+                history = await self._get_local_history(email_data)
+                if history['messages']:
+                    return history
+                # Nothing filed for this sender yet, e.g. mail from before the store existed
+            
             history = await self.vector_db.search(
-                query=f"sender:{sender}",
+                query=f"sender:{email_data['sender']}",
                 limit=5,
                 sort_by="timestamp",
                 sort_order="desc"
@@ -63,22 +125,59 @@ class FollowUpAgent(BaseAgent):
             self.logger.error(f"Error retrieving conversation history: {str(e)}")
             return {'messages': []}
 
+    async def _get_local_history(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Latest messages of the thread (or the sender) from the local store"""
+        thread_id = email_data.get('thread_id')
+        # Cache misses and the summary read hit SQLite; keep them off the event loop
+        messages, summary = await asyncio.get_running_loop().run_in_executor(
+            None,
+            self._read_local_history,
+            email_data
+        )
+        
+        if settings.FOLLOW_UP_SEMANTIC_RECALL:
+            # The vector DB is only asked for older messages that are about the same thing
+            related = await self.vector_db.search(query=email_data['body'], limit=3)
+            message_ids = parse_message_ids(email_data.get('message_id_header'))
+            seen = {message.get('message_id') for message in messages} | set(message_ids[:1])
+            messages = messages + [
+                message for message in related.get('messages', [])
+                if message.get('message_id') not in seen
+            ]
+        
+        return {
+            'conversation_id': thread_id or (messages[0].get('thread_id') if messages else None),
+            'summary': summary['summary'] if summary else None,
+            'messages': messages,
+            'last_interaction': messages[0]['timestamp'] if messages else None
+        }
+
+    def _read_local_history(self, email_data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        # The email being answered is already filed; leave its own row out of the history
+        exclude = email_data.get('message_seq')
+        thread_id = email_data.get('thread_id')
+        
+        limit = settings.FOLLOW_UP_RECENT_MESSAGES
+        messages = self.conversation_store.recent(thread_id=thread_id, limit=limit, exclude=exclude) if thread_id else []
+        # Anything older than the recent messages reaches the prompt through the thread summary
+        summary = self.conversation_store.summary(thread_id) if messages else None
+        if not messages:
+            # First message of a thread: fall back to the sender's other threads
+            messages = self.conversation_store.recent(sender=email_data['sender'], limit=limit, exclude=exclude)
+        return messages, summary
+
     async def _generate_follow_up(
         self,
         email_data: Dict[str, Any],
         history: Dict[str, Any]
-    ) -> str:
+    ) -> Tuple[str, Dict[str, Any]]:
         """Generate personalized follow-up response"""
         prompt = self._create_follow_up_prompt(email_data, history)
-        
-        response = await openai.Completion.create(
-            model="deepseek-r1",
-            prompt=prompt,
-            max_tokens=600,
-            temperature=0.7
-        )
-        
-        return response.choices[0].text.strip()
+        return await self.generation.complete(prompt, email_data['body'], self._cache_scope(email_data, history))
+
+    def _cache_scope(self, email_data: Dict[str, Any], history: Dict[str, Any]) -> List[Any]:
+        """Follow-ups quote the customer's own history, so answers are never shared across conversations"""
+        return [normalize_sender(email_data['sender']), history.get('conversation_id')]
 
     def _create_follow_up_prompt(
         self,
@@ -86,18 +185,27 @@ class FollowUpAgent(BaseAgent):
         history: Dict[str, Any]
     ) -> str:
         """Create prompt for follow-up generation"""
+        # Email and history sections are trimmed to their token budgets
+        sections = self.prompt_builder.build(
+            'follow_up',
+            email_data['body'],
+            history=history['messages']
+        )
         conversation_context = "\n".join([
             f"Message {i+1}: {msg['content']}"
-            for i, msg in enumerate(history['messages'])
+            for i, msg in enumerate(sections.history)
         ])
         
         return f"""
         Generate a personalized follow-up email response:
         
         Original Email:
-        {email_data['body']}
+        {sections.email}
+        
+        Conversation Summary:
+        {history.get('summary') or "No earlier messages."}
         
-        Conversation History:
+        Recent Conversation History:
         {conversation_context}
         
         Requirements:
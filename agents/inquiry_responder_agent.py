@@ -1,24 +1,31 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any
-import openai
+from typing import Dict, Any, AsyncIterator, Tuple
+import time
+from ml_models.llm_client import LLMClient, get_llm_client
+from ml_models.response_cache import response_source
+from .streaming import CachedGeneration, ResponseStream
 from datetime import datetime
 
 class InquiryResponderAgent(BaseAgent):
-    def __init__(self, model_name="deepseek-r1"):
+    def __init__(self, model_name="deepseek-r1", llm_client: LLMClient = None):
         super().__init__()
         self.model_name = model_name
+        self.llm = llm_client or get_llm_client()
+        self.generation = CachedGeneration(self.__class__.__name__, self.llm, model_name, 500, 0.7)
         self.response_templates = self._load_response_templates()
 
     async def process(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # Generate response
-            response_content = await self._generate_response(email_data)
+            with self.span("llm_call"):
+                response_content, source = await self._generate_response(email_data)
             
             # Format response
-            formatted_response = self._format_response(
-                response_content,
-                email_data
-            )
+            with self.span("format"):
+                formatted_response = self._format_response(
+                    response_content,
+                    email_data
+                )
             
             # Create draft
             draft_id = await self._create_draft(formatted_response, email_data)
@@ -29,6 +36,7 @@ class InquiryResponderAgent(BaseAgent):
                     'content': formatted_response,
                     'draft_id': draft_id,
                     'type': 'INQUIRY_RESPONSE',
+                    'source': source,
                     'timestamp': datetime.now().isoformat()
                 }
             }
@@ -38,20 +46,48 @@ class InquiryResponderAgent(BaseAgent):
             
         except Exception as e:
             self.logger.error(f"Error generating inquiry response: {str(e)}")
-            return {'status': 'error', 'error': str(e)}
+            # LLM timeouts and 5xx are worth retrying later; the durable queue parks the rest
+            return {'status': 'error', 'error': str(e), 'transient': getattr(e, 'transient', False)}
 
-    async def _generate_response(self, email_data: Dict[str, Any]) -> str:
+    async def process_stream(self, email_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Like process(), but yields the formatted response as it is generated"""
+        started = time.monotonic()
+        try:
+            chunks, cached = await self.generation.stream(self._create_prompt(email_data), email_data['body'])
+            stream = ResponseStream(
+                self.__class__.__name__,
+                chunks,
+                lambda content: self._format_response(content, email_data),
+                started
+            )
+            with self.span("llm_stream"):
+                async for text in stream:
+                    yield {'type': 'delta', 'text': text}
+            
+            draft_id = await self._create_draft(stream.text, email_data)
+            
+            result = {
+                'status': 'success',
+                'response': {
+                    'content': stream.text,
+                    'draft_id': draft_id,
+                    'type': 'INQUIRY_RESPONSE',
+                    'source': response_source(cached),
+                    'timestamp': datetime.now().isoformat()
+                }
+            }
+            
+            await self.log_processing(email_data, result)
+            yield {'type': 'done', **result}
+            
+        except Exception as e:
+            self.logger.error(f"Error streaming inquiry response: {str(e)}")
+            yield {'type': 'error', 'status': 'error', 'error': str(e)}
+
+    async def _generate_response(self, email_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
         """Generate response using AI model"""
         prompt = self._create_prompt(email_data)
-        
-        response = await openai.Completion.create(
-            model=self.model_name,
-            prompt=prompt,
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        return response.choices[0].text.strip()
+        return await self.generation.complete(prompt, email_data['body'])
 
     def _create_prompt(self, email_data: Dict[str, Any]) -> str:
         """Create prompt for response generation"""
@@ -109,7 +145,7 @@ class InquiryResponderAgent(BaseAgent):
         [Company Name]
         """
 
-    def _create_draft(self, response: str, email_data: Dict[str, Any]) -> str:
+    async def _create_draft(self, response: str, email_data: Dict[str, Any]) -> str:
         # Implement draft creation logic
         # This could involve saving the response to a database or file
         # For now, we'll return a placeholder draft ID
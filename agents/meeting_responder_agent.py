@@ -3,15 +3,18 @@ from typing import Dict, Any
 from datetime import datetime, timedelta
 from googleapiclient.discovery import build
 import pytz
+from .calendar_availability import CalendarAvailability, find_free_slots
 
 class MeetingResponderAgent(BaseAgent):
-    def __init__(self, calendar_credentials):
+    def __init__(self, calendar_credentials, calendar_service=None):
         super().__init__()
-        self.calendar_service = build(
+        self.calendar_service = calendar_service or build(
             'calendar',
             'v3',
             credentials=calendar_credentials
         )
+        # Busy times for all candidate days come from one cached or single-range lookup
+        self.availability = CalendarAvailability.from_settings(self.calendar_service)
         self.timezone = pytz.UTC
 
     async def process(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -20,16 +23,18 @@ class MeetingResponderAgent(BaseAgent):
             meeting_info = self._extract_meeting_info(email_data['body'])
             
             # Check calendar availability
-            available_slots = await self._get_available_slots(
-                meeting_info['duration'],
-                meeting_info['preferred_dates']
-            )
+            with self.span("calendar_fetch"):
+                available_slots = await self._get_available_slots(
+                    meeting_info['duration'],
+                    meeting_info['preferred_dates']
+                )
             
             # Generate response
-            response_content = self._generate_meeting_response(
-                email_data,
-                available_slots
-            )
+            with self.span("format"):
+                response_content = self._generate_meeting_response(
+                    email_data,
+                    available_slots
+                )
             
             # Create calendar event draft
             event_draft = await self._create_calendar_event_draft(
@@ -75,30 +80,26 @@ class MeetingResponderAgent(BaseAgent):
         preferred_dates: list
     ) -> list:
         """Find available time slots"""
+        if not preferred_dates:
+            return []
         available_slots = []
         
+        # One lookup covering every candidate day
+        busy_times = await self.availability.busy(
+            min(preferred_dates),
+            max(preferred_dates) + timedelta(days=1)
+        )
+        
         for date in preferred_dates:
-            # Get calendar events for the day
-            events = self.calendar_service.events().list(
-                calendarId='primary',
-                timeMin=date.isoformat() + 'Z',
-                timeMax=(date + timedelta(days=1)).isoformat() + 'Z',
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
             # Find free slots
-            busy_times = [
-                (
-                    datetime.fromisoformat(event['start'].get('dateTime', event['start'].get('date'))),
-                    datetime.fromisoformat(event['end'].get('dateTime', event['end'].get('date')))
-                )
-                for event in events.get('items', [])
+            day_busy = [
+                (start, end) for start, end in busy_times
+                if start < date + timedelta(days=1) and end > date
             ]
             
             # Add available slots
             available_slots.extend(
-                self._find_free_slots(date, busy_times, duration)
+                find_free_slots(date, day_busy, duration)
             )
             
         return available_slots[:5]  # Return top 5 available slots
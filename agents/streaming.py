@@ -0,0 +1,139 @@
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ml_models.response_cache import ResponseCache, cached_completion, get_response_cache, response_namespace
+from monitoring.metrics import response_time_to_first_token
+
+CONTENT_PLACEHOLDER = "\x00content\x00"
+
+
+class ResponseStream:
+    """Streams an agent's formatted response while the LLM is still generating.
+
+    The agent's own ``format_response`` is rendered once around a
+    placeholder; everything before it (greeting, references) is sent
+    immediately, the completion text follows as it arrives and the rest of
+    the template (signature) closes the stream. Once iteration finishes,
+    ``content`` and ``text`` hold the same values the non-streaming
+    ``process()`` would have produced.
+    """
+
+    def __init__(
+        self,
+        agent: str,
+        chunks: AsyncIterator[str],
+        format_response: Callable[[str], str],
+        started: Optional[float] = None
+    ):
+        self.agent = agent
+        self.chunks = chunks
+        self.format_response = format_response
+        self.started = started if started is not None else time.monotonic()
+        self.content = ''
+        self.text = ''
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        head, tail = self.format_response(CONTENT_PLACEHOLDER).split(CONTENT_PLACEHOLDER, 1)
+        yield head
+
+        parts: List[str] = []
+        async for chunk in self.chunks:
+            if not parts:
+                # Completions usually open with whitespace; process() strips it too
+                chunk = chunk.lstrip()
+                if not chunk:
+                    continue
+                response_time_to_first_token.labels(agent=self.agent).observe(time.monotonic() - self.started)
+            parts.append(chunk)
+            yield chunk
+
+        yield tail
+        self.content = ''.join(parts).strip()
+        self.text = self.format_response(self.content)
+
+
+async def cached_stream(
+    cache: Optional[ResponseCache],
+    llm,
+    namespace: str,
+    prompt: str,
+    body: str,
+    **llm_kwargs
+) -> Tuple[AsyncIterator[str], Optional[Dict[str, Any]]]:
+    """Chunks to stream plus the cache hit they replay (None when freshly generated)"""
+    if cache is None:
+        return llm.stream(prompt, **llm_kwargs), None
+    cached, signature = await cache.lookup(namespace, prompt, body)
+    if cached is not None:
+        return _replay(cached['text']), cached
+    return _generate_and_cache(cache, namespace, prompt, body, signature, llm.stream(prompt, **llm_kwargs)), None
+
+
+async def _replay(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _generate_and_cache(
+    cache: ResponseCache,
+    namespace: str,
+    prompt: str,
+    body: str,
+    signature: Optional[np.ndarray],
+    chunks: AsyncIterator[str]
+) -> AsyncIterator[str]:
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    # Only complete generations are worth reusing
+    await cache.put_async(namespace, prompt, body, ''.join(parts).strip(), signature)
+
+
+class CachedGeneration:
+    """A responder agent's completions, behind the shared response cache.
+
+    Repeated questions ("cannot login") reuse an earlier answer, and a
+    cached answer is streamed as a single chunk. Agents whose prompts carry
+    per-customer context pass it as ``scope`` so that a near-duplicate
+    email from someone else never replays a personalised answer.
+    """
+
+    def __init__(
+        self,
+        agent: str,
+        llm,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        cache: Optional[ResponseCache] = None
+    ):
+        self.agent = agent
+        self.llm = llm
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.cache = cache if cache is not None else get_response_cache()
+
+    async def complete(self, prompt: str, body: str, scope: Sequence[Any] = ()) -> Tuple[str, Dict[str, Any]]:
+        """Completion text and its source tag"""
+        return await cached_completion(self.cache, self.llm, self._namespace(scope), prompt, body, **self._llm_kwargs())
+
+    async def stream(
+        self,
+        prompt: str,
+        body: str,
+        scope: Sequence[Any] = ()
+    ) -> Tuple[AsyncIterator[str], Optional[Dict[str, Any]]]:
+        """Chunks to stream plus the cache hit they replay (None when freshly generated)"""
+        return await cached_stream(self.cache, self.llm, self._namespace(scope), prompt, body, **self._llm_kwargs())
+
+    def _namespace(self, scope: Sequence[Any]) -> str:
+        return response_namespace(self.agent, self.model, self.max_tokens, self.temperature, scope)
+
+    def _llm_kwargs(self) -> Dict[str, Any]:
+        return {'max_tokens': self.max_tokens, 'temperature': self.temperature, 'model': self.model}
@@ -1,30 +1,41 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any
-import openai
+from typing import Dict, Any, AsyncIterator, List, Tuple
+import time
+from ml_models.kb_index import KnowledgeBaseIndex
+from ml_models.llm_client import LLMClient, get_llm_client
+from ml_models.response_cache import response_source
+from ml_models.prompt_builder import PromptBuilder
+from .streaming import CachedGeneration, ResponseStream
 from datetime import datetime
 
 class SupportAgent(BaseAgent):
-    def __init__(self, knowledge_base_client):
+    def __init__(self, knowledge_base_client, llm_client: LLMClient = None):
         super().__init__()
         self.kb_client = knowledge_base_client
+        self.llm = llm_client or get_llm_client()
+        self.generation = CachedGeneration(self.__class__.__name__, self.llm, "deepseek-r1", 800, 0.5)
+        self.prompt_builder = PromptBuilder.from_settings()
         self.templates = self._load_templates()
 
     async def process(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # Search knowledge base
-            kb_results = await self._search_knowledge_base(email_data['body'])
+            with self.span("kb_search"):
+                kb_results = await self._search_knowledge_base(email_data['body'], email_data.get('embedding'))
             
             # Generate support response
-            response_content = await self._generate_support_response(
-                email_data,
-                kb_results
-            )
+            with self.span("llm_call"):
+                response_content, source = await self._generate_support_response(
+                    email_data,
+                    kb_results
+                )
             
             # Format response
-            formatted_response = self._format_response(
-                response_content,
-                email_data
-            )
+            with self.span("format"):
+                formatted_response = self._format_response(
+                    response_content,
+                    email_data
+                )
             
             # Create support ticket
             ticket_id = await self._create_support_ticket(
@@ -39,6 +50,7 @@ class SupportAgent(BaseAgent):
                     'ticket_id': ticket_id,
                     'kb_articles': kb_results['articles'],
                     'type': 'SUPPORT_RESPONSE',
+                    'source': source,
                     'timestamp': datetime.now().isoformat()
                 }
             }
@@ -48,16 +60,64 @@ class SupportAgent(BaseAgent):
             
         except Exception as e:
             self.logger.error(f"Error generating support response: {str(e)}")
-            return {'status': 'error', 'error': str(e)}
+            # LLM timeouts and 5xx are worth retrying later; the durable queue parks the rest
+            return {'status': 'error', 'error': str(e), 'transient': getattr(e, 'transient', False)}
 
-    async def _search_knowledge_base(self, query: str) -> Dict[str, Any]:
-        """Search knowledge base for relevant articles"""
+    async def process_stream(self, email_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Like process(), but yields the formatted response as it is generated"""
+        started = time.monotonic()
         try:
-            results = await self.kb_client.search(
-                query=query,
-                limit=3,
-                min_relevance=0.7
+            with self.span("kb_search"):
+                kb_results = await self._search_knowledge_base(email_data['body'], email_data.get('embedding'))
+            
+            chunks, cached = await self.generation.stream(
+                self._create_support_prompt(email_data, kb_results),
+                email_data['body'],
+                self._cache_scope(kb_results)
+            )
+            stream = ResponseStream(
+                self.__class__.__name__,
+                chunks,
+                lambda content: self._format_response(content, email_data),
+                started
             )
+            with self.span("llm_stream"):
+                async for text in stream:
+                    yield {'type': 'delta', 'text': text}
+            
+            ticket_id = await self._create_support_ticket(email_data, stream.content)
+            
+            result = {
+                'status': 'success',
+                'response': {
+                    'content': stream.text,
+                    'ticket_id': ticket_id,
+                    'kb_articles': kb_results['articles'],
+                    'type': 'SUPPORT_RESPONSE',
+                    'source': response_source(cached),
+                    'timestamp': datetime.now().isoformat()
+                }
+            }
+            
+            await self.log_processing(email_data, result)
+            yield {'type': 'done', **result}
+            
+        except Exception as e:
+            self.logger.error(f"Error streaming support response: {str(e)}")
+            yield {'type': 'error', 'status': 'error', 'error': str(e)}
+
+    async def _search_knowledge_base(self, query: str, embedding: List[float] = None) -> Dict[str, Any]:
+        """Search knowledge base for relevant articles"""
+        try:
+            if embedding is not None and isinstance(self.kb_client, KnowledgeBaseIndex):
+                # The local index reuses the email's embedding from intake instead of embedding it again
+                results = await self.kb_client.search(query=query, limit=3, min_relevance=0.7, embedding=embedding)
+            else:
+                results = await self.kb_client.search(
+                    query=query,
+                    limit=3,
+                    min_relevance=0.7
+                )
             
             return {
                 'articles': results,
@@ -71,18 +131,14 @@ class SupportAgent(BaseAgent):
         self,
         email_data: Dict[str, Any],
         kb_results: Dict[str, Any]
-    ) -> str:
+    ) -> Tuple[str, Dict[str, Any]]:
         """Generate support response using AI and KB articles"""
         prompt = self._create_support_prompt(email_data, kb_results)
-        
-        response = await openai.Completion.create(
-            model="deepseek-r1",
-            prompt=prompt,
-            max_tokens=800,
-            temperature=0.5
-        )
-        
-        return response.choices[0].text.strip()
+        return await self.generation.complete(prompt, email_data['body'], self._cache_scope(kb_results))
+
+    def _cache_scope(self, kb_results: Dict[str, Any]) -> List[Any]:
+        """Answers are only reused for emails that matched the same KB articles"""
+        return [article.get('id', article.get('content')) for article in kb_results['articles']]
 
     async def _create_support_ticket(
         self,
@@ -109,16 +165,22 @@ class SupportAgent(BaseAgent):
         kb_results: Dict[str, Any]
     ) -> str:
         """Create prompt for support response generation"""
+        # Email and KB sections are trimmed to their token budgets
+        sections = self.prompt_builder.build(
+            'support',
+            email_data['body'],
+            articles=kb_results['articles']
+        )
         kb_content = "\n".join([
             f"Article {i+1}: {article['content']}"
-            for i, article in enumerate(kb_results['articles'])
+            for i, article in enumerate(sections.articles)
         ])
         
         return f"""
         Generate a technical support response:
         
         Customer Issue:
-        {email_data['body']}
+        {sections.email}
         
         Relevant Knowledge Base Articles:
         {kb_content}
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List
+from email.message import EmailMessage
+import json
 from database.models import Email, Response
 from api.auth import get_current_user
 from monitoring.metrics import track_request
@@ -18,7 +21,7 @@ async def process_email(
         track_request("process_email")
         
         # Process email
-        classification = classifier.classify(email_data["content"])
+        classification = await classifier.classify_async(email_data["content"])
         
         # Store in database
         email = Email(
@@ -43,4 +46,33 @@ async def process_email(
             "response": response.content
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.post("/emails/process/stream")
+async def process_email_stream(
+    email_data: dict,
+    request: Request,
+    current_user = Depends(get_current_user)
+):
+    """Generate the response for an email as server-sent events"""
+    track_request("process_email_stream")
+    
+    message = EmailMessage()
+    message['From'] = email_data["sender"]
+    message['Subject'] = email_data["subject"]
+    message.set_content(email_data["content"])
+    
+    events = request.app.state.email_orchestrator.process_email_stream({
+        'raw_content': message.as_string(),
+        'message_id': email_data.get("message_id")
+    })
+    return StreamingResponse(
+        _server_sent_events(events),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream into one response
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _server_sent_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
@@ -0,0 +1,89 @@
+"""Event-loop responsiveness under classification load.
+
+Measures the latency of a cheap endpoint-like coroutine while a stream of
+CPU-heavy "classifications" runs either directly on the event loop or on
+the shared inference executor. A NumPy matmul stands in for the forward
+pass because, like torch, it releases the GIL.
+
+    python -m benchmarks.bench_event_loop_latency --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from ml_models.inference_executor import InferenceExecutor
+
+MATRIX_SIZE = 384
+
+
+def fake_forward_pass(matrix: np.ndarray) -> float:
+    """Roughly the cost of one small transformer forward pass on CPU"""
+    result = matrix
+    for _ in range(4):
+        result = np.tanh(result @ matrix)
+    return float(result[0, 0])
+
+
+async def classification_load(mode: str, executor: InferenceExecutor, stop: asyncio.Event):
+    matrix = np.random.rand(MATRIX_SIZE, MATRIX_SIZE).astype(np.float32) / MATRIX_SIZE
+    while not stop.is_set():
+        if mode == "blocking":
+            fake_forward_pass(matrix)
+            await asyncio.sleep(0)
+        else:
+            await executor.run(fake_forward_pass, matrix)
+
+
+async def cheap_endpoint_latencies(requests: int, interval: float) -> list:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await asyncio.sleep(0)  # stands in for e.g. GET /api/v1/emails/drafts
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(mode: str, requests: int, concurrency: int, interval: float) -> list:
+    executor = InferenceExecutor(thread_workers=concurrency, intra_op_threads=1)
+    stop = asyncio.Event()
+    load = [
+        asyncio.create_task(classification_load(mode, executor, stop))
+        for _ in range(concurrency)
+    ]
+    try:
+        return await cheap_endpoint_latencies(requests, interval)
+    finally:
+        stop.set()
+        await asyncio.gather(*load)
+        executor.shutdown()
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--interval-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for mode in ("blocking", "executor"):
+        latencies = asyncio.run(
+            run(mode, args.requests, args.concurrency, args.interval_ms / 1000.0)
+        )
+        print(
+            f"{mode:>9}: p50={statistics.median(latencies) * 1000:7.2f} ms  "
+            f"p99={percentile(latencies, 99) * 1000:7.2f} ms  "
+            f"max={max(latencies) * 1000:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Priority keyword scoring: per-keyword substring loop vs PriorityScorer.
+
+The legacy loop does one C-level substring scan per keyword, which no
+single-pass matcher beats at the default dozen keywords, so KeywordMatcher
+does the same below ``max_substring_keywords`` (48) and the two run at the
+same speed. Larger rule sets switch to one trie-compiled regex pass, whose
+cost is flat in the rule count: with 200 keywords it measured about 2.5x
+faster on 1 KB bodies and 3.5x on 100 KB-5 MB bodies. ``score_many`` scores
+repeated texts once and, on the regex path, scans a batch as one buffer;
+the batch lines report both rule sets and a batch full of duplicates.
+
+    python -m benchmarks.bench_priority_scorer
+"""
+import random
+import timeit
+
+from ml_models.priority_scorer import PriorityScorer
+
+LEVELS = ["LOW", "MEDIUM", "HIGH", "URGENT"]
+
+LEGACY_KEYWORDS = {
+    'URGENT': ['urgent', 'asap', 'emergency', 'immediate'],
+    'HIGH': ['important', 'priority', 'critical'],
+    'MEDIUM': ['please', 'when possible', 'need'],
+    'LOW': ['fyi', 'update', 'newsletter']
+}
+
+FILLER = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua deployment server log "
+).split()
+
+
+def legacy_score(text: str, keywords: dict = LEGACY_KEYWORDS) -> dict:
+    """The original ClassificationAgent._classify_priority loop"""
+    text_lower = text.lower()
+    scores = {level: 0.0 for level in LEVELS}
+    for level, words in keywords.items():
+        for word in words:
+            if word in text_lower:
+                scores[level] += 1
+    max_priority = max(scores.items(), key=lambda x: x[1])
+    total = sum(scores.values())
+    return {
+        'priority': max_priority[0],
+        'confidence': max_priority[1] / total if total > 0 else 0.5
+    }
+
+
+def make_body(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    words.insert(len(words) // 2, "urgent")
+    return " ".join(words)[:size]
+
+
+def expanded_keywords(per_level: int) -> dict:
+    """The default rules padded with synthetic keywords to ``per_level`` per level"""
+    keywords = {level: list(words) for level, words in LEGACY_KEYWORDS.items()}
+    for level, words in keywords.items():
+        words.extend(f"{level.lower()}kw{i}" for i in range(per_level - len(words)))
+    return keywords
+
+
+def main():
+    for rule_label, keywords in (("default rules", LEGACY_KEYWORDS), ("200 keywords", expanded_keywords(50))):
+        print(f"-- {rule_label} ({sum(len(w) for w in keywords.values())} keywords)")
+        scorer = PriorityScorer(LEVELS, {
+            level: {word: 1.0 for word in words}
+            for level, words in keywords.items()
+        })
+
+        for label, size, repeat in (("1 KB", 1024, 2000), ("100 KB", 100 * 1024, 50), ("5 MB", 5 * 1024 * 1024, 3)):
+            body = make_body(size)
+            assert legacy_score(body, keywords)['priority'] == scorer.score(body)['priority']
+            legacy = min(timeit.repeat(lambda: legacy_score(body, keywords), number=repeat, repeat=3)) / repeat
+            compiled = min(timeit.repeat(lambda: scorer.score(body), number=repeat, repeat=3)) / repeat
+            print(
+                f"{label:>7}: legacy={legacy * 1000:9.3f} ms  compiled={compiled * 1000:9.3f} ms  "
+                f"speedup={legacy / compiled:5.2f}x"
+            )
+
+    for rule_label, keywords in (("default rules", LEGACY_KEYWORDS), ("200 keywords", expanded_keywords(50))):
+        scorer = PriorityScorer(LEVELS, {
+            level: {word: 1.0 for word in words}
+            for level, words in keywords.items()
+        })
+        distinct = [make_body(2048, seed) for seed in range(1000)]
+        repeated = [make_body(2048, seed % 50) for seed in range(1000)]
+        for batch_label, batch in (("distinct", distinct), ("50 repeated", repeated)):
+            legacy = min(timeit.repeat(lambda: [legacy_score(t, keywords) for t in batch], number=1, repeat=3))
+            compiled = min(timeit.repeat(lambda: scorer.score_many(batch), number=1, repeat=3))
+            print(
+                f"{rule_label}, batch of 1000 x 2 KB ({batch_label}): "
+                f"legacy={legacy * 1000:.1f} ms  score_many={compiled * 1000:.1f} ms"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Tokenization cost on pathological bodies: full text vs TextPreparer.
+
+The baseline is what the classifiers used to do: tokenize the whole
+``subject + body`` with ``truncation=True, max_length=512``. The prepared
+path pre-truncates at the character level and tokenizes the bounded text
+once.
+
+    python -m benchmarks.bench_text_preparation --tokenizer bert-base-uncased
+"""
+import argparse
+import random
+import string
+import time
+
+from transformers import AutoTokenizer
+
+from ml_models.text_preparation import TextPreparer
+
+
+def pasted_log(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < size:
+        line = (
+            f"2024-01-20T10:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z ERROR "
+            f"worker-{rng.randint(1, 64)} "
+            + "".join(rng.choices(string.ascii_letters + string.digits, k=48))
+        )
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokenizer", default="bert-base-uncased")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    preparer = TextPreparer()
+    subject = "Production outage - logs attached"
+
+    for label, size in (("100 KB", 100 * 1024), ("1 MB", 1024 * 1024), ("10 MB", 10 * 1024 * 1024)):
+        body = "Hi team, the service is down again, see below.\n" + pasted_log(size) + "\nThanks, Dana"
+        full_text = f"{subject}\n\n{body}"
+
+        baseline = timed(
+            lambda: tokenizer(full_text, truncation=True, max_length=512)["input_ids"],
+            args.repeat
+        )
+        prepared_time = timed(
+            lambda: preparer.token_ids(preparer.prepare(subject, body), tokenizer),
+            args.repeat
+        )
+        print(
+            f"{label:>7}: full tokenization={baseline * 1000:9.2f} ms  "
+            f"prepared={prepared_time * 1000:7.2f} ms  speedup={baseline / prepared_time:8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from typing import Dict, List, Optional
 from pydantic import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,12 +8,150 @@ class Settings(BaseSettings):
     CLASSIFIER_MODEL_PATH: str = "models/classifier"
     RESPONSE_MODEL_NAME: str = "deepseek-r1"
     MIN_CONFIDENCE_THRESHOLD: float = 0.75
+
+    # LLM Client
+    LLM_API_BASE: str = "https://api.deepseek.com"
+    LLM_API_KEY: Optional[str] = None
+    LLM_MAX_CONNECTIONS: int = 20  # keep-alive pool shared by all responder agents
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_REQUESTS_PER_MINUTE: float = 60
+    LLM_TOKENS_PER_MINUTE: float = 100000
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_RETRIES: int = 4
+    LLM_BACKOFF_BASE_SECONDS: float = 0.5
+    LLM_BACKOFF_MAX_SECONDS: float = 20.0
+
+    # Response Cache
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5000
+    RESPONSE_CACHE_TTL_SECONDS: int = 604800  # 1 week
+    RESPONSE_CACHE_SIMILARITY: float = 0.85  # estimated Jaccard over email body shingles
+    RESPONSE_CACHE_NUM_PERM: int = 128
+    RESPONSE_CACHE_BANDS: int = 32  # LSH bands; must divide NUM_PERM
+    RESPONSE_CACHE_DISK_PATH: Optional[str] = None  # e.g. "data/response_cache.db"
+
+    # Prompt Budgets
+    PROMPT_TOKENIZER_NAME: Optional[str] = None  # e.g. "deepseek-ai/DeepSeek-R1"; None estimates counts
+    PROMPT_TOKEN_BUDGETS: Dict[str, int] = {"email": 1000, "history": 1200, "kb": 1500}
+    PROMPT_KEEP_RECENT_TURNS: int = 2  # newest history messages always kept verbatim
+
+    # Cascade Classification
+    CLASSIFICATION_CASCADE_ENABLED: bool = False
+    CASCADE_ALWAYS_ESCALATE: List[str] = []  # e.g. ["FOLLOW_UP"]
+    # Naive Bayes labels (config.yaml email_categories) -> ClassificationAgent categories
+    CASCADE_LABEL_MAP: Dict[str, str] = {
+        "support": "SUPPORT",
+        "technical": "SUPPORT",
+        "billing": "SUPPORT",
+        "sales": "INQUIRY",
+        "general": "INQUIRY"
+    }
+
+    # Inference Batching
+    CLASSIFICATION_BATCH_MAX_SIZE: int = 16
+    CLASSIFICATION_BATCH_MAX_WAIT_MS: float = 10.0
+    CLASSIFICATION_LENGTH_BUCKETS: List[int] = [64, 128, 256, 512]
+
+    # Inference Executor
+    INFERENCE_THREAD_WORKERS: int = 2
+    INFERENCE_INTRA_OP_THREADS: int = 2
+
+    # Text Preparation
+    TEXT_MAX_TOKENS: int = 512
+    TEXT_CHARS_PER_TOKEN: float = 4.0
+    TEXT_TRUNCATION_SAFETY_MARGIN: float = 1.5
+    TEXT_HEAD_FRACTION: float = 0.75  # share of the window kept from the start
+
+    # Inference Backend
+    INFERENCE_BACKEND: str = "torch"  # torch | torch_int8 | onnx
+    ONNX_MODEL_DIR: str = "models/onnx"
+
+    # Model Registry
+    MODEL_IDLE_UNLOAD_SECONDS: int = 0  # 0 keeps models loaded for the process lifetime
+
+    # Classification Cache
+    CLASSIFICATION_MODEL_VERSION: str = "1"
+    CLASSIFICATION_CACHE_MAX_ENTRIES: int = 10000
+    CLASSIFICATION_CACHE_TTL_SECONDS: int = 86400
+    CLASSIFICATION_CACHE_DISK_PATH: Optional[str] = None  # e.g. "data/classification_cache.db"
     
     # Email Processing
     AUTO_SEND_THRESHOLD: float = 0.95  # Auto-send if confidence > 95%
     MAX_RESPONSE_LENGTH: int = 2000
     ENABLE_AUTO_FOLLOW_UP: bool = True
+
+    # Orchestrator
+    ORCHESTRATOR_CATEGORIES: List[str] = []  # empty handles every category
+    AGENT_WARMUP_ON_STARTUP: bool = True
+
+    # Message De-duplication
+    DEDUP_ENABLED: bool = True
+    DEDUP_RESULT_CACHE_SIZE: int = 10000
+    DEDUP_BLOOM_CAPACITY: int = 100000  # per generation; two generations are kept
+    DEDUP_BLOOM_ERROR_RATE: float = 1e-6
+    DEDUP_STATE_PATH: Optional[str] = "data/dedup_state.json"
+
+    # Durable Queue
+    DURABLE_QUEUE_ENABLED: bool = False  # process_email runs through the checkpointed queue
+    DURABLE_QUEUE_PATH: str = "data/work_queue.db"
+    QUEUE_VISIBILITY_TIMEOUT_SECONDS: float = 300.0  # lease length; renewed while a job runs
+    QUEUE_MAX_ATTEMPTS: int = 5
+    QUEUE_GROUP_COMMIT_SIZE: int = 32
+    QUEUE_GROUP_COMMIT_MS: float = 50.0
+
+    # Tracing
+    TRACING_ENABLED: bool = True
+    TRACE_EXPORT_PATH: Optional[str] = None  # e.g. "data/trace.json" (Chrome trace format)
+    TRACE_MAX_EVENTS: int = 100000
+    AGENT_LOG_SAMPLE_RATE: float = 0.01  # share of successful emails logged; errors always are
+
+    # Staged Pipeline
+    PIPELINE_QUEUE_SIZE: int = 100
+    PIPELINE_CONCURRENCY: Dict[str, int] = {
+        "intake": 8,
+        "classification": 16,
+        "default": 4  # each responder agent, unless overridden by category name
+    }
+
+    # Priority Scheduling
+    PRIORITY_SCHEDULING_ENABLED: bool = False
+    SCHEDULER_CONCURRENCY: int = 8  # responder slots shared by all agents
+    SCHEDULER_QUEUE_SIZE: int = 100  # per priority level
+    SCHEDULER_MAX_WAIT_SECONDS: float = 30.0  # starvation guard
+    SCHEDULER_PRIORITY_WEIGHTS: Dict[str, float] = {"URGENT": 8, "HIGH": 4, "MEDIUM": 2, "LOW": 1}
+    SCHEDULER_RESERVATIONS: Dict[str, int] = {"URGENT": 2}
     
     # Knowledge Base
     KB_INDEX_PATH: str = "data/kb_index"
-    KB_UPDATE_INTERVAL: int = 3600  # 1 hour 
\ No newline at end of file
+    KB_UPDATE_INTERVAL: int = 3600  # 1 hour
+    KB_INDEX_ENABLED: bool = True  # search a local copy instead of the remote client; needs EMBEDDING_MODEL_NAME
+    KB_INDEX_DTYPE: str = "float16"  # or "float32"
+    KB_INDEX_IVF_LISTS: int = 0  # clusters for pruned search; 0 scans every article
+    KB_INDEX_IVF_PROBES: int = 8  # clusters scanned per query
+    KB_INDEX_IVF_MIN_ROWS: int = 10000  # below this the full scan is used anyway
+
+    # Conversation History
+    CONVERSATION_STORE_ENABLED: bool = True  # local history first; senders it has no mail from still use the vector DB
+    CONVERSATION_STORE_PATH: str = "data/conversations.db"
+    CONVERSATION_CACHE_SIZE: int = 1024  # senders and threads kept hot
+    CONVERSATION_CACHE_DEPTH: int = 20  # newest messages cached per sender or thread
+    FOLLOW_UP_SEMANTIC_RECALL: bool = False  # also ask the vector DB for related older messages
+    FOLLOW_UP_RECENT_MESSAGES: int = 5  # sent verbatim; older messages only through the thread summary
+    THREAD_SUMMARIES_ENABLED: bool = True
+    THREAD_SUMMARY_MAX_TOKENS: int = 200
+    THREAD_SUMMARY_BATCH_SIZE: int = 10  # aged-out messages folded per LLM call
+    THREAD_SUMMARY_CONCURRENCY: int = 2
+
+    # Calendar
+    CALENDAR_ID: str = "primary"
+    CALENDAR_CACHE_ENABLED: bool = True  # mirror events with sync tokens; otherwise one free/busy query per email
+    CALENDAR_SYNC_INTERVAL_SECONDS: float = 60.0  # cached availability may lag the calendar by this much
+
+    # Embeddings
+    EMBEDDING_MODEL_NAME: Optional[str] = None  # e.g. "sentence-transformers/all-MiniLM-L6-v2"; None hashes words
+    EMBEDDING_DIM: int = 384  # hashed embeddings only
+    EMAIL_EMBEDDING_ENABLED: bool = True  # embed each email once after intake, when the local KB index can use it
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 10.0
+
+settings = Settings()
@@ -3,9 +3,14 @@ from database.database import init_db
 from api.routes import router
 from api.auth import auth_router
 from monitoring.metrics import init_metrics
+import asyncio
 import logging
 from workflow.email_orchestrator import EmailOrchestrator
 from agents.gmail_async_worker import GmailAsyncWorker
+from ml_models.inference_executor import shutdown_inference_executor
+from ml_models.llm_client import get_llm_client
+from config.settings import settings
+from monitoring.tracing import get_tracer
 
 # Configure logging
 logging.basicConfig(
@@ -32,6 +37,7 @@ def init_application():
     # Initialize email orchestrator
     global email_orchestrator
     email_orchestrator = EmailOrchestrator(gmail_service, database)
+    app.state.email_orchestrator = email_orchestrator
     
     # Update Gmail worker to use orchestrator
     global async_worker
@@ -41,6 +47,33 @@ def init_application():
 @app.on_event("startup")
 async def startup_event():
     init_application()
+    if email_orchestrator.kb_index is not None:
+        email_orchestrator.kb_index.start()
+    if email_orchestrator.durable_worker is not None:
+        # Resumes emails a previous process crashed on and retries failed attempts
+        global durable_worker_task
+        durable_worker_task = asyncio.get_running_loop().create_task(email_orchestrator.durable_worker.run())
+    if settings.AGENT_WARMUP_ON_STARTUP:
+        # Serve requests straight away; agents not yet warm are built on first use
+        asyncio.get_running_loop().create_task(email_orchestrator.warm_up())
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    if email_orchestrator.kb_index is not None:
+        await email_orchestrator.kb_index.stop()
+    if email_orchestrator.durable_worker is not None:
+        email_orchestrator.durable_worker.stop()
+        await durable_worker_task
+        email_orchestrator.durable_worker.queue.close()
+    if email_orchestrator.thread_summarizer is not None:
+        await email_orchestrator.thread_summarizer.join()
+    shutdown_inference_executor(wait=False)
+    await get_llm_client().close()
+    if email_orchestrator.deduplicator is not None:
+        email_orchestrator.deduplicator.save()
+    if settings.TRACE_EXPORT_PATH:
+        get_tracer().export_chrome_trace()
 
 # Add new endpoints for managing email processing
 @app.get("/api/v1/emails/drafts")
@@ -0,0 +1,166 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from ml_models.registry import ModelHandle, get_model_registry, load_sequence_classifier
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch_int8", "onnx")
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def onnx_export_dir(model_name: str, num_labels: Optional[int] = None) -> str:
+    """Directory holding the exported ONNX artifacts for a model"""
+    suffix = f"-{num_labels}" if num_labels is not None else ""
+    return os.path.join(settings.ONNX_MODEL_DIR, model_name.replace('/', '__') + suffix)
+
+
+def load_quantized_sequence_classifier(model_name: str, num_labels: Optional[int] = None) -> Tuple[Any, Any]:
+    """Load a model and dynamically quantize its Linear layers to int8"""
+    import torch
+
+    model, tokenizer = load_sequence_classifier(model_name, num_labels)
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return quantized, tokenizer
+
+
+def load_onnx_sequence_classifier(model_name: str, num_labels: Optional[int] = None) -> Tuple[Any, Any]:
+    """Load an exported ONNX Runtime session and the tokenizer saved next to it"""
+    import onnxruntime
+    from transformers import AutoTokenizer
+
+    export_dir = onnx_export_dir(model_name, num_labels)
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = settings.INFERENCE_INTRA_OP_THREADS
+    session = onnxruntime.InferenceSession(
+        os.path.join(export_dir, "model.onnx"),
+        sess_options=options,
+        providers=["CPUExecutionProvider"]
+    )
+    return session, AutoTokenizer.from_pretrained(export_dir)
+
+
+class InferenceBackend(ABC):
+    """Turns a batch of texts into class probabilities"""
+
+    name = "base"
+    tensor_type = "pt"
+
+    def __init__(self, handle: ModelHandle):
+        self.handle = handle
+
+    @property
+    def tokenizer(self):
+        return self.handle.tokenizer
+
+    @property
+    def model(self):
+        return self.handle.model
+
+    def id2label(self) -> Dict[int, str]:
+        return self.model.config.id2label
+
+    def predict_proba(self, texts: List[str], max_length: int = 512) -> np.ndarray:
+        """Return an (n_texts, n_labels) float32 probability matrix"""
+        inputs = self.tokenizer(
+            texts,
+            truncation=True,
+            padding=True,
+            return_tensors=self.tensor_type,
+            max_length=max_length
+        )
+        return softmax(self.logits(inputs))
+
+    def predict_proba_encoded(self, token_ids: List[List[int]]) -> np.ndarray:
+        """Like predict_proba, for texts already tokenized by a TextPreparer"""
+        inputs = self.tokenizer.pad(
+            {'input_ids': token_ids},
+            padding=True,
+            return_tensors=self.tensor_type
+        )
+        return softmax(self.logits(inputs))
+
+    @abstractmethod
+    def logits(self, inputs: Dict[str, Any]) -> np.ndarray:
+        """Raw (n_texts, n_labels) scores for a tokenized batch"""
+        pass
+
+
+class TorchBackend(InferenceBackend):
+    """Eager fp32 PyTorch"""
+
+    name = "torch"
+
+    def logits(self, inputs: Dict[str, Any]) -> np.ndarray:
+        import torch
+
+        with torch.no_grad():
+            return self.model(**inputs).logits.float().numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch with dynamically quantized int8 Linear layers"""
+
+    name = "torch_int8"
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime session exported by ``python -m ml_models.export``"""
+
+    name = "onnx"
+    tensor_type = "np"
+
+    def __init__(self, handle: ModelHandle):
+        super().__init__(handle)
+        self._id2label: Optional[Dict[int, str]] = None
+
+    def id2label(self) -> Dict[int, str]:
+        # The session has no config; the label map is saved next to it at export time.
+        # Read on first use, like the session itself, so a missing export fails then
+        if self._id2label is None:
+            from transformers import AutoConfig
+
+            export_dir = onnx_export_dir(self.handle.model_name, self.handle.num_labels)
+            self._id2label = AutoConfig.from_pretrained(export_dir).id2label
+        return self._id2label
+
+    def logits(self, inputs: Dict[str, Any]) -> np.ndarray:
+        session = self.model
+        # Pre-tokenized batches carry no token_type_ids; single-segment inputs are all zeros
+        feed = {
+            node.name: np.asarray(inputs.get(node.name, np.zeros_like(inputs['input_ids']))).astype(np.int64)
+            for node in session.get_inputs()
+        }
+        return session.run(["logits"], feed)[0]
+
+
+_BACKEND_CLASSES = {
+    "torch": (TorchBackend, load_sequence_classifier, "fp32"),
+    "torch_int8": (QuantizedTorchBackend, load_quantized_sequence_classifier, "int8"),
+    "onnx": (OnnxBackend, load_onnx_sequence_classifier, "onnx"),
+}
+
+
+def create_backend(
+    model_name: str,
+    num_labels: Optional[int] = None,
+    backend: Optional[str] = None
+) -> InferenceBackend:
+    """Create the configured inference backend for a model via the shared registry"""
+    backend = backend or settings.INFERENCE_BACKEND
+    if backend not in _BACKEND_CLASSES:
+        raise ValueError(f"Unknown inference backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+    backend_class, loader, variant = _BACKEND_CLASSES[backend]
+    handle = get_model_registry().acquire(model_name, num_labels=num_labels, loader=loader, variant=variant)
+    return backend_class(handle)
@@ -0,0 +1,169 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from ml_models.inference_executor import InferenceExecutor, get_inference_executor
+from monitoring.metrics import inference_batch_size, inference_queue_wait
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_token_length(text: str) -> int:
+    """Cheap token count estimate used for bucketing (~4 chars per token)"""
+    return len(text) // 4 + 1
+
+
+def iter_chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Lazily split any iterable into lists of at most ``size`` items"""
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@dataclass
+class _PendingItem:
+    item: Any
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class MicroBatcher:
+    """Collects concurrent inference requests into padded batches.
+
+    Requests are bucketed by estimated token length so that every batch
+    pads to a similar length. A bucket is flushed as soon as it holds
+    ``max_batch_size`` items or its oldest item has waited ``max_wait_ms``.
+    Batches run on the shared inference executor, off the event loop.
+    """
+
+    def __init__(
+        self,
+        infer_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        length_buckets: Sequence[int] = (64, 128, 256, 512),
+        length_fn: Callable[[Any], int] = estimate_token_length,
+        name: str = "classification",
+        executor: Optional[InferenceExecutor] = None
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.infer_fn = infer_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.length_buckets = sorted(length_buckets)
+        self.length_fn = length_fn
+        self.name = name
+        self.executor = executor
+
+        self._buckets: Dict[int, List[_PendingItem]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item (usually a text) for the next batch and wait for its result"""
+        self._ensure_scheduler()
+        future = asyncio.get_running_loop().create_future()
+        bucket = self._bucket_for(item)
+        self._buckets.setdefault(bucket, []).append(_PendingItem(item, future))
+        self._wakeup.set()
+        return await future
+
+    async def close(self):
+        """Stop the scheduler and flush anything still queued"""
+        if self._scheduler is None:
+            return
+        self._scheduler.cancel()
+        try:
+            await self._scheduler
+        except asyncio.CancelledError:
+            pass
+        self._scheduler = None
+        for bucket in list(self._buckets):
+            while self._buckets[bucket]:
+                self._dispatch(bucket)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def _bucket_for(self, item: Any) -> int:
+        index = bisect.bisect_left(self.length_buckets, self.length_fn(item))
+        return min(index, len(self.length_buckets) - 1)
+
+    def _ensure_scheduler(self):
+        if self._scheduler is None or self._scheduler.done():
+            self._wakeup = asyncio.Event()
+            self._scheduler = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_deadline = None
+
+            for bucket, items in list(self._buckets.items()):
+                if not items:
+                    continue
+                deadline = items[0].enqueued_at + self.max_wait
+                if len(items) >= self.max_batch_size or deadline <= now:
+                    self._dispatch(bucket)
+                    # Items may still be waiting in this bucket after a flush
+                    self._wakeup.set()
+                elif next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+
+            if self._wakeup.is_set():
+                continue
+
+            timeout = None if next_deadline is None else max(next_deadline - time.monotonic(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, bucket: int):
+        """Take up to one batch from a bucket and run it without blocking the scheduler"""
+        items = self._buckets.get(bucket, [])
+        batch, self._buckets[bucket] = items[:self.max_batch_size], items[self.max_batch_size:]
+        batch = [item for item in batch if not item.future.cancelled()]
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _run_batch(self, batch: List[_PendingItem]):
+        now = time.monotonic()
+        inference_batch_size.labels(model=self.name).observe(len(batch))
+        for item in batch:
+            inference_queue_wait.labels(model=self.name).observe(now - item.enqueued_at)
+
+        try:
+            results = await self._infer([pending.item for pending in batch])
+            if len(results) != len(batch):
+                # zip() would leave the surplus callers waiting forever
+                raise ValueError(f"{self.name} returned {len(results)} results for a batch of {len(batch)}")
+        except Exception as e:
+            logger.error(f"Batch inference failed for {self.name}: {str(e)}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        for item, result in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    async def _infer(self, items: List[Any]) -> Sequence[Any]:
+        executor = self.executor or get_inference_executor()
+        return await executor.run(self.infer_fn, items)
@@ -0,0 +1,130 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from monitoring.metrics import cascade_routing_counter
+
+# (label, confidence), optionally followed by the probability of every label
+CheapClassifier = Callable[[str], Union[Tuple[str, float], Tuple[str, float, Dict[str, float]]]]
+ExpensiveClassifier = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class CascadeClassifier:
+    """Two-tier classifier: a cheap model first, the expensive one on doubt.
+
+    The cheap tier (TF-IDF + Naive Bayes) answers whenever its confidence
+    reaches ``threshold`` and its label is not in ``always_escalate``.
+    Everything else, including labels the expensive tier does not know,
+    is escalated. Routing decisions are counted per tier and reason.
+    Both tiers return ``category``, ``confidence`` and ``all_probabilities``
+    over ``labels``. ``label_map`` translates the cheap tier's taxonomy;
+    labels mapped onto the same category pool their probability.
+    """
+
+    def __init__(
+        self,
+        cheap: CheapClassifier,
+        labels: Iterable[str],
+        threshold: float = 0.75,
+        always_escalate: Iterable[str] = (),
+        label_map: Optional[Dict[str, str]] = None
+    ):
+        self.cheap = cheap
+        self.label_order = list(labels)
+        self.labels = set(self.label_order)
+        self.threshold = threshold
+        self.always_escalate = set(always_escalate)
+        self.label_map = label_map or {}
+        self.routing = {'cheap': 0, 'low_confidence': 0, 'always_escalate': 0, 'unknown_label': 0}
+
+    async def classify(self, text: str, expensive: ExpensiveClassifier) -> Dict[str, Any]:
+        """Classify ``text``, escalating to ``expensive`` when the cheap tier is unsure"""
+        category, confidence, probabilities = self._decide(self.cheap(text))
+        reason = self._escalation_reason(category, confidence)
+        self._record(reason)
+
+        if reason is None:
+            return {
+                'category': category,
+                'confidence': confidence,
+                'all_probabilities': probabilities,
+                'tier': 'cheap'
+            }
+
+        result = dict(await expensive(text))
+        result['tier'] = 'expensive'
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.routing.values())
+        return {
+            **self.routing,
+            'total': total,
+            'cheap_fraction': self.routing['cheap'] / total if total else 0.0
+        }
+
+    async def evaluate(
+        self,
+        samples: Iterable[Tuple[str, str]],
+        expensive: ExpensiveClassifier
+    ) -> Dict[str, Any]:
+        """Compare cascade and expensive-only accuracy on labelled (text, label) pairs"""
+        correct = {'cascade': 0, 'expensive': 0, 'cheap_served': 0}
+        cheap_served = 0
+        total = 0
+
+        for text, label in samples:
+            total += 1
+            expensive_result = await expensive(text)
+            cheap_category, confidence, _ = self._decide(self.cheap(text))
+
+            if self._escalation_reason(cheap_category, confidence) is None:
+                cascade_category = cheap_category
+                cheap_served += 1
+                correct['cheap_served'] += cheap_category == label
+            else:
+                cascade_category = expensive_result['category']
+
+            correct['cascade'] += cascade_category == label
+            correct['expensive'] += expensive_result['category'] == label
+
+        return {
+            'samples': total,
+            'cheap_fraction': cheap_served / total if total else 0.0,
+            'cascade_accuracy': correct['cascade'] / total if total else 0.0,
+            'expensive_accuracy': correct['expensive'] / total if total else 0.0,
+            'cheap_tier_accuracy': correct['cheap_served'] / cheap_served if cheap_served else 0.0
+        }
+
+    def _decide(self, outcome: Tuple) -> Tuple[str, float, Dict[str, float]]:
+        # Several cheap labels may map onto one category; it is as likely as all of them together
+        probabilities = self._probabilities(outcome)
+        if len(outcome) > 2 and any(probabilities.values()):
+            category = max(probabilities, key=probabilities.get)
+            return category, probabilities[category], probabilities
+        return self.label_map.get(outcome[0], outcome[0]), outcome[1], probabilities
+
+    def _probabilities(self, outcome: Tuple) -> Dict[str, float]:
+        # A cheap tier reporting only its top label puts all the mass on it
+        reported = outcome[2] if len(outcome) > 2 else {outcome[0]: outcome[1]}
+        probabilities = {label: 0.0 for label in self.label_order}
+        for label, probability in reported.items():
+            category = self.label_map.get(label, label)
+            if category in probabilities:
+                probabilities[category] += probability
+        return probabilities
+
+    def _escalation_reason(self, category: str, confidence: float) -> Optional[str]:
+        if category not in self.labels:
+            return 'unknown_label'
+        if category in self.always_escalate:
+            return 'always_escalate'
+        if confidence < self.threshold:
+            return 'low_confidence'
+        return None
+
+    def _record(self, reason: Optional[str]):
+        key = reason or 'cheap'
+        self.routing[key] += 1
+        cascade_routing_counter.labels(
+            tier='cheap' if reason is None else 'expensive',
+            reason=key
+        ).inc()
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from monitoring.metrics import classification_cache_requests
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase and collapse whitespace so trivially different copies share a key"""
+    return ' '.join((text or '').lower().split())
+
+
+def content_key(subject: Optional[str], body: Optional[str]) -> str:
+    """Content address of an email: hash of its normalized subject and body"""
+    payload = f"{normalize_text(subject)}\n\n{normalize_text(body)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ClassificationCache:
+    """Content-addressed cache of classification results.
+
+    An in-memory LRU with a TTL sits in front of an optional SQLite tier
+    that survives restarts. Entries are scoped to a namespace derived from
+    the model name, version and label set, so changing any of them
+    invalidates everything cached under the previous one.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model_name: str,
+        labels: Sequence[str],
+        model_version: str = "1",
+        max_entries: int = 10000,
+        ttl_seconds: float = 86400,
+        disk_path: Optional[str] = None
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.namespace = hashlib.sha256(
+            json.dumps([model_name, model_version, list(labels)]).encode('utf-8')
+        ).hexdigest()[:16]
+
+        self._entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._open_disk_tier(disk_path)
+
+    def get(self, subject: Optional[str], body: Optional[str]) -> Optional[Any]:
+        """Return the cached result for an email, or None"""
+        key = content_key(subject, body)
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is None:
+            value = self._lookup_disk(key, now)
+        return value
+
+    async def get_async(self, subject: Optional[str], body: Optional[str]) -> Optional[Any]:
+        """Like get(), but a disk lookup runs in a worker thread instead of on the event loop"""
+        key = content_key(subject, body)
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is None:
+            if self._db is None:
+                return self._lookup_disk(key, now)
+            value = await asyncio.get_running_loop().run_in_executor(None, self._lookup_disk, key, now)
+        return value
+
+    def put(self, subject: Optional[str], body: Optional[str], value: Any):
+        """Cache a classification result for an email"""
+        key = content_key(subject, body)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+        self._disk_put(key, value, expires_at)
+
+    async def put_async(self, subject: Optional[str], body: Optional[str], value: Any):
+        """Like put(), but the SQLite write and commit run in a worker thread"""
+        key = content_key(subject, body)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self._db is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._disk_put, key, value, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM classification_cache WHERE name = ?", (self.name,))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def _memory_get(self, key: str, now: float) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._record('memory', 'hit')
+                return value
+            del self._entries[key]
+        return None
+
+    def _lookup_disk(self, key: str, now: float) -> Optional[Any]:
+        value = self._disk_get(key, now)
+        if value is not None:
+            with self._lock:
+                self._remember(key, value, now + self.ttl_seconds)
+            self._record('disk', 'hit')
+            return value
+
+        self._record('disk' if self._db is not None else 'memory', 'miss')
+        return None
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _record(self, tier: str, result: str):
+        if result == 'hit':
+            self.hits += 1
+        else:
+            self.misses += 1
+        classification_cache_requests.labels(cache=self.name, tier=tier, result=result).inc()
+
+    def _open_disk_tier(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS classification_cache ("
+            " name TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " namespace TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (name, key))"
+        )
+        # Drop entries produced by a different model, version or label set
+        deleted = self._db.execute(
+            "DELETE FROM classification_cache WHERE name = ? AND (namespace != ? OR expires_at <= ?)",
+            (self.name, self.namespace, time.time())
+        ).rowcount
+        self._db.commit()
+        if deleted:
+            logger.info(f"Invalidated {deleted} stale {self.name} cache entries")
+
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM classification_cache"
+                " WHERE name = ? AND key = ? AND namespace = ? AND expires_at > ?",
+                (self.name, key, self.namespace, now)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _disk_put(self, key: str, value: Any, expires_at: float):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO classification_cache VALUES (?, ?, ?, ?, ?)",
+                (self.name, key, self.namespace, json.dumps(value), expires_at)
+            )
+            self._db.commit()
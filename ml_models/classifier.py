@@ -1,17 +1,42 @@
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-import torch
+from typing import Iterable, Iterator
+from ml_models.backends import create_backend
+from ml_models.batching import iter_chunks
+from ml_models.inference_executor import get_inference_executor
+from ml_models.text_preparation import TextPreparer
 
 class EmailClassifier:
     def __init__(self):
         self.model_name = "bert-base-uncased"
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
-        
+        # Nothing is loaded here; api/routes.py can build this at import time
+        self.backend = create_backend(self.model_name)
+        self.text_preparer = TextPreparer.from_settings()
+
+    @property
+    def tokenizer(self):
+        return self.backend.tokenizer
+
+    @property
+    def model(self):
+        return self.backend.model
+
     def classify(self, email_content):
-        inputs = self.tokenizer(email_content, return_tensors="pt", truncation=True, max_length=512)
-        outputs = self.model(**inputs)
-        predictions = torch.softmax(outputs.logits, dim=1)
-        return {
-            "category": self.model.config.id2label[predictions.argmax().item()],
-            "confidence": predictions.max().item()
-        } 
\ No newline at end of file
+        return next(self.classify_many([email_content], batch_size=1))
+
+    def classify_many(self, texts: Iterable[str], batch_size: int = 32) -> Iterator[dict]:
+        """Lazily classify many texts with one padded forward pass per batch"""
+        id2label = self.backend.id2label()
+        tokenizer = self.tokenizer
+        for chunk in iter_chunks(texts, batch_size):
+            token_ids = [
+                self.text_preparer.token_ids(self.text_preparer.prepare_text(text), tokenizer)
+                for text in chunk
+            ]
+            for predictions in self.backend.predict_proba_encoded(token_ids):
+                yield {
+                    "category": id2label[int(predictions.argmax())],
+                    "confidence": float(predictions.max())
+                }
+
+    async def classify_async(self, email_content):
+        """Classify on the shared inference executor without blocking the event loop"""
+        return await get_inference_executor().run(self.classify, email_content)
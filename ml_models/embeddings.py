@@ -0,0 +1,108 @@
+import logging
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from ml_models.registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def load_sentence_encoder(model_name: str, num_labels: Optional[int] = None) -> Tuple[Any, Any]:
+    """Load a (model, tokenizer) pair for mean-pooled sentence embeddings"""
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    return model, tokenizer
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class TextEmbedder:
+    """Unit-length float32 sentence embeddings for batches of texts.
+
+    With a model name the encoder comes from the model registry and token
+    states are mean-pooled. Without one (or if it cannot be loaded) texts
+    are embedded with a hashed bag of words and word pairs, which needs no
+    weights and still scores lexically similar texts close together.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, dim: int = 384, max_length: int = 256):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.handle = None
+        self._hashing = None
+        self._dim = dim
+        if model_name:
+            self.handle = get_model_registry().acquire(model_name, loader=load_sentence_encoder, variant="embedding")
+
+    @classmethod
+    def from_settings(cls) -> 'TextEmbedder':
+        return cls(model_name=settings.EMBEDDING_MODEL_NAME, dim=settings.EMBEDDING_DIM)
+
+    @property
+    def dim(self) -> int:
+        if self.handle is not None:
+            return self.handle.model.config.hidden_size
+        return self._dim
+
+    @property
+    def semantic(self) -> bool:
+        """False while texts are only hashed: scores then reflect shared words, not meaning"""
+        return self.handle is not None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self.handle is not None:
+            try:
+                return self._encode(list(texts))
+            except Exception as e:
+                logger.error(f"Could not embed with {self.model_name}, falling back to hashing: {str(e)}")
+                self.handle.release()
+                self.handle = None
+        return self._hash(list(texts))
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        import torch
+
+        inputs = self.handle.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="pt"
+        )
+        with torch.no_grad():
+            states = self.handle.model(**inputs).last_hidden_state
+        mask = inputs['attention_mask'].unsqueeze(-1).to(states.dtype)
+        pooled = (states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return normalize_rows(pooled.numpy().astype(np.float32))
+
+    def _hash(self, texts: List[str]) -> np.ndarray:
+        if self._hashing is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            self._hashing = HashingVectorizer(
+                n_features=self._dim,
+                ngram_range=(1, 2),
+                alternate_sign=False,
+                norm='l2'
+            )
+        return self._hashing.transform(texts).toarray().astype(np.float32)
+
+
+_embedder: Optional[TextEmbedder] = None
+
+
+def get_text_embedder() -> TextEmbedder:
+    """Return the process-wide text embedder"""
+    global _embedder
+    if _embedder is None:
+        _embedder = TextEmbedder.from_settings()
+    return _embedder
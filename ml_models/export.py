@@ -0,0 +1,100 @@
+"""Export classifier models for the int8 and ONNX inference backends.
+
+    python -m ml_models.export --model deepseek-ai/deepseek-base --num-labels 4
+    python -m ml_models.export --model bert-base-uncased --parity-only
+
+Export writes ``model.onnx`` plus the tokenizer and config to
+``onnx_export_dir(model, num_labels)`` and then runs a parity check of
+every available backend against eager fp32 on the sample emails. The
+ONNX backend additionally requires ``onnxruntime`` to be installed.
+"""
+import argparse
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from data.sample_data import SAMPLE_EMAILS
+from ml_models.backends import BACKENDS, create_backend, onnx_export_dir
+from ml_models.registry import load_sequence_classifier
+
+logger = logging.getLogger(__name__)
+
+
+def export_onnx(model_name: str, num_labels: Optional[int] = None, opset: int = 14) -> str:
+    """Export a sequence classifier to ONNX with dynamic batch and sequence axes"""
+    import torch
+
+    model, tokenizer = load_sequence_classifier(model_name, num_labels)
+    output_dir = onnx_export_dir(model_name, num_labels)
+    os.makedirs(output_dir, exist_ok=True)
+
+    dummy = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            os.path.join(output_dir, "model.onnx"),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+    logger.info(f"Exported {model_name} to {output_dir}")
+    return output_dir
+
+
+def parity_check(
+    model_name: str,
+    num_labels: Optional[int],
+    texts: List[str],
+    backends: List[str]
+) -> Dict[str, Dict[str, float]]:
+    """Compare each backend's predictions with eager fp32 on ``texts``"""
+    reference = create_backend(model_name, num_labels, backend="torch").predict_proba(texts)
+    report = {}
+    for backend in backends:
+        if backend == "torch":
+            continue
+        try:
+            probabilities = create_backend(model_name, num_labels, backend=backend).predict_proba(texts)
+        except Exception as e:
+            logger.error(f"Parity check skipped for {backend}: {str(e)}")
+            continue
+        report[backend] = {
+            'label_agreement': float(np.mean(probabilities.argmax(axis=1) == reference.argmax(axis=1))),
+            'max_probability_drift': float(np.abs(probabilities - reference).max())
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export classifier inference artifacts")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--num-labels", type=int, default=None)
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--parity-only", action="store_true", help="skip export, only compare backends")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.parity_only:
+        export_onnx(args.model, args.num_labels, opset=args.opset)
+
+    texts = [f"{email['subject']}\n\n{email['body']}" for email in SAMPLE_EMAILS]
+    report = parity_check(args.model, args.num_labels, texts, list(BACKENDS))
+    for backend, result in report.items():
+        print(
+            f"{backend:>10}: label agreement {result['label_agreement']:.1%}, "
+            f"max probability drift {result['max_probability_drift']:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
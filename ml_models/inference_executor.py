@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config.settings import settings
+
+try:
+    import torch
+except ImportError:  # sklearn-only workers do not ship torch
+    torch = None
+
+logger = logging.getLogger(__name__)
+
+
+def _limit_intra_op_threads(num_threads: int):
+    """Cap torch's intra-op parallelism so pool workers don't oversubscribe cores"""
+    if torch is not None and num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+
+class InferenceExecutor:
+    """Runs blocking model inference away from the asyncio event loop.
+
+    Torch forward passes release the GIL, so they go to a small thread pool
+    that shares the already loaded models.
+    """
+
+    def __init__(
+        self,
+        thread_workers: int = 2,
+        intra_op_threads: int = 2
+    ):
+        self.intra_op_threads = intra_op_threads
+        self._thread_pool = ThreadPoolExecutor(
+            max_workers=thread_workers,
+            thread_name_prefix="inference"
+        )
+        # torch.set_num_threads is process-wide, so set it once here
+        _limit_intra_op_threads(intra_op_threads)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` on the inference thread pool and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._thread_pool,
+            functools.partial(fn, *args, **kwargs)
+        )
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the thread pool"""
+        self._thread_pool.shutdown(wait=wait)
+
+
+_executor: Optional[InferenceExecutor] = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Return the process-wide inference executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = InferenceExecutor(
+            thread_workers=settings.INFERENCE_THREAD_WORKERS,
+            intra_op_threads=settings.INFERENCE_INTRA_OP_THREADS
+        )
+        logger.info(f"Inference executor started with {settings.INFERENCE_THREAD_WORKERS} threads")
+    return _executor
+
+
+def shutdown_inference_executor(wait: bool = True):
+    """Shut down the shared executor, e.g. on application shutdown"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
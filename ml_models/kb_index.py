@@ -0,0 +1,401 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import settings
+from ml_models.batching import iter_chunks
+from ml_models.embeddings import TextEmbedder, get_text_embedder, normalize_rows
+from ml_models.inference_executor import get_inference_executor
+from monitoring.metrics import kb_index_articles, kb_index_refreshes
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.bin"
+MANIFEST_FILE = "manifest.json"
+IVF_FILE = "ivf.npz"
+
+
+@dataclass
+class _Snapshot:
+    """Immutable view of the index that queries read while a refresh runs"""
+    vectors: np.ndarray
+    row_ids: List[Optional[str]]
+    articles: Dict[str, Dict[str, Any]]
+    alive: np.ndarray
+    centroids: Optional[np.ndarray] = None
+    lists: Optional[List[np.ndarray]] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.articles)
+
+
+class KnowledgeBaseIndex:
+    """In-process vector index over the support knowledge base.
+
+    Article embeddings live in a memory-mapped matrix under ``path``, one
+    row per article version; updated articles append a new row and retire
+    the old one, and the file is compacted once a quarter of it is dead.
+    Queries score every row with one matrix product, or with ``ivf_lists``
+    set, only the rows in the ``ivf_probes`` clusters nearest the query.
+
+    ``source`` is the remote knowledge base: ``refresh()`` pulls changes
+    from ``source.list_articles(updated_since=cursor)`` (articles carry
+    ``id``, ``content``, ``updated_at`` and optionally ``title`` and
+    ``deleted``) and swaps in a new snapshot, so queries never wait for it.
+    Until the index holds any article, and whenever the embedder only
+    hashes words (those scores stay far below the usual relevance
+    cut-offs), searches go to ``source.search``.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        path: str,
+        embedder: Optional[TextEmbedder] = None,
+        dtype: str = "float16",
+        update_interval: float = 3600,
+        ivf_lists: int = 0,
+        ivf_probes: int = 8,
+        ivf_min_rows: int = 10000,
+        block_rows: int = 65536
+    ):
+        self.source = source
+        self.path = path
+        self.embedder = embedder or get_text_embedder()
+        self.dtype = np.dtype(dtype)
+        self.update_interval = update_interval
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self.ivf_min_rows = ivf_min_rows
+        self.block_rows = block_rows
+
+        self._write_lock = threading.Lock()
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def from_settings(cls, source: Any) -> 'KnowledgeBaseIndex':
+        return cls(
+            source,
+            settings.KB_INDEX_PATH,
+            dtype=settings.KB_INDEX_DTYPE,
+            update_interval=settings.KB_UPDATE_INTERVAL,
+            ivf_lists=settings.KB_INDEX_IVF_LISTS,
+            ivf_probes=settings.KB_INDEX_IVF_PROBES,
+            ivf_min_rows=settings.KB_INDEX_IVF_MIN_ROWS
+        )
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 3,
+        min_relevance: float = 0.7,
+        embedding: Optional[Sequence[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Articles most similar to ``query``, best first, each with its ``relevance``.
+
+        Pass the query's ``embedding`` when it is already known to skip embedding it again.
+        """
+        embeddings = [embedding] if embedding is not None else None
+        return (await self.search_many([query], limit, min_relevance, embeddings))[0]
+
+    async def search_many(
+        self,
+        queries: Sequence[str],
+        limit: int = 3,
+        min_relevance: float = 0.7,
+        embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        if not self._snapshot.size or not self.embedder.semantic:
+            return [await self.source.search(query=query, limit=limit, min_relevance=min_relevance) for query in queries]
+        executor = get_inference_executor()
+        if embeddings is not None:
+            query_vectors = np.asarray(embeddings, dtype=np.float32)
+        else:
+            query_vectors = await executor.run(self.embedder.embed, list(queries))
+        return await executor.run(self.top_k, query_vectors, limit, min_relevance)
+
+    def top_k(self, query_vectors: np.ndarray, limit: int, min_relevance: float) -> List[List[Dict[str, Any]]]:
+        """Top ``limit`` articles per query vector (unit length) in the current snapshot"""
+        snapshot = self._snapshot
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        if not snapshot.size:
+            return [[] for _ in range(len(query_vectors))]
+        if snapshot.centroids is not None:
+            return [self._probe(snapshot, vector, limit, min_relevance) for vector in query_vectors]
+
+        scores = np.empty((len(snapshot.row_ids), len(query_vectors)), dtype=np.float32)
+        for start in range(0, len(snapshot.row_ids), self.block_rows):
+            block = np.asarray(snapshot.vectors[start:start + self.block_rows], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query_vectors.T
+        scores[~snapshot.alive] = -np.inf
+        return [
+            self._best(snapshot, np.arange(len(scores)), scores[:, column], limit, min_relevance)
+            for column in range(scores.shape[1])
+        ]
+
+    async def refresh(self) -> int:
+        """Pull changed articles from the source; returns how many were applied"""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            try:
+                changes = await self.source.list_articles(updated_since=self._cursor)
+                applied = 0
+                if changes:
+                    # Embedding and disk writes stay off the event loop
+                    applied = await asyncio.get_running_loop().run_in_executor(None, self.apply, changes)
+                kb_index_refreshes.labels(result='success').inc()
+                return applied
+            except Exception:
+                kb_index_refreshes.labels(result='error').inc()
+                raise
+
+    def apply(self, changes: Sequence[Dict[str, Any]]) -> int:
+        """Add, replace or delete articles and publish a new snapshot"""
+        with self._write_lock:
+            changes = {str(article['id']): article for article in changes}
+            for article_id in changes:
+                row = self._rows_by_id.pop(article_id, None)
+                if row is not None:
+                    self._row_ids[row] = None
+                    self._articles.pop(article_id, None)
+
+            added = [article for article in changes.values() if not article.get('deleted')]
+            for batch in iter_chunks(added, 64):
+                vectors = self.embedder.embed([self._text(article) for article in batch])
+                self._append(vectors, [str(article['id']) for article in batch])
+                for article in batch:
+                    self._articles[str(article['id'])] = {k: v for k, v in article.items() if k != 'deleted'}
+
+            stamps = [article['updated_at'] for article in changes.values() if article.get('updated_at') is not None]
+            if stamps:
+                self._cursor = max(stamps + ([self._cursor] if self._cursor is not None else []))
+
+            dead = self._row_ids.count(None)
+            if dead and dead * 4 >= len(self._row_ids):
+                self._compact()
+            self._maybe_train_ivf()
+            self._save_manifest()
+            self._publish()
+            logger.info(f"Knowledge base index applied {len(changes)} changes ({len(self._articles)} articles)")
+            return len(changes)
+
+    def start(self):
+        """Refresh now and then every ``update_interval`` seconds in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            'articles': snapshot.size,
+            'rows': len(snapshot.row_ids),
+            'ivf_lists': 0 if snapshot.centroids is None else len(snapshot.centroids),
+            'cursor': self._cursor
+        }
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Knowledge base index refresh failed: {str(e)}")
+            await asyncio.sleep(self.update_interval)
+
+    def _probe(self, snapshot: _Snapshot, vector: np.ndarray, limit: int, min_relevance: float) -> List[Dict[str, Any]]:
+        nearest = np.argsort(-(snapshot.centroids @ vector))[:self.ivf_probes]
+        rows = np.concatenate([snapshot.lists[cluster] for cluster in nearest])
+        if not len(rows):
+            return []
+        rows.sort()
+        scores = np.asarray(snapshot.vectors[rows], dtype=np.float32) @ vector
+        return self._best(snapshot, rows, scores, limit, min_relevance)
+
+    def _best(
+        self,
+        snapshot: _Snapshot,
+        rows: np.ndarray,
+        scores: np.ndarray,
+        limit: int,
+        min_relevance: float
+    ) -> List[Dict[str, Any]]:
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        results = []
+        for position in top[np.argsort(-scores[top])]:
+            score = float(scores[position])
+            if score < min_relevance:
+                break
+            article_id = snapshot.row_ids[rows[position]]
+            results.append({**snapshot.articles[article_id], 'relevance': round(score, 4)})
+        return results
+
+    def _text(self, article: Dict[str, Any]) -> str:
+        return f"{article.get('title', '')}\n{article.get('content', '')}".strip()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        self._row_ids: List[Optional[str]] = []
+        self._articles: Dict[str, Dict[str, Any]] = {}
+        self._cursor = None
+        self._dim: Optional[int] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_rows = 0
+
+        if os.path.exists(self._file(MANIFEST_FILE)):
+            with open(self._file(MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+            if manifest['dtype'] != self.dtype.name or manifest['dim'] != self.embedder.dim:
+                logger.info("Knowledge base index was built with another embedder, rebuilding")
+            else:
+                self._dim = manifest['dim']
+                self._row_ids = manifest['rows']
+                self._articles = manifest['articles']
+                self._cursor = manifest['cursor']
+                if os.path.exists(self._file(IVF_FILE)):
+                    ivf = np.load(self._file(IVF_FILE))
+                    if len(ivf['assignments']) == len(self._row_ids):
+                        self._centroids = ivf['centroids']
+                        self._assignments = ivf['assignments']
+                        self._trained_rows = int(ivf['trained_rows'])
+
+        if self._dim is None:
+            self._dim = self.embedder.dim
+            open(self._file(VECTORS_FILE), 'wb').close()
+        self._rows_by_id = {article_id: row for row, article_id in enumerate(self._row_ids) if article_id is not None}
+        self._publish()
+
+    def _append(self, vectors: np.ndarray, article_ids: List[str]):
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32)).astype(self.dtype)
+        with open(self._file(VECTORS_FILE), 'r+b') as f:
+            # Rows past the manifest belong to a write that never committed
+            f.truncate(len(self._row_ids) * self._row_bytes)
+            f.seek(0, os.SEEK_END)
+            f.write(vectors.tobytes())
+        start = len(self._row_ids)
+        self._row_ids.extend(article_ids)
+        for offset, article_id in enumerate(article_ids):
+            self._rows_by_id[article_id] = start + offset
+        if self._centroids is not None:
+            assignments = np.argmax(vectors.astype(np.float32) @ self._centroids.T, axis=1).astype(np.int32)
+            self._assignments = np.concatenate([self._assignments, assignments])
+
+    def _compact(self):
+        live = [row for row, article_id in enumerate(self._row_ids) if article_id is not None]
+        vectors = np.asarray(self._map(len(self._row_ids))[live]) if live else np.zeros((0, self._dim), self.dtype)
+        temp = self._file(VECTORS_FILE + ".tmp")
+        with open(temp, 'wb') as f:
+            f.write(vectors.tobytes())
+        # Snapshots still reading the old file keep their mapping of it
+        os.replace(temp, self._file(VECTORS_FILE))
+        self._row_ids = [self._row_ids[row] for row in live]
+        self._rows_by_id = {article_id: row for row, article_id in enumerate(self._row_ids)}
+        if self._centroids is not None:
+            self._assignments = self._assignments[live]
+
+    def _maybe_train_ivf(self):
+        rows = len(self._row_ids)
+        if not self.ivf_lists or rows < max(self.ivf_min_rows, self.ivf_lists):
+            self._centroids = None
+            self._assignments = np.zeros(0, dtype=np.int32)
+            return
+        if self._centroids is not None and rows < 2 * self._trained_rows:
+            return
+
+        vectors = self._map(rows)
+        rng = np.random.RandomState(0)
+        sample = np.asarray(vectors[np.sort(rng.choice(rows, min(rows, 256 * self.ivf_lists), replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), self.ivf_lists, replace=False)]
+        # Spherical k-means: vectors and centroids stay unit length
+        for _ in range(10):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(self.ivf_lists):
+                members = sample[labels == cluster]
+                if len(members):
+                    centroids[cluster] = members.sum(axis=0)
+            centroids = normalize_rows(centroids)
+
+        assignments = np.empty(rows, dtype=np.int32)
+        for start in range(0, rows, self.block_rows):
+            block = np.asarray(vectors[start:start + self.block_rows], dtype=np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        self._centroids = centroids.astype(np.float32)
+        self._assignments = assignments
+        self._trained_rows = rows
+
+    def _save_manifest(self):
+        manifest = {
+            'dim': self._dim,
+            'dtype': self.dtype.name,
+            'cursor': self._cursor,
+            'rows': self._row_ids,
+            'articles': self._articles
+        }
+        temp = self._file(MANIFEST_FILE + ".tmp")
+        with open(temp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temp, self._file(MANIFEST_FILE))
+        if self._centroids is not None:
+            with open(self._file(IVF_FILE), 'wb') as f:
+                np.savez(
+                    f,
+                    centroids=self._centroids,
+                    assignments=self._assignments,
+                    trained_rows=self._trained_rows
+                )
+        elif os.path.exists(self._file(IVF_FILE)):
+            os.remove(self._file(IVF_FILE))
+
+    @property
+    def _row_bytes(self) -> int:
+        return self._dim * self.dtype.itemsize
+
+    def _map(self, rows: int) -> np.ndarray:
+        if not rows:
+            return np.zeros((0, self._dim), dtype=self.dtype)
+        return np.memmap(self._file(VECTORS_FILE), dtype=self.dtype, mode='r', shape=(rows, self._dim))
+
+    def _publish(self):
+        rows = len(self._row_ids)
+        alive = np.array([article_id is not None for article_id in self._row_ids], dtype=bool)
+        lists = None
+        if self._centroids is not None:
+            live_rows = np.flatnonzero(alive)
+            labels = self._assignments[live_rows]
+            order = np.argsort(labels, kind='stable')
+            bounds = np.searchsorted(labels[order], np.arange(len(self._centroids) + 1))
+            lists = [live_rows[order[bounds[i]:bounds[i + 1]]] for i in range(len(self._centroids))]
+        self._snapshot = _Snapshot(
+            vectors=self._map(rows),
+            row_ids=list(self._row_ids),
+            articles=dict(self._articles),
+            alive=alive,
+            centroids=self._centroids,
+            lists=lists
+        )
+        kb_index_articles.set(len(self._articles))
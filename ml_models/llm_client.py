@@ -0,0 +1,330 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from config.settings import settings
+from ml_models.batching import estimate_token_length
+from monitoring.metrics import llm_request_duration, llm_requests, llm_rate_limit_wait
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """A completion request that failed for good (after any retries).
+
+    ``transient`` is True when the last attempt failed for a reason that may
+    clear up later (timeout, 429, 5xx) rather than a rejected request.
+    """
+
+    transient = False
+
+
+class _Retryable(Exception):
+    """Internal: a failed attempt that may be retried"""
+
+    def __init__(self, error: LLMError, retry_after: Optional[float] = None):
+        super().__init__(str(error))
+        error.transient = True
+        self.error = error
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Per-minute rate limiter.
+
+    Callers reserve their cost up front, driving the balance negative if
+    needed, and sleep until the refill covers it. Reservations therefore
+    queue in arrival order without a lock.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens, waiting for the refill; returns seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def refund(self, amount: float):
+        """Give back an over-estimate once the real cost is known"""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class LLMClient:
+    """Shared async client for the completion API.
+
+    One keep-alive connection pool serves every responder agent. Calls are
+    capped at ``max_concurrency`` in flight (streams until their headers
+    arrive), paced by requests-per-minute
+    and tokens-per-minute buckets, bounded by a per-call timeout and
+    retried with full-jitter exponential backoff on 429, 5xx and
+    transport errors (honouring ``Retry-After``).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        model: str = "deepseek-r1",
+        max_connections: int = 20,
+        max_concurrency: int = 8,
+        requests_per_minute: float = 60,
+        tokens_per_minute: float = 100000,
+        timeout: float = 60.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.transport = transport
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+        # The pool and semaphore belong to one event loop; rebuilt if the loop changes
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_settings(cls) -> 'LLMClient':
+        return cls(
+            settings.LLM_API_BASE,
+            api_key=settings.LLM_API_KEY,
+            model=settings.RESPONSE_MODEL_NAME,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            max_retries=settings.LLM_MAX_RETRIES,
+            backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+            backoff_max=settings.LLM_BACKOFF_MAX_SECONDS
+        )
+
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Return the completion text for ``prompt``"""
+        payload = self._payload(prompt, max_tokens, temperature, model)
+        client, semaphore = await self._bind_loop()
+
+        attempt = 0
+        while True:
+            # Every attempt, retries included, is paced: a 429 is exactly when the budget matters
+            estimated_tokens = await self._wait_for_budget(payload)
+            start = time.monotonic()
+            try:
+                async with semaphore:
+                    response = await client.post('/v1/completions', json=payload, timeout=timeout or self.timeout)
+                llm_request_duration.observe(time.monotonic() - start)
+                self._check_status(response)
+                llm_requests.labels(outcome='success').inc()
+                data = response.json()
+                self._settle_tokens(data, estimated_tokens)
+                return data['choices'][0]['text'].strip()
+            except _Retryable as retryable:
+                attempt = await self._backoff(attempt, retryable)
+            except httpx.TransportError as e:
+                # Timeouts, refused and reset connections
+                attempt = await self._backoff(attempt, self._transport_failure(e))
+
+    async def stream(
+        self,
+        prompt: str,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Yield completion text as the server streams it (``stream: true`` SSE).
+
+        Failures are retried only until the first chunk arrives; after that
+        a retry would repeat text the caller has already seen. ``timeout``
+        bounds the wait for each chunk rather than the whole generation.
+        The concurrency slot is held only until the response headers arrive.
+        """
+        payload = self._payload(prompt, max_tokens, temperature, model)
+        payload['stream'] = True
+        client, semaphore = await self._bind_loop()
+
+        attempt = 0
+        while True:
+            await self._wait_for_budget(payload)
+            start = time.monotonic()
+            await semaphore.acquire()
+            holding = True
+            try:
+                try:
+                    async with client.stream(
+                        'POST', '/v1/completions', json=payload, timeout=timeout or self.timeout
+                    ) as response:
+                        if response.status_code >= 400:
+                            await response.aread()
+                        self._check_status(response)
+                        # The slot is free once the stream is accepted, so a slow reader never holds it
+                        semaphore.release()
+                        holding = False
+                        async for line in response.aiter_lines():
+                            if not line.startswith('data:'):
+                                continue
+                            data = line[5:].strip()
+                            if data == '[DONE]':
+                                break
+                            text = json.loads(data)['choices'][0].get('text')
+                            if text:
+                                attempt = None
+                                yield text
+                finally:
+                    if holding:
+                        semaphore.release()
+                llm_request_duration.observe(time.monotonic() - start)
+                llm_requests.labels(outcome='success').inc()
+                return
+            except _Retryable as retryable:
+                attempt = await self._backoff(attempt, retryable)
+            except httpx.TransportError as e:
+                # Timeouts, refused and reset connections
+                attempt = await self._backoff(attempt, self._transport_failure(e))
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def _payload(self, prompt: str, max_tokens: int, temperature: float, model: Optional[str]) -> Dict[str, Any]:
+        return {
+            'model': model or self.model,
+            'prompt': prompt,
+            'max_tokens': max_tokens,
+            'temperature': temperature
+        }
+
+    async def _wait_for_budget(self, payload: Dict[str, Any]) -> int:
+        estimated_tokens = estimate_token_length(payload['prompt']) + payload['max_tokens']
+        waited = await self.request_bucket.acquire(1)
+        waited += await self.token_bucket.acquire(estimated_tokens)
+        if waited:
+            llm_rate_limit_wait.observe(waited)
+        return estimated_tokens
+
+    def _check_status(self, response: httpx.Response):
+        if response.status_code < 400:
+            return
+        if response.status_code not in RETRYABLE_STATUS:
+            llm_requests.labels(outcome='error').inc()
+            raise LLMError(f"Completion request failed with HTTP {response.status_code}: {response.text[:200]}")
+        raise _Retryable(
+            LLMError(f"Completion request failed with HTTP {response.status_code}"),
+            self._retry_after(response)
+        )
+
+    def _transport_failure(self, error: httpx.TransportError) -> _Retryable:
+        return _Retryable(LLMError(f"Completion request failed: {error.__class__.__name__}: {str(error)}"))
+
+    async def _backoff(self, attempt: Optional[int], retryable: '_Retryable') -> int:
+        """Sleep before the next attempt, or raise once retries are used up.
+
+        ``attempt`` is None once a stream has yielded text: never retried.
+        """
+        if attempt is None or attempt >= self.max_retries:
+            llm_requests.labels(outcome='error').inc()
+            raise retryable.error
+        attempt += 1
+        llm_requests.labels(outcome='retry').inc()
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retryable.retry_after is not None:
+            delay = max(delay, retryable.retry_after)
+        logger.warning(f"{str(retryable.error)}; retry {attempt}/{self.max_retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+        return attempt
+
+    async def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            stale, stale_loop = self._client, self._loop
+            self._loop = loop
+            headers = {'Authorization': f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                transport=self.transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            if stale is not None:
+                await self._close_stale(stale, stale_loop)
+        return self._client, self._semaphore
+
+    async def _close_stale(self, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
+        """Close the pool left behind on another event loop"""
+        if loop.is_running() and not loop.is_closed():
+            # Its connections belong to that loop, so close it there
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        try:
+            await client.aclose()
+        except Exception as e:
+            # Sockets of a closed loop cannot be shut down cleanly; the pool is marked closed anyway
+            logger.debug(f"Discarded the connection pool of a closed event loop: {str(e)}")
+
+    def _settle_tokens(self, data: Dict[str, Any], estimated_tokens: int):
+        used = (data.get('usage') or {}).get('total_tokens')
+        if used is not None and used < estimated_tokens:
+            self.token_bucket.refund(estimated_tokens - used)
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return None
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide client shared by every responder agent"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient.from_settings()
+    return _llm_client
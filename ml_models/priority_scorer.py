@@ -0,0 +1,163 @@
+import re
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from src.utils.helpers import load_config
+
+_WORD_BOUNDARY = re.compile(r'\b')
+_SEPARATOR = '\x00'
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Build a prefix-factored regex alternation from a set of words.
+
+    ``urgent|update|fyi`` becomes ``u(?:rgent|pdate)|fyi``, so the regex
+    engine walks each position of the text against a trie instead of
+    retrying every keyword, which makes the scan a single pass in C.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node: Dict[str, Any]) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if terminal else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """Finds which of a set of keywords occur in a text.
+
+    Without ``word_boundary`` this agrees with ``keyword in text`` for every
+    keyword, overlapping and nested ones included. Small keyword sets (up to
+    ``max_substring_keywords``) are checked with one C substring scan per
+    keyword, which beats any single-pass matcher at that size; larger sets,
+    and word-boundary matching, use one trie-compiled regex pass.
+    """
+
+    def __init__(self, keywords: Iterable[str], word_boundary: bool = False, max_substring_keywords: int = 48):
+        self.keywords = sorted({keyword.lower() for keyword in keywords})
+        self.word_boundary = word_boundary
+        self.use_regex = word_boundary or len(self.keywords) > max_substring_keywords
+        self._regex = None
+        if self.use_regex and self.keywords:
+            pattern = _trie_pattern(self.keywords)
+            if word_boundary:
+                # \b is noticeably cheaper than lookarounds in the sre engine
+                pattern = r'\b(?:' + pattern + r')\b'
+            # The trie is greedy, so each position yields its longest keyword; the
+            # lookahead consumes nothing, so overlapping keywords are all visited
+            self._regex = re.compile('(?=(' + pattern + '))')
+        # Shorter keywords starting at the same position are prefixes of the longest one
+        self._prefixes = {
+            keyword: [other for other in self.keywords if keyword.startswith(other)]
+            for keyword in self.keywords
+        }
+
+    def find(self, text: str) -> Set[str]:
+        """Return the distinct keywords present in ``text`` (case-insensitive)"""
+        if not self.keywords:
+            return set()
+        lowered = text.lower()
+        if not self.use_regex:
+            return {keyword for keyword in self.keywords if keyword in lowered}
+        return self._scan([lowered])[0]
+
+    def find_many(self, texts: Sequence[str]) -> List[Set[str]]:
+        """``find`` for every text; repeated texts are matched once.
+
+        With the regex, the distinct texts are scanned as one NUL-separated
+        buffer (NUL never occurs in a keyword, so no match spans two texts).
+        The substring scan gains nothing from a joined buffer, so it runs per text.
+        """
+        lowered = [text.lower() for text in texts]
+        distinct = list(dict.fromkeys(lowered))
+        if not self.keywords:
+            matches = [set() for _ in distinct]
+        elif not self.use_regex:
+            matches = [{keyword for keyword in self.keywords if keyword in text} for text in distinct]
+        else:
+            matches = self._scan(distinct)
+        by_text = dict(zip(distinct, matches))
+        return [set(by_text[text]) for text in lowered]
+
+    def _scan(self, texts: List[str]) -> List[Set[str]]:
+        # Offsets come from the lowered texts, whose length can differ from the originals
+        buffer = _SEPARATOR.join(texts)
+        starts = []
+        position = 0
+        for text in texts:
+            starts.append(position)
+            position += len(text) + 1
+
+        longest_per_text: List[Set[str]] = [set() for _ in texts]
+        for match in self._regex.finditer(buffer):
+            longest_per_text[bisect_right(starts, match.start()) - 1].add(match.group(1))
+
+        found: List[Set[str]] = [set() for _ in texts]
+        for index, longest_matches in enumerate(longest_per_text):
+            for longest in longest_matches:
+                for keyword in self._prefixes[longest]:
+                    if not self.word_boundary or keyword == longest or _WORD_BOUNDARY.match(longest, len(keyword)):
+                        found[index].add(keyword)
+        return found
+
+
+class PriorityScorer:
+    """Weighted keyword rules for email priority, compiled once.
+
+    Each priority level owns a set of keywords with weights. A keyword
+    contributes its weight once if it appears anywhere in the text, and the
+    level with the highest total wins.
+    """
+
+    def __init__(
+        self,
+        levels: List[str],
+        keyword_weights: Dict[str, Dict[str, float]],
+        word_boundary: bool = False
+    ):
+        self.levels = levels
+        self.word_boundary = word_boundary
+        self._weights: Dict[str, List[tuple]] = {}
+        for level, words in keyword_weights.items():
+            for word, weight in words.items():
+                self._weights.setdefault(word.lower(), []).append((level, float(weight)))
+        self.matcher = KeywordMatcher(self._weights, word_boundary=word_boundary)
+
+    @classmethod
+    def from_config(cls, levels: List[str], config: Optional[Dict[str, Any]] = None) -> 'PriorityScorer':
+        """Build a scorer from the ``priority_rules`` section of config.yaml"""
+        rules = (config or load_config())['priority_rules']
+        return cls(levels, rules['keywords'], word_boundary=rules.get('word_boundary', False))
+
+    def score(self, text: str) -> Dict[str, Any]:
+        """Score one text and return its priority and confidence"""
+        return self._score_keywords(self.matcher.find(text))
+
+    def score_many(self, texts: Iterable[str]) -> List[Dict[str, Any]]:
+        """Score many texts with one matcher scan over the whole batch"""
+        return [self._score_keywords(keywords) for keywords in self.matcher.find_many(list(texts))]
+
+    def _score_keywords(self, keywords: Set[str]) -> Dict[str, Any]:
+        scores = {level: 0.0 for level in self.levels}
+        for keyword in keywords:
+            for level, weight in self._weights[keyword]:
+                scores[level] += weight
+
+        max_priority = max(scores.items(), key=lambda x: x[1])
+        total = sum(scores.values())
+        return {
+            'priority': max_priority[0],
+            'confidence': max_priority[1] / total if total > 0 else 0.5
+        }
@@ -0,0 +1,246 @@
+import functools
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+from ml_models.batching import estimate_token_length
+from monitoring.metrics import prompt_tokens_saved
+
+logger = logging.getLogger(__name__)
+
+TRIM_MARKER = " [...] "
+MIN_TRIMMED_ARTICLE_TOKENS = 32
+# Characters per token assumed by the estimate, and the most any real token is taken to span
+CHARS_PER_TOKEN = 4
+MAX_CHARS_PER_TOKEN = 16
+_WORD = re.compile(r"\w+")
+
+Span = Tuple[int, int]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_tokenizer(name: str):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(name)
+
+
+class TokenCounter:
+    """Token counts and spans from a cached tokenizer.
+
+    Counts are memoised for the ``cache_size`` most recent texts, keyed by
+    a digest so that long bodies are not kept alive by the cache. Without
+    a tokenizer name (or if it cannot be loaded) counts fall back to the
+    same characters-per-token estimate the batcher uses.
+    """
+
+    def __init__(self, tokenizer_name: Optional[str] = None, cache_size: int = 4096):
+        self.tokenizer = None
+        if tokenizer_name:
+            try:
+                self.tokenizer = _load_tokenizer(tokenizer_name)
+            except Exception as e:
+                logger.error(f"Could not load tokenizer {tokenizer_name}, estimating token counts: {str(e)}")
+        self.cache_size = cache_size
+        self._counts: 'OrderedDict[bytes, int]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                return count
+        count = self._count(text)
+        with self._lock:
+            self._counts[key] = count
+            while len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
+        return count
+
+    def spans(self, text: str) -> List[Span]:
+        """(start, end) character offsets of every token in ``text``"""
+        if self.tokenizer is None:
+            return [(start, min(start + CHARS_PER_TOKEN, len(text))) for start in range(0, len(text), CHARS_PER_TOKEN)]
+        return list(self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping'])
+
+    def _count(self, text: str) -> int:
+        if self.tokenizer is None:
+            return estimate_token_length(text)
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+
+@dataclass
+class BuiltPrompt:
+    """Trimmed prompt sections plus what trimming them saved"""
+    email: str = ''
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    articles: List[Dict[str, Any]] = field(default_factory=list)
+    original_tokens: Dict[str, int] = field(default_factory=dict)
+    kept_tokens: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def tokens_saved(self) -> int:
+        return sum(self.original_tokens.values()) - sum(self.kept_tokens.values())
+
+
+class PromptBuilder:
+    """Fits the email, conversation history and KB articles into per-section token budgets.
+
+    The email keeps its opening and closing lines. History always keeps
+    the ``keep_recent_turns`` latest messages verbatim, then adds older
+    ones by relevance to the email, discounted by age. KB articles are
+    taken in order of relevance; the first one that no longer fits is cut
+    down to the remaining budget.
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, int]] = None,
+        keep_recent_turns: int = 2,
+        counter: Optional[TokenCounter] = None,
+        head_fraction: float = 0.75,
+        recency_decay: float = 0.85
+    ):
+        self.budgets = {'email': 1000, 'history': 1200, 'kb': 1500}
+        self.budgets.update(budgets or {})
+        self.keep_recent_turns = keep_recent_turns
+        self.counter = counter or TokenCounter()
+        self.head_fraction = head_fraction
+        self.recency_decay = recency_decay
+
+    @classmethod
+    def from_settings(cls) -> 'PromptBuilder':
+        return cls(
+            budgets=settings.PROMPT_TOKEN_BUDGETS,
+            keep_recent_turns=settings.PROMPT_KEEP_RECENT_TURNS,
+            counter=TokenCounter(settings.PROMPT_TOKENIZER_NAME)
+        )
+
+    def build(
+        self,
+        prompt: str,
+        email: str,
+        history: Sequence[Dict[str, Any]] = (),
+        articles: Sequence[Dict[str, Any]] = ()
+    ) -> BuiltPrompt:
+        """Trim each section to its budget; ``history`` is newest first"""
+        built = BuiltPrompt()
+        built.email, built.original_tokens['email'], built.kept_tokens['email'] = self._trim_text(
+            email or '',
+            self.budgets['email']
+        )
+
+        if history:
+            built.history = self._select_history(list(history), email or '')
+            built.original_tokens['history'] = self._tokens(history)
+            built.kept_tokens['history'] = self._tokens(built.history)
+
+        if articles:
+            built.articles = self._select_articles(list(articles), email or '')
+            built.original_tokens['kb'] = self._tokens(articles)
+            built.kept_tokens['kb'] = self._tokens(built.articles)
+
+        prompt_tokens_saved.labels(prompt=prompt).observe(built.tokens_saved)
+        if built.tokens_saved:
+            logger.debug(f"{prompt} prompt trimmed by {built.tokens_saved} tokens: {built.kept_tokens}")
+        return built
+
+    def _trim_text(self, text: str, budget: int) -> Tuple[str, int, int]:
+        """Keep the head and tail of ``text`` within ``budget`` tokens.
+
+        Returns the kept text and the token counts before and after. Each
+        end is tokenized once, with character offsets; bodies too long for
+        the budget to matter are first cut to a window at either end, and
+        the tokens of the skipped middle are only estimated.
+        """
+        window = budget * MAX_CHARS_PER_TOKEN
+        if len(text) <= 2 * window:
+            head_spans = tail_spans = self.counter.spans(text)
+            if len(head_spans) <= budget:
+                return text, len(head_spans), len(head_spans)
+            tail_offset = 0
+            total = len(head_spans)
+        else:
+            head_spans = self.counter.spans(text[:window])
+            tail_offset = len(text) - window
+            tail_spans = self.counter.spans(text[tail_offset:])
+            total = len(head_spans) + len(tail_spans) + estimate_token_length(text[window:tail_offset])
+
+        marker_tokens = self.counter.count(TRIM_MARKER)
+        keep = max(budget - marker_tokens, 0)
+        head_tokens = min(int(keep * self.head_fraction), len(head_spans))
+        tail_tokens = min(keep - head_tokens, len(tail_spans))
+        head = text[:head_spans[head_tokens - 1][1]] if head_tokens else ''
+        tail = text[tail_offset + tail_spans[len(tail_spans) - tail_tokens][0]:] if tail_tokens else ''
+        return head + TRIM_MARKER + tail, total, head_tokens + marker_tokens + tail_tokens
+
+    def _select_history(self, messages: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+        budget = self.budgets['history']
+        keep = set()
+        used = 0
+        for index in range(min(self.keep_recent_turns, len(messages))):
+            keep.add(index)
+            used += self.counter.count(messages[index].get('content', ''))
+
+        query_words = self._words(query)
+        older = sorted(
+            range(len(keep), len(messages)),
+            key=lambda index: self._relevance(messages[index].get('content', ''), query_words)
+            * self.recency_decay ** index,
+            reverse=True
+        )
+        for index in older:
+            cost = self.counter.count(messages[index].get('content', ''))
+            if used + cost <= budget:
+                keep.add(index)
+                used += cost
+        # Preserve the original (newest first) order
+        return [messages[index] for index in sorted(keep)]
+
+    def _select_articles(self, articles: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+        budget = self.budgets['kb']
+        query_words = self._words(query)
+        ranked = sorted(
+            articles,
+            key=lambda article: (
+                article.get('relevance', article.get('score', 0.0)),
+                self._relevance(article.get('content', ''), query_words)
+            ),
+            reverse=True
+        )
+        selected = []
+        used = 0
+        for article in ranked:
+            remaining = budget - used
+            if remaining <= 0:
+                break
+            cost = self.counter.count(article.get('content', ''))
+            if cost > remaining:
+                if remaining < MIN_TRIMMED_ARTICLE_TOKENS:
+                    continue
+                content, _, cost = self._trim_text(article.get('content', ''), remaining)
+                article = {**article, 'content': content}
+            selected.append(article)
+            used += cost
+        return selected
+
+    def _tokens(self, items: Sequence[Dict[str, Any]]) -> int:
+        return sum(self.counter.count(item.get('content', '')) for item in items)
+
+    def _words(self, text: str) -> set:
+        return set(_WORD.findall(text.lower()))
+
+    def _relevance(self, text: str, query_words: set) -> float:
+        if not query_words:
+            return 1.0
+        words = self._words(text)
+        # Small floor so recency still orders messages that share no words
+        return len(words & query_words) / len(query_words) + 0.01
@@ -0,0 +1,195 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# (model name, label count, variant such as "fp32", "int8" or "onnx")
+ModelKey = Tuple[str, Optional[int], str]
+Loader = Callable[[str, Optional[int]], Tuple[Any, Any]]
+
+
+def load_sequence_classifier(model_name: str, num_labels: Optional[int] = None) -> Tuple[Any, Any]:
+    """Load a (model, tokenizer) pair from the Hugging Face hub or a local path"""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    kwargs = {'num_labels': num_labels} if num_labels is not None else {}
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, **kwargs)
+    model.eval()
+    return model, tokenizer
+
+
+@dataclass
+class _RegistryEntry:
+    loader: Loader
+    model: Any = None
+    tokenizer: Any = None
+    ref_count: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+
+class ModelHandle:
+    """Reference to a shared (model, tokenizer) pair.
+
+    The weights are loaded on first access to ``model`` or ``tokenizer``
+    and reloaded transparently if the registry unloaded them while idle.
+    """
+
+    def __init__(self, registry: 'ModelRegistry', key: ModelKey, loader: Loader):
+        self._registry = registry
+        self.key = key
+        self.loader = loader
+        self.released = False
+
+    @property
+    def model_name(self) -> str:
+        return self.key[0]
+
+    @property
+    def num_labels(self) -> Optional[int]:
+        return self.key[1]
+
+    @property
+    def model(self) -> Any:
+        return self._registry._get(self.key, self.loader)[0]
+
+    @property
+    def tokenizer(self) -> Any:
+        return self._registry._get(self.key, self.loader)[1]
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._registry.release(self.key)
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded transformer models.
+
+    Every (model name, label count, variant) is loaded at most once per
+    process, lazily on first use, no matter how many classifiers ask for
+    it. Handles are reference counted; models nobody holds a handle to
+    are unloaded once idle.
+    """
+
+    def __init__(self, loader: Loader = load_sequence_classifier):
+        self.default_loader = loader
+        self._entries: Dict[ModelKey, _RegistryEntry] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def acquire(
+        self,
+        model_name: str,
+        num_labels: Optional[int] = None,
+        loader: Optional[Loader] = None,
+        variant: str = "fp32"
+    ) -> ModelHandle:
+        """Register interest in a model; nothing is loaded until first use"""
+        key = (model_name, num_labels, variant)
+        loader = loader or self.default_loader
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _RegistryEntry(loader)
+            entry.ref_count += 1
+        return ModelHandle(self, key, loader)
+
+    def release(self, key: ModelKey):
+        """Drop one reference; unreferenced models become eligible for unloading"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.ref_count > 0:
+                entry.ref_count -= 1
+
+    def unload_idle(self, max_idle_seconds: float) -> List[ModelKey]:
+        """Free the weights of every unreferenced model unused for ``max_idle_seconds``"""
+        cutoff = time.monotonic() - max_idle_seconds
+        unloaded = []
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.ref_count > 0:
+                    continue
+                # A held entry lock means the model is being loaded or read right now
+                if not entry.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if entry.last_used > cutoff:
+                        continue
+                    del self._entries[key]
+                    if entry.loaded:
+                        entry.model = None
+                        entry.tokenizer = None
+                        unloaded.append(key)
+                finally:
+                    entry.lock.release()
+        for model_name, num_labels, variant in unloaded:
+            logger.info(f"Unloaded idle model {model_name} ({variant}, num_labels={num_labels})")
+        return unloaded
+
+    def start_reaper(self, max_idle_seconds: float, interval: Optional[float] = None):
+        """Unload idle models periodically from a daemon thread"""
+        if self._reaper is not None:
+            return
+        interval = interval or max(max_idle_seconds / 2, 1.0)
+
+        def reap():
+            while True:
+                time.sleep(interval)
+                self.unload_idle(max_idle_seconds)
+
+        self._reaper = threading.Thread(target=reap, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Reference count and load state per registered model"""
+        with self._lock:
+            return {
+                f"{name}:{num_labels}:{variant}": {
+                    'loaded': entry.loaded,
+                    'ref_count': entry.ref_count
+                }
+                for (name, num_labels, variant), entry in self._entries.items()
+            }
+
+    def _get(self, key: ModelKey, loader: Loader) -> Tuple[Any, Any]:
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    # Unloaded after its last release; re-register without a reference
+                    entry = self._entries[key] = _RegistryEntry(loader)
+            with entry.lock:
+                with self._lock:
+                    if self._entries.get(key) is not entry:
+                        # Dropped by unload_idle before we got the lock; look it up again
+                        continue
+                if not entry.loaded:
+                    start = time.monotonic()
+                    entry.model, entry.tokenizer = entry.loader(key[0], key[1])
+                    logger.info(f"Loaded model {key[0]} ({key[2]}) in {time.monotonic() - start:.1f}s")
+                entry.last_used = time.monotonic()
+                return entry.model, entry.tokenizer
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide model registry"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+        if settings.MODEL_IDLE_UNLOAD_SECONDS > 0:
+            _registry.start_reaper(settings.MODEL_IDLE_UNLOAD_SECONDS)
+    return _registry
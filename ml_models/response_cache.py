@@ -0,0 +1,362 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from ml_models.classification_cache import normalize_text
+from monitoring.metrics import response_cache_requests
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles.
+
+    Only the first ``max_shingles`` shingles of a text (read from at most
+    32 characters per shingle) count, and they are hashed in chunks of ``chunk_size`` against a running minimum, so time
+    and memory per signature stay bounded however long the email is.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        seed: int = 1,
+        max_shingles: int = 2048,
+        chunk_size: int = 256
+    ):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_shingles = max_shingles
+        self.chunk_size = chunk_size
+        rng = np.random.RandomState(seed)
+        # Coefficients below 2**31 keep a * x (x < 2**32) inside uint64
+        self._a = rng.randint(1, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        # Far more characters than max_shingles shingles need, without normalizing the whole body
+        words = normalize_text(text[:self.max_shingles * 32]).split()
+        if not words:
+            return None
+        size = min(self.shingle_size, len(words))
+        count = min(len(words) - size + 1, self.max_shingles)
+        shingles = list({' '.join(words[i:i + size]) for i in range(count)})
+
+        minimum = np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(shingles), self.chunk_size):
+            hashes = np.array(
+                [
+                    int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+                    for s in shingles[start:start + self.chunk_size]
+                ],
+                dtype=np.uint64
+            )
+            permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+            np.minimum(minimum, permuted.min(axis=0), out=minimum)
+        return minimum
+
+    @staticmethod
+    def similarity(left: np.ndarray, right: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the underlying shingle sets"""
+        return float(np.mean(left == right))
+
+
+@dataclass
+class _Entry:
+    namespace: str
+    text: str
+    signature: Optional[np.ndarray]
+    created_at: float
+
+
+class ResponseCache:
+    """Cache of generated responses in front of the responder agents' LLM calls.
+
+    Exact hits are keyed by a hash of the normalized prompt. Near-duplicate
+    hits compare MinHash signatures of the email body, found through LSH
+    banding and accepted at ``similarity_threshold`` or above. Entries are
+    scoped by namespace (agent, model and sampling settings), bounded by an
+    LRU with a TTL and optionally persisted to SQLite, from which the
+    newest entries are reloaded on start.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl_seconds: float = 7 * 86400,
+        similarity_threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 32,
+        disk_path: Optional[str] = None
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, bytes], Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._open_disk_tier(disk_path)
+
+    @classmethod
+    def from_settings(cls) -> 'ResponseCache':
+        return cls(
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+            similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY,
+            num_perm=settings.RESPONSE_CACHE_NUM_PERM,
+            bands=settings.RESPONSE_CACHE_BANDS,
+            disk_path=settings.RESPONSE_CACHE_DISK_PATH
+        )
+
+    def get(
+        self,
+        namespace: str,
+        prompt: str,
+        body: str,
+        signature: Optional[np.ndarray] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Cached response for this prompt or a near-duplicate email, or None"""
+        key = self._key(namespace, prompt)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry, now):
+                self._entries.move_to_end(key)
+                return self._hit(namespace, 'exact', entry, 1.0)
+
+        if signature is None:
+            signature = self.hasher.signature(body)
+        if signature is not None:
+            with self._lock:
+                best_key, best_similarity = None, 0.0
+                for candidate in self._candidates(namespace, signature):
+                    similarity = MinHasher.similarity(signature, self._entries[candidate].signature)
+                    if similarity > best_similarity:
+                        best_key, best_similarity = candidate, similarity
+                if best_key is not None and best_similarity >= self.similarity_threshold:
+                    entry = self._entries[best_key]
+                    if self._fresh(entry, now):
+                        self._entries.move_to_end(best_key)
+                        return self._hit(namespace, 'near', entry, best_similarity)
+
+        response_cache_requests.labels(agent=namespace.split(':')[0], result='miss').inc()
+        return None
+
+    async def lookup(
+        self,
+        namespace: str,
+        prompt: str,
+        body: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """get() in a worker thread; also returns the body's signature for a later put()"""
+        def run():
+            signature = self.hasher.signature(body)
+            return self.get(namespace, prompt, body, signature), signature
+
+        return await asyncio.get_running_loop().run_in_executor(None, run)
+
+    def put(
+        self,
+        namespace: str,
+        prompt: str,
+        body: str,
+        text: str,
+        signature: Optional[np.ndarray] = None
+    ):
+        """Remember a freshly generated response"""
+        key = self._key(namespace, prompt)
+        if signature is None:
+            signature = self.hasher.signature(body)
+        entry = _Entry(namespace, text, signature, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        namespace,
+                        entry.signature.tobytes() if entry.signature is not None else None,
+                        text,
+                        entry.created_at
+                    )
+                )
+                self._db.commit()
+
+    async def put_async(
+        self,
+        namespace: str,
+        prompt: str,
+        body: str,
+        text: str,
+        signature: Optional[np.ndarray] = None
+    ):
+        """put() in a worker thread, keeping hashing and the SQLite commit off the event loop"""
+        await asyncio.get_running_loop().run_in_executor(None, self.put, namespace, prompt, body, text, signature)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'buckets': len(self._buckets)}
+
+    def _key(self, namespace: str, prompt: str) -> str:
+        return hashlib.sha256(f"{namespace}\n{normalize_text(prompt)}".encode('utf-8')).hexdigest()
+
+    def _fresh(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created_at < self.ttl_seconds
+
+    def _band_keys(self, namespace: str, signature: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        return [
+            (namespace, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _candidates(self, namespace: str, signature: np.ndarray) -> Set[str]:
+        candidates = set()
+        for band_key in self._band_keys(namespace, signature):
+            candidates |= self._buckets.get(band_key, set())
+        return candidates
+
+    def _remember(self, key: str, entry: _Entry):
+        if key in self._entries:
+            self._forget(key)
+        self._entries[key] = entry
+        if entry.signature is not None:
+            for band_key in self._band_keys(entry.namespace, entry.signature):
+                self._buckets[band_key].add(key)
+        while len(self._entries) > self.max_entries:
+            self._forget(next(iter(self._entries)))
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key)
+        if entry.signature is None:
+            return
+        for band_key in self._band_keys(entry.namespace, entry.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _hit(self, namespace: str, match: str, entry: _Entry, similarity: float) -> Dict[str, Any]:
+        response_cache_requests.labels(agent=namespace.split(':')[0], result=match).inc()
+        return {
+            'text': entry.text,
+            'match': match,
+            'similarity': round(similarity, 3),
+            'cached_at': entry.created_at
+        }
+
+    def _open_disk_tier(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY,"
+            " namespace TEXT NOT NULL,"
+            " signature BLOB,"
+            " text TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM response_cache WHERE created_at <= ?", (cutoff,))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, namespace, signature, text, created_at FROM response_cache"
+            " ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for key, namespace, signature, text, created_at in reversed(rows):
+            if signature is not None:
+                signature = np.frombuffer(signature, dtype=np.uint64)
+            self._remember(key, _Entry(namespace, text, signature, created_at))
+        if rows:
+            logger.info(f"Loaded {len(rows)} cached responses from {path}")
+
+
+def response_namespace(
+    agent: str,
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    scope: Sequence[Any] = ()
+) -> str:
+    """Responses are only shared between calls with the same agent and sampling settings.
+
+    ``scope`` lists the per-customer context a prompt was built from (sender,
+    thread, KB articles); near-duplicate emails only share answers within it.
+    """
+    namespace = f"{agent}:{model}:{max_tokens}:{temperature}"
+    if scope:
+        digest = hashlib.sha256('\n'.join(str(part) for part in scope).encode('utf-8')).hexdigest()[:16]
+        namespace = f"{namespace}:{digest}"
+    return namespace
+
+
+async def cached_completion(
+    cache: Optional[ResponseCache],
+    llm,
+    namespace: str,
+    prompt: str,
+    body: str,
+    **llm_kwargs
+) -> Tuple[str, Dict[str, Any]]:
+    """Completion text for ``prompt`` and its source tag, reusing cached answers"""
+    if cache is None:
+        return await llm.complete(prompt, **llm_kwargs), response_source(None)
+    # The body's signature is computed once, off the event loop, and reused by put()
+    cached, signature = await cache.lookup(namespace, prompt, body)
+    if cached is not None:
+        return cached['text'], response_source(cached)
+    text = await llm.complete(prompt, **llm_kwargs)
+    await cache.put_async(namespace, prompt, body, text, signature)
+    return text, response_source(None)
+
+
+def response_source(cached: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Tag for a response: where its text came from, shown to reviewers"""
+    if cached is None:
+        return {'type': 'generated'}
+    return {
+        'type': 'cache',
+        'match': cached['match'],
+        'similarity': cached['similarity'],
+        'cached_at': cached['cached_at']
+    }
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache, or None when disabled"""
+    global _response_cache
+    if _response_cache is None and settings.RESPONSE_CACHE_ENABLED:
+        _response_cache = ResponseCache.from_settings()
+    return _response_cache
@@ -0,0 +1,96 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+
+TRUNCATION_MARKER = "\n[...]\n"
+
+
+@dataclass
+class PreparedText:
+    """Email text bounded for model input, with token IDs cached per tokenizer"""
+    text: str
+    original_length: int
+    truncated: bool
+    token_ids: Dict[str, List[int]] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class TextPreparer:
+    """Bounds email text before it ever reaches a tokenizer.
+
+    Bodies are first cut at the character level to roughly what
+    ``max_tokens`` can hold (``chars_per_token`` times a safety margin),
+    keeping a head and a tail window so greetings, the question and the
+    sign-off survive a pasted log in the middle. Token IDs are then
+    computed once per tokenizer, windowed the same way, and reused by
+    every consumer of the ``PreparedText``.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 512,
+        chars_per_token: float = 4.0,
+        safety_margin: float = 1.5,
+        head_fraction: float = 0.75
+    ):
+        if not 0 < head_fraction <= 1:
+            raise ValueError("head_fraction must be in (0, 1]")
+        self.max_tokens = max_tokens
+        self.head_fraction = head_fraction
+        self.max_chars = int(max_tokens * chars_per_token * safety_margin)
+
+    @classmethod
+    def from_settings(cls) -> 'TextPreparer':
+        return cls(
+            max_tokens=settings.TEXT_MAX_TOKENS,
+            chars_per_token=settings.TEXT_CHARS_PER_TOKEN,
+            safety_margin=settings.TEXT_TRUNCATION_SAFETY_MARGIN,
+            head_fraction=settings.TEXT_HEAD_FRACTION
+        )
+
+    def prepare(self, subject: Optional[str], body: Optional[str]) -> PreparedText:
+        """Combine subject and body and pre-truncate the result"""
+        return self.prepare_text(f"{subject or ''}\n\n{body or ''}")
+
+    def prepare_text(self, text: str) -> PreparedText:
+        if len(text) <= self.max_chars:
+            return PreparedText(text=text, original_length=len(text), truncated=False)
+
+        head, tail = self._window(self.max_chars - len(TRUNCATION_MARKER))
+        return PreparedText(
+            text=text[:head] + TRUNCATION_MARKER + (text[-tail:] if tail else ''),
+            original_length=len(text),
+            truncated=True
+        )
+
+    def token_ids(self, prepared: PreparedText, tokenizer: Any) -> List[int]:
+        """Token IDs for ``prepared`` under ``tokenizer``, computed at most once"""
+        key = getattr(tokenizer, 'name_or_path', None) or str(id(tokenizer))
+        with prepared._lock:
+            ids = prepared.token_ids.get(key)
+            if ids is None:
+                ids = tokenizer(prepared.text, truncation=False)['input_ids']
+                if len(ids) > self.max_tokens:
+                    ids = self._window_ids(ids, tokenizer)
+                prepared.token_ids[key] = ids
+        return ids
+
+    def _window_ids(self, ids: List[int], tokenizer: Any) -> List[int]:
+        """Head+tail window over token IDs, keeping the tokenizer's special tokens in place"""
+        mask = tokenizer.get_special_tokens_mask(ids, already_has_special_tokens=True)
+        start = 0
+        while start < len(ids) and mask[start]:
+            start += 1
+        end = len(ids)
+        while end > start and mask[end - 1]:
+            end -= 1
+
+        head, tail = self._window(self.max_tokens - start - (len(ids) - end))
+        body = ids[start:end]
+        return ids[:start] + body[:head] + (body[-tail:] if tail else []) + ids[end:]
+
+    def _window(self, budget: int) -> tuple:
+        head = int(budget * self.head_fraction)
+        return head, budget - head
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 import time
 
 # Define metrics
@@ -6,6 +6,163 @@ request_counter = Counter('email_processor_requests_total', 'Total requests proc
 processing_time = Histogram('email_processing_duration_seconds', 'Time spent processing emails')
 error_counter = Counter('email_processor_errors_total', 'Total processing errors')
 
+# Inference batching metrics
+inference_batch_size = Histogram(
+    'inference_batch_size',
+    'Number of texts per inference batch',
+    ['model'],
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+inference_queue_wait = Histogram(
+    'inference_queue_wait_seconds',
+    'Time a text waits in the batching queue before inference',
+    ['model'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+# Classification cache metrics
+classification_cache_requests = Counter(
+    'classification_cache_requests_total',
+    'Classification cache lookups by tier and outcome',
+    ['cache', 'tier', 'result']
+)
+
+# Cascade classification metrics
+cascade_routing_counter = Counter(
+    'classification_cascade_routed_total',
+    'Emails served by each cascade tier, by routing reason',
+    ['tier', 'reason']
+)
+
+# Pipeline metrics
+pipeline_queue_depth = Gauge(
+    'pipeline_queue_depth',
+    'Emails waiting in each pipeline stage queue',
+    ['stage']
+)
+pipeline_items_processed = Counter(
+    'pipeline_items_processed_total',
+    'Emails handled by each pipeline stage',
+    ['stage', 'status']
+)
+pipeline_stage_duration = Histogram(
+    'pipeline_stage_duration_seconds',
+    'Time a pipeline stage spends on one email',
+    ['stage']
+)
+
+# Priority scheduler metrics
+scheduler_queue_depth = Gauge(
+    'scheduler_queue_depth',
+    'Jobs waiting for a responder slot, per priority',
+    ['priority']
+)
+scheduler_queue_latency = Histogram(
+    'scheduler_queue_latency_seconds',
+    'Time from classification to a responder slot, per priority',
+    ['priority'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+# Durable queue metrics
+durable_queue_jobs = Counter(
+    'durable_queue_jobs_total',
+    'Durable queue job lifecycle events',
+    ['event']
+)
+durable_queue_depth = Gauge(
+    'durable_queue_depth',
+    'Jobs in the durable queue by status',
+    ['status']
+)
+
+# Deduplication metrics
+duplicate_messages_suppressed = Counter(
+    'duplicate_messages_suppressed_total',
+    'Redelivered message_ids that did not run the pipeline again',
+    ['reason']
+)
+
+# LLM client metrics
+llm_requests = Counter(
+    'llm_requests_total',
+    'Completion API attempts by outcome',
+    ['outcome']
+)
+llm_request_duration = Histogram(
+    'llm_request_duration_seconds',
+    'Completion API round-trip time per attempt',
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+)
+llm_rate_limit_wait = Histogram(
+    'llm_rate_limit_wait_seconds',
+    'Time a completion waited for the RPM/TPM limiters',
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Prompt building metrics
+prompt_tokens_saved = Histogram(
+    'prompt_tokens_saved',
+    'Prompt tokens removed by section budgets, per request',
+    ['prompt'],
+    buckets=(0, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+)
+
+# Response cache metrics
+response_cache_requests = Counter(
+    'response_cache_requests_total',
+    'Response cache lookups in front of LLM generation, by match type',
+    ['agent', 'result']
+)
+
+# Streaming metrics
+response_time_to_first_token = Histogram(
+    'response_time_to_first_token_seconds',
+    'Time from the start of a streamed response to its first generated token',
+    ['agent'],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 30)
+)
+
+# Agent tracing metrics
+agent_span_duration = Histogram(
+    'agent_span_duration_seconds',
+    'Time spent in each traced agent step',
+    ['agent', 'span'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+# Knowledge base index metrics
+kb_index_articles = Gauge(
+    'kb_index_articles',
+    'Articles held in the local knowledge base index'
+)
+
+kb_index_refreshes = Counter(
+    'kb_index_refreshes_total',
+    'Knowledge base index refreshes from the remote knowledge base',
+    ['result']
+)
+
+# Conversation store metrics
+conversation_store_lookups = Counter(
+    'conversation_store_lookups_total',
+    'Conversation history lookups, by whether the hot cache answered them',
+    ['result']
+)
+
+thread_summary_updates = Counter(
+    'thread_summary_updates_total',
+    'Background updates of rolling conversation thread summaries',
+    ['result']
+)
+
+# Calendar metrics
+calendar_requests = Counter(
+    'calendar_requests_total',
+    'Calendar API requests made to find meeting availability',
+    ['kind']
+)
+
 def track_request(endpoint: str):
     request_counter.labels(endpoint=endpoint).inc()
 
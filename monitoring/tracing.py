@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from config.settings import settings
+from monitoring.metrics import agent_span_duration
+
+
+class Span:
+    """Times one step; use as a (sync) context manager, also inside coroutines"""
+    __slots__ = ('tracer', 'component', 'name', 'args', 'start')
+
+    def __init__(self, tracer: 'Tracer', component: str, name: str, args: Optional[Dict[str, Any]]):
+        self.tracer = tracer
+        self.component = component
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Low-overhead spans aggregated into Prometheus histograms.
+
+    Every finished span is observed in ``agent_span_duration``. When
+    ``keep_events`` is set the spans are also kept (bounded) so they can be
+    written out as a Chrome trace (chrome://tracing or Perfetto).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        keep_events: bool = False,
+        max_events: int = 100000,
+        log_sample_rate: float = 1.0
+    ):
+        self.enabled = enabled
+        self.keep_events = keep_events
+        self.log_sample_rate = log_sample_rate
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_settings(cls) -> 'Tracer':
+        return cls(
+            enabled=settings.TRACING_ENABLED,
+            keep_events=bool(settings.TRACE_EXPORT_PATH),
+            max_events=settings.TRACE_MAX_EVENTS,
+            log_sample_rate=settings.AGENT_LOG_SAMPLE_RATE
+        )
+
+    def span(self, component: str, name: str, **args):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, component, name, args or None)
+
+    def record(self, span: Span, duration: float, failed: bool = False):
+        agent_span_duration.labels(agent=span.component, span=span.name).observe(duration)
+        if not self.keep_events:
+            return
+        event = {
+            'name': span.name,
+            'cat': span.component,
+            'ph': 'X',
+            'ts': (span.start - self._origin) * 1e6,
+            'dur': duration * 1e6,
+            'pid': self._pid,
+            'tid': self._lane()
+        }
+        args = dict(span.args or {})
+        if failed:
+            args['error'] = True
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def should_log(self) -> bool:
+        """Sampling decision for per-email logs"""
+        return self.log_sample_rate >= 1.0 or random.random() < self.log_sample_rate
+
+    def events(self) -> list:
+        return list(self._events)
+
+    def export_chrome_trace(self, path: Optional[str] = None) -> str:
+        """Write the kept spans as Chrome trace JSON and return the file path"""
+        path = path or settings.TRACE_EXPORT_PATH
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def _lane(self) -> int:
+        # Concurrent emails share the event loop thread; give each task its own row
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        return id(task) if task is not None else threading.get_ident()
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer shared by every agent"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer.from_settings()
+    return _tracer
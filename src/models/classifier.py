@@ -1,29 +1,109 @@
-from typing import Tuple
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+import joblib
 import nltk
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 import numpy as np
-from ..utils.helpers import load_config
+from ..utils.helpers import load_config, project_path
+from ml_models.batching import iter_chunks
+from ml_models.inference_executor import get_inference_executor
+
+logger = logging.getLogger(__name__)
 
 class EmailClassifier:
-    def __init__(self):
+    def __init__(self, online: Optional[bool] = None, model_file: Optional[str] = None):
         config = load_config()
-        self.vectorizer = TfidfVectorizer(
-            max_features=config['model_settings']['max_features']
-        )
+        model_settings = config['model_settings']
+        self.online = model_settings.get('online_learning', False) if online is None else online
+        # Paths from config.yaml are relative to the project, not the working directory
+        self.model_file = model_file or project_path(model_settings.get('model_file'))
+        self.known_classes = list(config['email_categories'])
+        
+        if self.online:
+            # Stateless features, so new examples never require refitting a vocabulary
+            self.vectorizer = HashingVectorizer(
+                n_features=model_settings.get('hash_features', 2 ** 18),
+                alternate_sign=False
+            )
+        else:
+            self.vectorizer = TfidfVectorizer(
+                max_features=model_settings['max_features']
+            )
         self.classifier = MultinomialNB()
         self.categories = None
         
         # Download required NLTK data
         nltk.download('punkt')
         nltk.download('stopwords')
+        
+        # Pick up the last saved model so a restart does not forget training
+        if self.model_file and Path(self.model_file).exists():
+            try:
+                self.load(self.model_file)
+            except ValueError as e:
+                logger.warning(f"Not loading saved email classifier: {str(e)}")
     
     def train(self, texts, labels):
         """Train the classifier with example data."""
+        if self.online:
+            self.classifier = MultinomialNB()
+            self.categories = None
+            self.partial_fit(texts, labels)
+            return
         X = self.vectorizer.fit_transform(texts)
         self.classifier.fit(X, labels)
         self.categories = list(set(labels))
     
+    def partial_fit(self, texts, labels, classes: Optional[List[str]] = None):
+        """Fold new labelled examples into an online model without retraining."""
+        if not self.online:
+            raise ValueError("partial_fit requires online_learning (hashing vectorizer)")
+        
+        self._ensure_writable()
+        X = self.vectorizer.transform(texts)
+        if self.categories is None:
+            classes = list(classes or sorted(set(self.known_classes) | set(labels)))
+            self.classifier.partial_fit(X, labels, classes=classes)
+            self.categories = classes
+        else:
+            unknown = set(labels) - set(self.categories)
+            if unknown:
+                raise ValueError(f"Unknown categories for online model: {sorted(unknown)}")
+            self.classifier.partial_fit(X, labels)
+    
+    def save(self, path: Optional[str] = None) -> str:
+        """Persist the model uncompressed so its arrays can be memory-mapped on load."""
+        path = path or self.model_file
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump({
+            'online': self.online,
+            'vectorizer': self.vectorizer,
+            'classifier': self.classifier,
+            'categories': self.categories
+        }, path)
+        return path
+    
+    def load(self, path: Optional[str] = None, mmap: bool = True):
+        """Load a saved model; with mmap, forked workers share the array pages."""
+        path = path or self.model_file
+        state = joblib.load(path, mmap_mode='r' if mmap else None)
+        if state['online'] != self.online:
+            # The vectorizers differ, so a model of the other mode cannot serve this one
+            mode = 'online' if state['online'] else 'batch'
+            raise ValueError(f"{path} holds a {mode} model, but this classifier has online={self.online}")
+        self.vectorizer = state['vectorizer']
+        self.classifier = state['classifier']
+        self.categories = state['categories']
+        logger.info(f"Loaded email classifier from {path}")
+    
+    def _ensure_writable(self):
+        """Copy memory-mapped (read-only) arrays before updating them in place."""
+        for name, value in list(vars(self.classifier).items()):
+            if isinstance(value, np.memmap) or (isinstance(value, np.ndarray) and not value.flags.writeable):
+                setattr(self.classifier, name, np.array(value))
+    
     def classify(self, text: str) -> Tuple[str, float]:
         """Classify an email text and return the category and confidence."""
         if self.categories is None:
@@ -34,4 +114,35 @@ class EmailClassifier:
         probabilities = self.classifier.predict_proba(X)[0]
         confidence = np.max(probabilities)
         
-        return category, float(confidence) 
\ No newline at end of file
+        return category, float(confidence)
+
+    def classify_with_probabilities(self, text: str) -> Tuple[str, float, Dict[str, float]]:
+        """Like classify(), plus the probability of every category the model knows."""
+        if self.categories is None:
+            return 'general', 0.0, {}
+        
+        X = self.vectorizer.transform([text])
+        probabilities = self.classifier.predict_proba(X)[0]
+        best = int(np.argmax(probabilities))
+        distribution = {
+            label: float(probability)
+            for label, probability in zip(self.classifier.classes_, probabilities)
+        }
+        return self.classifier.classes_[best], float(probabilities[best]), distribution
+
+    def classify_many(self, texts: Iterable[str], batch_size: int = 1000) -> Iterator[Tuple[str, float]]:
+        """Lazily classify many texts, one sparse-matrix transform per batch."""
+        for chunk in iter_chunks(texts, batch_size):
+            if self.categories is None:
+                yield from (('general', 0.0) for _ in chunk)
+                continue
+            
+            X = self.vectorizer.transform(chunk)
+            probabilities = self.classifier.predict_proba(X)
+            best = np.argmax(probabilities, axis=1)
+            for idx, row in zip(best, probabilities):
+                yield self.classifier.classes_[idx], float(row[idx])
+
+    async def classify_async(self, text: str) -> Tuple[str, float]:
+        """Classify on the shared inference executor without blocking the event loop."""
+        return await get_inference_executor().run(self.classify, text)
@@ -1,5 +1,6 @@
 import yaml
 from pathlib import Path
+from typing import Optional
 from email_validator import validate_email as validate_email_address, EmailNotValidError
 
 def load_config():
@@ -8,6 +9,12 @@ def load_config():
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
+def project_path(path: Optional[str]) -> Optional[str]:
+    """Resolve a path from config.yaml against the project root."""
+    if not path:
+        return path
+    return str(Path(__file__).parent.parent.parent / path)
+
 def validate_email(email: str) -> bool:
     """Validate email address format."""
     try:
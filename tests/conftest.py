@@ -0,0 +1,8 @@
+import pytest
+from ml_models import response_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache(monkeypatch):
+    # Agents share one process-wide response cache; start every test without earlier answers
+    monkeypatch.setattr(response_cache, '_response_cache', None)
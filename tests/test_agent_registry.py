@@ -0,0 +1,43 @@
+import asyncio
+import threading
+from workflow.agent_registry import LazyAgents
+
+class Agent:
+    built = 0
+
+    def __init__(self):
+        Agent.built += 1
+        self.warmed = False
+
+    def warm_up(self):
+        self.warmed = True
+
+def test_agents_are_built_on_first_use_only():
+    Agent.built = 0
+    agents = LazyAgents({"SUPPORT": Agent, "MEETING": Agent})
+    assert list(agents) == ["SUPPORT", "MEETING"]
+    assert Agent.built == 0
+
+    assert agents["SUPPORT"] is agents.get("SUPPORT")
+    assert Agent.built == 1
+    assert not agents.is_built("MEETING")
+    assert agents.get("UNKNOWN") is None
+
+def test_concurrent_first_use_builds_once():
+    Agent.built = 0
+    agents = LazyAgents({"SUPPORT": Agent})
+    threads = [threading.Thread(target=agents.__getitem__, args=("SUPPORT",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert Agent.built == 1
+
+def test_warm_up_builds_in_background_and_survives_failures():
+    def broken():
+        raise RuntimeError("no credentials")
+
+    agents = LazyAgents({"SUPPORT": Agent, "MEETING": broken})
+    asyncio.run(agents.warm_up())
+    assert agents["SUPPORT"].warmed
+    assert not agents.is_built("MEETING")
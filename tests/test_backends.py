@@ -0,0 +1,109 @@
+import json
+import numpy as np
+import pytest
+from config.settings import settings
+from ml_models import backends, export
+from ml_models.backends import InferenceBackend, OnnxBackend, TorchBackend, create_backend, onnx_export_dir, softmax
+
+class FakeHandle:
+    def __init__(self, model, model_name="fake-model", num_labels=2):
+        self.model = model
+        self.model_name = model_name
+        self.num_labels = num_labels
+
+class FakeNode:
+    def __init__(self, name):
+        self.name = name
+
+class FakeSession:
+    def __init__(self, input_names):
+        self.input_names = input_names
+        self.feeds = []
+
+    def get_inputs(self):
+        return [FakeNode(name) for name in self.input_names]
+
+    def run(self, outputs, feed):
+        self.feeds.append(feed)
+        return [np.zeros((len(feed['input_ids']), 2), dtype=np.float32)]
+
+def test_softmax_rows_sum_to_one_without_overflow():
+    probabilities = softmax(np.array([[1000.0, 1000.0], [0.0, np.log(3.0)]]))
+    assert np.allclose(probabilities.sum(axis=1), 1.0)
+    assert np.allclose(probabilities, [[0.5, 0.5], [0.25, 0.75]])
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown inference backend: tensorrt"):
+        create_backend("fake-model", backend="tensorrt")
+
+def test_backends_must_implement_logits():
+    with pytest.raises(TypeError):
+        InferenceBackend(FakeHandle(None))
+
+def test_create_backend_loads_through_the_registry_lazily(monkeypatch):
+    loads = []
+
+    def loader(model_name, num_labels):
+        loads.append((model_name, num_labels))
+        return "model", "tokenizer"
+
+    monkeypatch.setitem(backends._BACKEND_CLASSES, "torch", (TorchBackend, loader, "fp32-test"))
+    backend = create_backend("backend-test-model", num_labels=4, backend="torch")
+    assert isinstance(backend, TorchBackend) and loads == []
+    assert backend.model == "model" and backend.tokenizer == "tokenizer"
+    assert loads == [("backend-test-model", 4)]
+
+def test_onnx_feed_fills_missing_inputs_and_reads_labels_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'ONNX_MODEL_DIR', str(tmp_path))
+    session = FakeSession(["input_ids", "attention_mask", "token_type_ids"])
+    # Constructing the backend touches nothing on disk; the export may not exist yet
+    backend = OnnxBackend(FakeHandle(session, "org/fake-model", 2))
+
+    export_dir = tmp_path / "org__fake-model-2"
+    export_dir.mkdir()
+    (export_dir / "config.json").write_text(json.dumps({'model_type': 'bert', 'id2label': {'0': 'NO', '1': 'YES'}}))
+    assert onnx_export_dir("org/fake-model", 2) == str(export_dir)
+    assert backend.id2label() == {0: 'NO', 1: 'YES'}
+    (export_dir / "config.json").unlink()
+    assert backend.id2label() == {0: 'NO', 1: 'YES'}
+
+    logits = backend.logits({'input_ids': [[5, 6, 7]], 'attention_mask': [[1, 1, 1]]})
+    feed = session.feeds[0]
+    assert logits.shape == (1, 2)
+    assert all(value.dtype == np.int64 for value in feed.values())
+    assert feed['token_type_ids'].tolist() == [[0, 0, 0]]
+
+def test_onnx_backend_without_an_export_fails_on_first_use_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'ONNX_MODEL_DIR', str(tmp_path))
+
+    def loader(model_name, num_labels):
+        raise FileNotFoundError(f"{onnx_export_dir(model_name, num_labels)}/model.onnx")
+
+    monkeypatch.setitem(backends._BACKEND_CLASSES, "onnx", (OnnxBackend, loader, "onnx-missing-test"))
+    backend = create_backend("missing-model", num_labels=2, backend="onnx")
+    with pytest.raises(FileNotFoundError):
+        backend.predict_proba_encoded([[1, 2, 3]])
+    with pytest.raises(OSError):
+        backend.id2label()
+
+def test_parity_check_compares_against_fp32_and_skips_broken_backends(monkeypatch):
+    class FixedBackend:
+        def __init__(self, probabilities):
+            self.probabilities = np.array(probabilities)
+
+        def predict_proba(self, texts):
+            return self.probabilities
+
+    def fake_create_backend(model_name, num_labels, backend):
+        if backend == "onnx":
+            raise FileNotFoundError("model.onnx")
+        return {
+            "torch": FixedBackend([[0.9, 0.1], [0.2, 0.8]]),
+            "torch_int8": FixedBackend([[0.8, 0.2], [0.6, 0.4]])
+        }[backend]
+
+    monkeypatch.setattr(export, 'create_backend', fake_create_backend)
+    report = export.parity_check("fake-model", 2, ["a", "b"], ["torch", "torch_int8", "onnx"])
+    assert list(report) == ["torch_int8"]
+    assert report["torch_int8"]['label_agreement'] == 0.5
+    assert report["torch_int8"]['max_probability_drift'] == pytest.approx(0.4)
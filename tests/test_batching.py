@@ -0,0 +1,78 @@
+import asyncio
+from ml_models.batching import MicroBatcher
+
+def test_concurrent_submits_share_a_batch():
+    batches = []
+
+    def infer(texts):
+        batches.append(list(texts))
+        return [text.upper() for text in texts]
+
+    async def run():
+        batcher = MicroBatcher(infer, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*[batcher.submit(f"email {i}") for i in range(4)])
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+    assert results == [f"EMAIL {i}" for i in range(4)]
+    assert len(batches) == 1
+
+def test_partial_batch_flushes_after_max_wait():
+    async def run():
+        batcher = MicroBatcher(lambda texts: [len(t) for t in texts], max_batch_size=32, max_wait_ms=5)
+        result = await asyncio.wait_for(batcher.submit("hello"), timeout=1)
+        await batcher.close()
+        return result
+
+    assert asyncio.run(run()) == 5
+
+def test_texts_are_bucketed_by_length():
+    batches = []
+
+    def infer(texts):
+        batches.append(len(texts))
+        return texts
+
+    async def run():
+        batcher = MicroBatcher(infer, max_batch_size=2, max_wait_ms=20, length_buckets=(8, 512))
+        await asyncio.gather(
+            batcher.submit("short"),
+            batcher.submit("x" * 1000),
+            batcher.submit("tiny"),
+            batcher.submit("y" * 1000),
+        )
+        await batcher.close()
+
+    asyncio.run(run())
+    assert batches == [2, 2]
+
+def test_inference_errors_reach_every_caller():
+    def infer(texts):
+        raise RuntimeError("model unavailable")
+
+    async def run():
+        batcher = MicroBatcher(infer, max_batch_size=2, max_wait_ms=5)
+        results = await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+        )
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+def test_short_result_lists_fail_every_caller():
+    def infer(texts):
+        return [text.upper() for text in texts][:-1]
+
+    async def run():
+        batcher = MicroBatcher(infer, max_batch_size=3, max_wait_ms=5)
+        results = await asyncio.wait_for(asyncio.gather(
+            *[batcher.submit(text) for text in ("a", "b", "c")], return_exceptions=True
+        ), timeout=1)
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from agents.calendar_availability import CalendarAvailability, find_free_slots
+
+class GoneError(Exception):
+    """Stands in for googleapiclient's HttpError on an expired sync token"""
+    class resp:
+        status = 410
+
+class _Request:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+class FakeCalendarService:
+    """In-memory Calendar v3 API: events().list with paging and sync tokens, freebusy().query"""
+
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        self.log = []  # (version, event) for every change
+        self.calls = []
+        self.expire_tokens = False
+
+    def put(self, event_id, start, end, **fields):
+        event = {'id': event_id, 'start': {'dateTime': start}, 'end': {'dateTime': end}, **fields}
+        self.log.append((len(self.log) + 1, event))
+
+    def cancel(self, event_id):
+        self.log.append((len(self.log) + 1, {'id': event_id, 'status': 'cancelled'}))
+
+    def events(self):
+        return self
+
+    def freebusy(self):
+        return self
+
+    def list(self, calendarId, singleEvents, maxResults, pageToken=None, syncToken=None, timeMin=None):
+        def run():
+            self.calls.append(('list', syncToken))
+            if syncToken is not None and self.expire_tokens:
+                self.expire_tokens = False
+                raise GoneError()
+            since = int(syncToken) if syncToken else 0
+            latest = {}
+            for version, event in self.log:
+                if version > since:
+                    latest[event['id']] = event
+            items = [e for e in latest.values() if syncToken or e.get('status') != 'cancelled']
+            offset = int(pageToken or 0)
+            page = items[offset:offset + min(maxResults, self.page_size)]
+            response = {'items': page}
+            if offset + len(page) < len(items):
+                response['nextPageToken'] = str(offset + len(page))
+            else:
+                response['nextSyncToken'] = str(len(self.log))
+            return response
+        return _Request(run)
+
+    def query(self, body):
+        def run():
+            self.calls.append(('freebusy', body['timeMin'], body['timeMax']))
+            latest = {}
+            for _, event in self.log:
+                latest[event['id']] = event
+            busy = [
+                {'start': e['start']['dateTime'], 'end': e['end']['dateTime']}
+                for e in latest.values()
+                if e.get('status') != 'cancelled' and body['timeMin'] < e['end']['dateTime'] and e['start']['dateTime'] < body['timeMax']
+            ]
+            return {'calendars': {'primary': {'busy': busy}}}
+        return _Request(run)
+
+DAY = datetime(2030, 1, 7)
+
+def busy(availability, days=5):
+    return asyncio.run(availability.busy(DAY, DAY + timedelta(days=days)))
+
+def make_calendar():
+    service = FakeCalendarService()
+    service.put('standup', "2030-01-07T09:00:00Z", "2030-01-07T10:00:00Z")
+    service.put('review', "2030-01-08T14:00:00+01:00", "2030-01-08T15:00:00+01:00")
+    service.put('lunch', "2030-01-09T12:00:00Z", "2030-01-09T13:00:00Z", transparency='transparent')
+    service.put('later', "2030-03-01T09:00:00Z", "2030-03-01T10:00:00Z")
+    return service
+
+def test_cache_syncs_once_then_applies_changes_with_the_sync_token():
+    service = make_calendar()
+    availability = CalendarAvailability(service, sync_interval=0)
+
+    assert busy(availability) == [
+        (datetime(2030, 1, 7, 9), datetime(2030, 1, 7, 10)),
+        (datetime(2030, 1, 8, 13), datetime(2030, 1, 8, 14))
+    ]
+    full_sync_calls = len(service.calls)
+    assert all(token is None for _, token in service.calls)
+
+    service.cancel('standup')
+    service.put('planning', "2030-01-10T11:00:00Z", "2030-01-10T12:00:00Z")
+    assert busy(availability) == [
+        (datetime(2030, 1, 8, 13), datetime(2030, 1, 8, 14)),
+        (datetime(2030, 1, 10, 11), datetime(2030, 1, 10, 12))
+    ]
+    # Only the two changes were fetched, with the token from the full sync
+    assert service.calls[full_sync_calls:] == [('list', '4')]
+
+def test_past_events_are_pruned_on_every_sync():
+    service = make_calendar()
+    availability = CalendarAvailability(service, sync_interval=0, lookback_days=1)
+    asyncio.run(availability.refresh())
+    assert 'standup' in availability._events
+
+    past = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=3)
+    service.put('retro', past.isoformat() + "Z", (past + timedelta(hours=1)).isoformat() + "Z")
+    asyncio.run(availability.refresh())
+    # Still in the change log, but outside the lookback window
+    assert 'retro' not in availability._events and 'standup' in availability._events
+
+def test_recent_syncs_are_reused_without_a_call():
+    service = make_calendar()
+    availability = CalendarAvailability(service, sync_interval=60)
+    busy(availability)
+    calls = len(service.calls)
+
+    async def run():
+        for _ in range(3):
+            await availability.busy(DAY, DAY + timedelta(days=30))
+
+    asyncio.run(run())
+    assert len(service.calls) == calls
+
+def test_expired_sync_token_falls_back_to_a_full_sync():
+    service = make_calendar()
+    availability = CalendarAvailability(service, sync_interval=0)
+    busy(availability)
+    service.expire_tokens = True
+    service.cancel('review')
+
+    assert busy(availability) == [(datetime(2030, 1, 7, 9), datetime(2030, 1, 7, 10))]
+    assert service.calls[-3:] == [('list', '4'), ('list', None), ('list', None)]
+
+def test_free_busy_mode_makes_one_query_whatever_the_range():
+    for days in (1, 20):
+        service = make_calendar()
+        availability = CalendarAvailability(service, use_cache=False)
+        result = busy(availability, days)
+        assert len(service.calls) == 1
+        assert result[0] == (datetime(2030, 1, 7, 9), datetime(2030, 1, 7, 10))
+
+def test_free_slots_skip_busy_times():
+    slots = find_free_slots(DAY, [(DAY.replace(hour=9), DAY.replace(hour=10, minute=30))], 60)
+    assert slots[0] == DAY.replace(hour=10, minute=30)
+    assert slots[-1] == DAY.replace(hour=16)
+    assert find_free_slots(DAY, [(DAY, DAY + timedelta(days=1))], 30) == []
@@ -0,0 +1,112 @@
+import asyncio
+from ml_models.cascade import CascadeClassifier
+
+CATEGORIES = ["INQUIRY", "SUPPORT", "MEETING", "FOLLOW_UP"]
+
+def make_cascade(cheap_results, **kwargs):
+    return CascadeClassifier(lambda text: cheap_results[text], labels=CATEGORIES, threshold=0.75, **kwargs)
+
+async def expensive(text):
+    return {'category': 'MEETING', 'confidence': 0.99}
+
+def test_confident_cheap_answer_is_not_escalated():
+    cascade = make_cascade({"reset password": ("SUPPORT", 0.9)})
+    result = asyncio.run(cascade.classify("reset password", expensive))
+    assert result == {
+        'category': 'SUPPORT',
+        'confidence': 0.9,
+        'all_probabilities': {'INQUIRY': 0.0, 'SUPPORT': 0.9, 'MEETING': 0.0, 'FOLLOW_UP': 0.0},
+        'tier': 'cheap'
+    }
+    assert cascade.stats()['cheap_fraction'] == 1.0
+
+def test_cheap_distribution_is_mapped_onto_the_categories():
+    cascade = make_cascade(
+        {"hi": ("question", 0.8, {"question": 0.8, "support": 0.15, "spam": 0.05})},
+        label_map={"question": "INQUIRY", "support": "SUPPORT"}
+    )
+    result = asyncio.run(cascade.classify("hi", expensive))
+    assert result['category'] == 'INQUIRY' and result['tier'] == 'cheap'
+    assert result['all_probabilities'] == {'INQUIRY': 0.8, 'SUPPORT': 0.15, 'MEETING': 0.0, 'FOLLOW_UP': 0.0}
+
+def test_low_confidence_and_forced_labels_escalate():
+    cascade = make_cascade(
+        {"maybe": ("SUPPORT", 0.4), "follow": ("FOLLOW_UP", 0.95), "untrained": ("general", 0.0)},
+        always_escalate=["FOLLOW_UP"]
+    )
+    for text in ("maybe", "follow", "untrained"):
+        assert asyncio.run(cascade.classify(text, expensive))['tier'] == 'expensive'
+
+    stats = cascade.stats()
+    assert stats['low_confidence'] == 1
+    assert stats['always_escalate'] == 1
+    assert stats['unknown_label'] == 1
+    assert stats['cheap_fraction'] == 0.0
+
+def test_evaluate_reports_accuracy_per_path():
+    cascade = make_cascade({"a": ("SUPPORT", 0.9), "b": ("SUPPORT", 0.1)})
+    report = asyncio.run(cascade.evaluate([("a", "SUPPORT"), ("b", "MEETING")], expensive))
+    assert report['cheap_fraction'] == 0.5
+    assert report['cascade_accuracy'] == 1.0
+    assert report['expensive_accuracy'] == 0.5
+
+class FakeNaiveBayes:
+    def __init__(self, categories, results=None):
+        self.categories = categories
+        self.results = results or {}
+
+    def classify_with_probabilities(self, text):
+        return self.results.get(text, ('general', 0.0, {}))
+
+def test_agent_refuses_an_untrained_cheap_tier():
+    from agents.classification_agent import ClassificationAgent
+
+    agent = ClassificationAgent(cascade_classifier=FakeNaiveBayes(categories=None))
+    assert agent.cascade is None and agent.cheap_category_cache is None
+
+def test_agent_caches_cheap_answers_apart_from_the_transformer():
+    from agents.classification_agent import ClassificationAgent
+
+    text = "Reset\n\nplease reset my password"
+    cheap = FakeNaiveBayes(CATEGORIES, {text: ('SUPPORT', 0.9, {'SUPPORT': 0.9, 'INQUIRY': 0.1})})
+    agent = ClassificationAgent(cascade_classifier=cheap)
+    result = asyncio.run(agent.process({'subject': "Reset", 'body': "please reset my password"}))
+
+    assert result['classification']['category'] == 'SUPPORT'
+    assert agent.category_cache.get("Reset", "please reset my password") is None
+    cached = agent.cheap_category_cache.get("Reset", "please reset my password")
+    assert cached['tier'] == 'cheap' and cached['all_probabilities']['INQUIRY'] == 0.1
+
+def shipped_taxonomy_classifier():
+    from src.models.classifier import EmailClassifier
+    from src.utils.helpers import load_config
+
+    labels = load_config()['email_categories']
+    texts = {
+        'support': "my order never arrived where is my package",
+        'technical': "cannot login password reset error on the app",
+        'billing': "charged twice on my invoice please refund",
+        'sales': "pricing for the enterprise plan and more licenses",
+        'general': "hello just wanted to say thanks for the newsletter"
+    }
+    classifier = EmailClassifier(model_file="")
+    classifier.train([texts[label] for label in labels] * 3, list(labels) * 3)
+    return classifier
+
+def test_agent_maps_the_shipped_taxonomy_onto_its_categories():
+    from agents.classification_agent import ClassificationAgent
+
+    agent = ClassificationAgent(cascade_classifier=shipped_taxonomy_classifier())
+    assert agent.cascade is not None
+    result = asyncio.run(agent.cascade.classify("charged twice on my invoice please refund", expensive))
+    assert result['tier'] == 'cheap' and result['category'] == 'SUPPORT'
+    assert set(result['all_probabilities']) == set(CATEGORIES)
+    assert abs(sum(result['all_probabilities'].values()) - 1.0) < 1e-6
+
+def test_agent_refuses_a_cheap_tier_whose_labels_never_match(monkeypatch):
+    from agents.classification_agent import ClassificationAgent
+    from config.settings import settings
+
+    monkeypatch.setattr(settings, 'CASCADE_LABEL_MAP', {})
+    agent = ClassificationAgent(cascade_classifier=shipped_taxonomy_classifier())
+    assert agent.cascade is None
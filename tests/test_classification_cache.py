@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from ml_models.classification_cache import ClassificationCache
+
+def make_cache(**kwargs):
+    options = dict(name="category", model_name="deepseek-base", labels=["INQUIRY", "SUPPORT"])
+    options.update(kwargs)
+    return ClassificationCache(**options)
+
+def test_normalized_content_shares_an_entry():
+    cache = make_cache()
+    cache.put("Weekly Newsletter", "Hello   World", {"category": "INQUIRY"})
+
+    assert cache.get("weekly newsletter", "hello world") == {"category": "INQUIRY"}
+    assert cache.get("Weekly Newsletter", "Something else") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.put("a", "", 1)
+    cache.put("b", "", 2)
+    cache.get("a", "")
+    cache.put("c", "", 3)
+
+    assert cache.get("b", "") is None
+    assert cache.get("a", "") == 1
+    assert cache.get("c", "") == 3
+
+def test_entries_expire_after_ttl():
+    cache = make_cache(ttl_seconds=0.01)
+    cache.put("a", "", 1)
+    time.sleep(0.02)
+    assert cache.get("a", "") is None
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    make_cache(disk_path=path).put("Reset password", "body", {"category": "SUPPORT"})
+
+    assert make_cache(disk_path=path).get("Reset password", "body") == {"category": "SUPPORT"}
+
+def test_label_or_model_change_invalidates_disk_entries(tmp_path):
+    path = str(tmp_path / "cache.db")
+    make_cache(disk_path=path).put("Reset password", "body", {"category": "SUPPORT"})
+
+    assert make_cache(disk_path=path, labels=["INQUIRY", "SUPPORT", "MEETING"]).get("Reset password", "body") is None
+    assert make_cache(disk_path=path).get("Reset password", "body") is None
+
+def test_async_access_keeps_sqlite_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = make_cache(disk_path=path)
+    threads = []
+    for name in ("_disk_get", "_disk_put"):
+        original = getattr(cache, name)
+        def traced(*args, original=original):
+            threads.append(threading.current_thread())
+            return original(*args)
+        setattr(cache, name, traced)
+
+    async def run():
+        await cache.put_async("Reset password", "body", {"category": "SUPPORT"})
+        memory_hit = await cache.get_async("Reset password", "body")
+        restarted = make_cache(disk_path=path)
+        return memory_hit, await restarted.get_async("reset  password", "body")
+
+    assert asyncio.run(run()) == ({"category": "SUPPORT"}, {"category": "SUPPORT"})
+    # Only the write touched SQLite on this cache, and not on the loop's thread
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
@@ -0,0 +1,77 @@
+from pathlib import Path
+import pytest
+from src.models.classifier import EmailClassifier
+
+TRAINING_TEXTS = [
+    "cannot login to my account password reset error",
+    "login error again, password not accepted",
+    "I was charged twice on my invoice",
+    "refund for the duplicate charge on my card",
+    "tell me about your enterprise plan pricing",
+    "interested in buying more licenses for the team",
+]
+TRAINING_LABELS = ["technical", "technical", "billing", "billing", "sales", "sales"]
+
+def trained_classifier():
+    classifier = EmailClassifier()
+    classifier.train(TRAINING_TEXTS, TRAINING_LABELS)
+    return classifier
+
+def test_classify_many_matches_classify():
+    classifier = trained_classifier()
+    texts = ["password reset please", "charged twice", "enterprise pricing"] * 5
+
+    results = list(classifier.classify_many(texts, batch_size=4))
+    assert results == [classifier.classify(text) for text in texts]
+
+def test_classify_many_is_lazy():
+    classifier = trained_classifier()
+
+    def texts():
+        yield "password reset please"
+        raise AssertionError("consumed past the first batch")
+
+    results = classifier.classify_many(texts(), batch_size=1)
+    assert next(results)[0] == "technical"
+
+def test_untrained_classifier_falls_back_to_general():
+    assert list(EmailClassifier().classify_many(["anything", "else"])) == [("general", 0.0)] * 2
+
+def test_saved_model_is_memory_mapped_on_load(tmp_path):
+    path = str(tmp_path / "classifier.joblib")
+    classifier = trained_classifier()
+    classifier.save(path)
+
+    restored = EmailClassifier(model_file=path)
+    assert restored.categories == classifier.categories
+    assert restored.classify("charged twice") == classifier.classify("charged twice")
+    assert not restored.classifier.feature_log_prob_.flags.writeable
+
+def test_online_mode_learns_incrementally(tmp_path):
+    path = str(tmp_path / "online.joblib")
+    classifier = EmailClassifier(online=True, model_file=path)
+    classifier.partial_fit(TRAINING_TEXTS, TRAINING_LABELS)
+    assert classifier.classify("duplicate charge refund")[0] == "billing"
+    classifier.save()
+
+    restored = EmailClassifier(online=True, model_file=path)
+    restored.partial_fit(["where is my shipment tracking number"] * 3, ["support"] * 3)
+    assert restored.classify("shipment tracking number")[0] == "support"
+    assert restored.classify("duplicate charge refund")[0] == "billing"
+
+def test_saved_model_of_the_other_mode_does_not_flip_online(tmp_path):
+    path = str(tmp_path / "classifier.joblib")
+    trained_classifier().save(path)
+
+    online = EmailClassifier(online=True, model_file=path)
+    assert online.online is True and online.categories is None
+    with pytest.raises(ValueError):
+        online.load(path)
+    online.partial_fit(TRAINING_TEXTS, TRAINING_LABELS)
+    assert online.classify("duplicate charge refund")[0] == "billing"
+
+def test_configured_model_file_is_relative_to_the_project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    model_file = Path(EmailClassifier().model_file)
+    assert model_file.is_absolute()
+    assert model_file == Path(__file__).resolve().parent.parent / "models" / "classifier" / "email_classifier.joblib"
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from prometheus_client import REGISTRY
+from agents.follow_up_agent import FollowUpAgent
+from workflow.conversation_store import ConversationStore, parse_message_ids
+
+def email(message_id, sender="Jane Doe <Jane@Example.com>", body="hello", timestamp=None, **headers):
+    return {
+        'sender': sender,
+        'subject': 'Order',
+        'body': body,
+        'timestamp': timestamp,
+        'message_id_header': message_id,
+        **headers
+    }
+
+def hits():
+    return REGISTRY.get_sample_value('conversation_store_lookups_total', {'result': 'hit'}) or 0
+
+def test_message_ids_are_parsed_from_headers():
+    assert parse_message_ids("<a@x> <b@x>\n <c@x>") == ["<a@x>", "<b@x>", "<c@x>"]
+    assert parse_message_ids(None) == []
+
+def test_replies_join_the_thread_they_reference(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    root = store.append(email("<1@x>", timestamp=1))
+    with_references = store.append(email("<2@x>", timestamp=2, references="<1@x>", in_reply_to="<1@x>"))
+    reply_only = store.append(email("<3@x>", timestamp=3, in_reply_to="<2@x>"))
+    unrelated = store.append(email("<4@x>", timestamp=4))
+
+    assert root['thread_id'] == with_references['thread_id'] == reply_only['thread_id'] == "<1@x>"
+    assert unrelated['thread_id'] == "<4@x>"
+    thread = store.recent(thread_id="<1@x>", limit=5)
+    assert [m['message_id'] for m in thread] == ["<3@x>", "<2@x>", "<1@x>"]
+
+def test_recent_messages_by_sender_newest_first(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    for i in range(10):
+        newest = store.append(email(f"<{i}@x>", body=f"message {i}", timestamp=100 + i))
+    store.append(email("<other@x>", sender="bob@example.com", timestamp=500))
+
+    recent = store.recent(sender="jane@example.com", limit=3, exclude=newest['seq'])
+    assert [m['content'] for m in recent] == ["message 8", "message 7", "message 6"]
+    assert recent[0]['sender'] == "jane@example.com"
+
+def test_hot_cache_serves_and_follows_appends(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"), cache_depth=5)
+    store.append(email("<1@x>", timestamp=1))
+    store.recent(sender="jane@example.com", limit=3)
+
+    before = hits()
+    store.append(email("<2@x>", timestamp=2))
+    assert [m['message_id'] for m in store.recent(sender="jane@example.com", limit=3)] == ["<2@x>", "<1@x>"]
+    assert hits() == before + 1
+
+def test_history_is_persistent_and_redeliveries_are_ignored(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    store = ConversationStore(path)
+    store.append(email("<1@x>", timestamp=1))
+    store.append(email("<1@x>", timestamp=1))
+    store.close()
+
+    reopened = ConversationStore(path)
+    assert reopened.stats()['messages'] == 1
+    assert len(reopened.recent(sender="jane@example.com")) == 1
+
+def test_lookups_stay_sub_millisecond(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"), cache_size=64)
+    for i in range(2000):
+        store.append(email(f"<{i}@x>", sender=f"customer{i % 200}@example.com", timestamp=i))
+
+    start = time.perf_counter()
+    for i in range(1000):
+        store.recent(sender=f"customer{i % 200}@example.com", limit=5)
+    assert (time.perf_counter() - start) / 1000 < 0.001
+
+def test_follow_up_history_comes_from_the_thread(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    store.append(email("<1@x>", body="Where is my order?", timestamp=1))
+    store.append(email("<elsewhere@x>", body="Unrelated question", timestamp=2))
+    current = email("<2@x>", body="Any update?", timestamp=3, references="<1@x>")
+    filed = store.append(current)
+    current.update(thread_id=filed['thread_id'], message_seq=filed['seq'])
+
+    agent = FollowUpAgent(vector_db_client=None, llm_client=object(), conversation_store=store)
+    history = asyncio.run(agent._get_conversation_history(current))
+    assert history['conversation_id'] == "<1@x>"
+    assert [m['content'] for m in history['messages']] == ["Where is my order?"]
+
+class FakeVectorDB:
+    def __init__(self):
+        self.queries = []
+
+    async def search(self, query, limit, **kwargs):
+        self.queries.append(query)
+        return {'conversation_id': 'legacy', 'messages': [{'content': "Order placed", 'timestamp': 't'}]}
+
+def test_email_without_message_id_is_not_its_own_history(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    store.append(email("<1@x>", body="Where is my order?", timestamp=1))
+    # Streamed requests carry no Message-ID, so the email starts a thread of its own
+    current = email(None, body="Any update?", timestamp=2)
+    filed = store.append(current)
+    current.update(thread_id=filed['thread_id'], message_seq=filed['seq'])
+
+    agent = FollowUpAgent(vector_db_client=FakeVectorDB(), llm_client=object(), conversation_store=store)
+    history = asyncio.run(agent._get_conversation_history(current))
+    assert [m['content'] for m in history['messages']] == ["Where is my order?"]
+
+def test_senders_missing_from_the_store_fall_back_to_the_vector_db(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    current = email("<1@x>", body="Any update?", timestamp=1)
+    filed = store.append(current)
+    current.update(thread_id=filed['thread_id'], message_seq=filed['seq'])
+
+    vector_db = FakeVectorDB()
+    agent = FollowUpAgent(vector_db_client=vector_db, llm_client=object(), conversation_store=store)
+    history = asyncio.run(agent._get_conversation_history(current))
+    assert vector_db.queries == [f"sender:{current['sender']}"]
+    assert history['conversation_id'] == 'legacy' and history['messages'][0]['content'] == "Order placed"
@@ -0,0 +1,70 @@
+import asyncio
+from workflow.deduplication import MessageDeduplicator, RotatingBloomFilter
+
+def counting_process(calls, status='success', delay=0.01):
+    async def process():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {'status': status, 'n': len(calls)}
+    return process
+
+def test_concurrent_duplicates_share_one_run():
+    async def run():
+        dedup = MessageDeduplicator()
+        calls = []
+        results = await asyncio.gather(*(dedup.run("m1", counting_process(calls)) for _ in range(5)))
+        return calls, results, dedup.suppressed
+
+    calls, results, suppressed = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == {'status': 'success', 'n': 1} for result in results)
+    assert suppressed == 4
+
+def test_completed_results_are_replayed_and_failures_retried():
+    async def run():
+        dedup = MessageDeduplicator()
+        calls = []
+        await dedup.run("ok", counting_process(calls))
+        replayed = await dedup.run("ok", counting_process(calls))
+        await dedup.run("bad", counting_process(calls, status='error'))
+        await dedup.run("bad", counting_process(calls, status='error'))
+        return calls, replayed
+
+    calls, replayed = asyncio.run(run())
+    assert replayed == {'status': 'success', 'n': 1}
+    assert len(calls) == 3
+
+def test_evicted_results_are_still_recognised_by_the_bloom_filter():
+    async def run():
+        dedup = MessageDeduplicator(max_results=1)
+        calls = []
+        await dedup.run("m1", counting_process(calls, delay=0))
+        await dedup.run("m2", counting_process(calls, delay=0))
+        return await dedup.run("m1", counting_process(calls, delay=0)), calls
+
+    result, calls = asyncio.run(run())
+    assert result == {'status': 'duplicate', 'message_id': "m1"}
+    assert len(calls) == 2
+
+def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "dedup.json")
+
+    async def first():
+        dedup = MessageDeduplicator(state_path=path)
+        await dedup.run("m1", counting_process([]))
+        dedup.save()
+
+    asyncio.run(first())
+    restored = MessageDeduplicator(state_path=path)
+    calls = []
+    assert asyncio.run(restored.run("m1", counting_process(calls))) == {'status': 'success', 'n': 1}
+    assert calls == []
+
+def test_bloom_filter_rotates_out_old_generations():
+    bloom = RotatingBloomFilter(capacity=100, error_rate=0.001)
+    for i in range(100):
+        bloom.add(f"old-{i}")
+    for i in range(200):
+        bloom.add(f"new-{i}")
+    assert all(f"new-{i}" in bloom for i in range(100, 200))
+    assert sum(f"old-{i}" in bloom for i in range(100)) < 5
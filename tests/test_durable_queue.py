@@ -0,0 +1,155 @@
+import asyncio
+import time
+from workflow.durable_queue import DurableQueue, DurableWorker
+
+class CountingOrchestrator:
+    def __init__(self, crash_in_response=False, error_in_response=False, error_in_intake=False):
+        self.calls = {'intake': 0, 'classification': 0, 'response': 0}
+        self.crash_in_response = crash_in_response
+        self.error_in_response = error_in_response
+        self.error_in_intake = error_in_intake
+
+    async def run_intake(self, email_data):
+        self.calls['intake'] += 1
+        if self.error_in_intake:
+            return {'status': 'error', 'error': "Missing required field: from"}
+        return {'status': 'success', 'parsed_data': dict(email_data)}
+
+    async def run_classification(self, intake_result):
+        self.calls['classification'] += 1
+        return {'status': 'success', 'classification': {'category': 'SUPPORT', 'priority': 'LOW'}}
+
+    async def respond(self, intake_result, classification_result):
+        self.calls['response'] += 1
+        if self.crash_in_response:
+            raise RuntimeError("worker died")
+        if self.error_in_response:
+            return {'status': 'error', 'error': "LLM unavailable", 'transient': True}
+        return {'status': 'success', 'id': intake_result['parsed_data']['message_id']}
+
+def make_queue(tmp_path, **kwargs):
+    return DurableQueue(str(tmp_path / "queue.db"), **kwargs)
+
+def test_jobs_run_once_and_duplicates_are_ignored(tmp_path):
+    queue = make_queue(tmp_path)
+    for i in range(5):
+        queue.enqueue({'message_id': f"m{i}"})
+    queue.enqueue({'message_id': "m0"})
+
+    orchestrator = CountingOrchestrator()
+    handled = asyncio.run(DurableWorker(orchestrator, queue, concurrency=2).drain())
+
+    assert handled == 5
+    assert orchestrator.calls == {'intake': 5, 'classification': 5, 'response': 5}
+    assert queue.result("m3") == {'status': 'success', 'id': "m3"}
+    assert queue.stats() == {'pending': 0, 'done': 5, 'failed': 0}
+
+def test_failed_job_resumes_from_last_checkpoint(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue({'message_id': "m1"})
+
+    crashing = CountingOrchestrator(crash_in_response=True)
+    asyncio.run(DurableWorker(crashing, queue).process(queue.lease()[0]))
+
+    # A fresh process picks the job up without redoing intake or classification
+    restarted = CountingOrchestrator()
+    lease = make_queue(tmp_path).lease()[0]
+    assert set(lease.checkpoints) == {'intake', 'classification'}
+    assert lease.attempts == 2
+    asyncio.run(DurableWorker(restarted, make_queue(tmp_path)).process(lease))
+    assert restarted.calls == {'intake': 0, 'classification': 0, 'response': 1}
+
+def test_expired_lease_is_visible_to_other_workers(tmp_path):
+    first = make_queue(tmp_path, visibility_timeout=0.05, worker_id="a")
+    second = make_queue(tmp_path, visibility_timeout=0.05, worker_id="b")
+    first.enqueue({'message_id': "m1"})
+
+    lease = first.lease()[0]
+    assert second.lease() == []
+    time.sleep(0.06)
+
+    taken = second.lease()
+    assert [l.job_id for l in taken] == ["m1"]
+    # The worker that lost the lease can no longer extend or complete it
+    assert not first.extend(lease)
+    first.complete(lease, {'status': 'success'})
+    first.flush()
+    assert first.result("m1") is None
+
+def test_jobs_are_parked_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    queue.enqueue({'message_id': "m1"})
+    for _ in range(2):
+        asyncio.run(DurableWorker(CountingOrchestrator(crash_in_response=True), queue).process(queue.lease()[0]))
+    assert queue.lease() == []
+    assert queue.stats()['failed'] == 1
+
+def test_checkpoints_are_group_committed(tmp_path):
+    queue = make_queue(tmp_path, group_commit_size=3, group_commit_ms=60000)
+    ids = [queue.enqueue({'message_id': f"m{i}"}) for i in range(3)]
+    leases = queue.lease(limit=3)
+
+    reader = make_queue(tmp_path)
+    queue.checkpoint(leases[0], 'intake', {'status': 'success'})
+    queue.checkpoint(leases[1], 'intake', {'status': 'success'})
+    assert reader._db.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] == 0
+    queue.checkpoint(leases[2], 'intake', {'status': 'success'})
+    assert reader._db.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] == len(ids)
+
+def test_error_results_are_retried_not_completed(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue({'message_id': "m1"})
+
+    result = asyncio.run(DurableWorker(CountingOrchestrator(error_in_response=True), queue).process(queue.lease()[0]))
+    assert result == {'status': 'error', 'error': "LLM unavailable", 'transient': True}
+    assert queue.result("m1") is None
+
+    retried = CountingOrchestrator()
+    lease = queue.lease()[0]
+    assert lease.attempts == 2 and set(lease.checkpoints) == {'intake', 'classification'}
+    asyncio.run(DurableWorker(retried, queue).process(lease))
+    assert queue.result("m1") == {'status': 'success', 'id': "m1"}
+
+def test_job_that_kills_its_worker_is_parked_at_lease_time(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=0.01, max_attempts=2)
+    queue.enqueue({'message_id': "m1"})
+    for _ in range(2):
+        # The worker dies mid-job: neither complete() nor fail() is ever called
+        assert [lease.job_id for lease in queue.lease()] == ["m1"]
+        time.sleep(0.02)
+    assert queue.lease() == []
+    assert queue.stats() == {'pending': 0, 'done': 0, 'failed': 1}
+
+def test_submit_processes_the_email_in_the_callers_task(tmp_path):
+    queue = make_queue(tmp_path)
+    orchestrator = CountingOrchestrator()
+    worker = DurableWorker(orchestrator, queue)
+
+    async def run():
+        return await worker.submit({'message_id': "m1"}), await worker.submit({'message_id': "m1"})
+
+    first, again = asyncio.run(run())
+    assert first == again == {'status': 'success', 'id': "m1"}
+    assert orchestrator.calls['response'] == 1
+
+def test_deterministic_errors_are_parked_without_retrying(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue({'message_id': "m1"})
+
+    orchestrator = CountingOrchestrator(error_in_intake=True)
+    asyncio.run(DurableWorker(orchestrator, queue).process(queue.lease()[0]))
+    assert queue.lease() == []
+    assert queue.stats() == {'pending': 0, 'done': 0, 'failed': 1}
+    assert queue.error("m1") == "Missing required field: from"
+    assert orchestrator.calls['intake'] == 1
+
+def test_resubmitting_a_parked_job_returns_its_error(tmp_path):
+    queue = make_queue(tmp_path)
+    worker = DurableWorker(CountingOrchestrator(error_in_intake=True), queue)
+
+    async def run():
+        return await worker.submit({'message_id': "m1"}), await worker.submit({'message_id': "m1"})
+
+    first, again = asyncio.run(run())
+    assert first == {'status': 'error', 'error': "Missing required field: from"}
+    assert again == {'status': 'error', 'error': "Missing required field: from", 'job_id': "m1"}
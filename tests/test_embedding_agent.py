@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import pytest
+from agents.embedding_agent import EmailEmbeddingAgent
+from agents.support_agent import SupportAgent
+from ml_models.embeddings import TextEmbedder
+from ml_models.kb_index import KnowledgeBaseIndex
+
+class CountingEmbedder(TextEmbedder):
+    # Hashed vectors, trusted like a model's so the KB index searches locally
+    semantic = True
+
+    def __init__(self):
+        super().__init__(dim=256)
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(len(texts))
+        return super().embed(texts)
+
+class FakeKnowledgeBase:
+    async def list_articles(self, updated_since=None):
+        return [{'id': 1, 'content': "Use the forgot password link to reset your password.", 'updated_at': 1}]
+
+def test_concurrent_emails_are_embedded_in_one_batch():
+    embedder = CountingEmbedder()
+    agent = EmailEmbeddingAgent(embedder)
+
+    async def run():
+        return await asyncio.gather(*(agent.process({'body': f"email number {i}"}) for i in range(8)))
+
+    results = asyncio.run(run())
+    assert embedder.calls == [8]
+    assert all(result['status'] == 'success' and len(result['embedding']) == 256 for result in results)
+
+def test_kb_search_reuses_the_intake_embedding(tmp_path):
+    embedder = CountingEmbedder()
+    index = KnowledgeBaseIndex(FakeKnowledgeBase(), str(tmp_path / "kb"), embedder=embedder)
+    email = {'body': "I forgot my password, how do I reset it?"}
+
+    async def run():
+        await index.refresh()
+        embedder.calls.clear()
+        embedding = (await EmailEmbeddingAgent(embedder).process(email))['embedding']
+        return await index.search(email['body'], limit=3, min_relevance=0.2, embedding=embedding)
+
+    assert [article['id'] for article in asyncio.run(run())] == [1]
+    # One embedding for the email; the KB search did not embed it again
+    assert embedder.calls == [1]
+
+class RemoteKnowledgeBase:
+    async def search(self, query, limit, min_relevance):
+        return [{'id': 'remote', 'content': "Reset it from the login page."}]
+
+def test_remote_kb_clients_are_called_without_the_embedding():
+    # SupportAgent() needs templates this tree does not define; only the search path is under test
+    agent = SupportAgent.__new__(SupportAgent)
+    agent.kb_client = RemoteKnowledgeBase()
+    agent.logger = logging.getLogger("SupportAgent")
+
+    results = asyncio.run(agent._search_knowledge_base("reset my password", embedding=[0.1] * 256))
+    assert results == {'articles': [{'id': 'remote', 'content': "Reset it from the login page."}], 'total_found': 1}
+
+def test_emails_are_only_embedded_for_the_local_kb_index(tmp_path, monkeypatch):
+    pytest.importorskip("googleapiclient")
+    from config.settings import settings
+    from workflow.email_orchestrator import EmailOrchestrator
+
+    monkeypatch.setattr(settings, 'CONVERSATION_STORE_ENABLED', False)
+    monkeypatch.setattr(settings, 'KB_INDEX_PATH', str(tmp_path / "kb"))
+    config = {'knowledge_base_client': FakeKnowledgeBase(), 'vector_db_client': None, 'calendar_credentials': None}
+
+    # Default settings: no sentence model, so no KB index and nothing reads the vector
+    orchestrator = EmailOrchestrator(config)
+    assert not orchestrator.embed_emails and "embedding" not in list(orchestrator.core_agents)
+
+    monkeypatch.setattr(settings, 'EMBEDDING_MODEL_NAME', "sentence-model")
+    # Only whether an index exists matters here, not loading the sentence model behind it
+    monkeypatch.setattr(KnowledgeBaseIndex, 'from_settings', classmethod(lambda cls, client: object()))
+    assert EmailOrchestrator(config).embed_emails
+    assert not EmailOrchestrator({**config, 'categories': ["INQUIRY"]}).embed_emails
@@ -0,0 +1,135 @@
+import asyncio
+import re
+import numpy as np
+from ml_models.embeddings import TextEmbedder, normalize_rows
+from ml_models.kb_index import KnowledgeBaseIndex
+
+ARTICLES = [
+    {'id': 1, 'title': "Reset your password", 'content': "Use the forgot password link on the login page to reset your password.", 'updated_at': 1},
+    {'id': 2, 'title': "Refunds", 'content': "Duplicate charges are refunded to the original card within five days.", 'updated_at': 2},
+    {'id': 3, 'title': "Export data", 'content': "Download a CSV export of your invoices from the billing settings.", 'updated_at': 3},
+]
+
+class FakeKnowledgeBase:
+    def __init__(self, articles):
+        self.articles = list(articles)
+        self.cursors = []
+        self.remote_searches = 0
+
+    async def list_articles(self, updated_since=None):
+        self.cursors.append(updated_since)
+        return [a for a in self.articles if updated_since is None or a['updated_at'] > updated_since]
+
+    async def search(self, query, limit, min_relevance):
+        self.remote_searches += 1
+        return [{'id': 'remote'}]
+
+class LexicalEmbedder(TextEmbedder):
+    # Hashed vectors, trusted like a model's so the index mechanics can be tested without weights
+    semantic = True
+
+class TopicEmbedder(TextEmbedder):
+    """Stands in for a sentence model: texts about the same topic score close to 1"""
+    semantic = True
+    TOPICS = {'password': 0, 'login': 0, 'reset': 0, 'refund': 1, 'refunded': 1, 'charges': 1, 'csv': 2, 'invoices': 2}
+
+    def __init__(self):
+        super().__init__(dim=4)
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        vectors[:, 3] = 0.01
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z]+", text.lower()):
+                if word in self.TOPICS:
+                    vectors[row, self.TOPICS[word]] += 1
+        return normalize_rows(vectors)
+
+def make_index(tmp_path, source, **kwargs):
+    return KnowledgeBaseIndex(source, str(tmp_path / "kb"), embedder=LexicalEmbedder(dim=1024), **kwargs)
+
+def test_search_ranks_articles_and_applies_thresholds(tmp_path):
+    source = FakeKnowledgeBase(ARTICLES)
+    index = make_index(tmp_path, source)
+
+    async def run():
+        before = await index.search("how do I reset my password", limit=3, min_relevance=0.1)
+        await index.refresh()
+        return before, await index.search("how do I reset my password", limit=3, min_relevance=0.1)
+
+    before, results = asyncio.run(run())
+    assert before == [{'id': 'remote'}] and source.remote_searches == 1
+    assert results[0]['id'] == 1 and 0.1 <= results[0]['relevance'] <= 1.0
+    assert all(r['relevance'] >= 0.1 for r in results)
+    assert [r['relevance'] for r in results] == sorted((r['relevance'] for r in results), reverse=True)
+    assert asyncio.run(index.search("how do I reset my password", limit=1, min_relevance=0.99)) == []
+
+def test_batched_queries_match_single_queries(tmp_path):
+    index = make_index(tmp_path, FakeKnowledgeBase(ARTICLES))
+    queries = ["reset password", "refund duplicate charges", "csv invoices export"]
+
+    async def run():
+        await index.refresh()
+        return await index.search_many(queries, limit=1, min_relevance=0.0), [
+            await index.search(query, limit=1, min_relevance=0.0) for query in queries
+        ]
+
+    batched, single = asyncio.run(run())
+    assert batched == single
+    assert [results[0]['id'] for results in batched] == [1, 2, 3]
+
+def test_refresh_is_incremental_and_persisted(tmp_path):
+    source = FakeKnowledgeBase(ARTICLES)
+    index = make_index(tmp_path, source)
+    asyncio.run(index.refresh())
+
+    source.articles.append({'id': 2, 'content': "Refunds now take ten days.", 'updated_at': 4})
+    source.articles.append({'id': 3, 'deleted': True, 'updated_at': 5})
+    assert asyncio.run(index.refresh()) == 2
+    assert source.cursors == [None, 3]
+    # The superseded and deleted rows were compacted away
+    assert index.stats() == {'articles': 2, 'rows': 2, 'ivf_lists': 0, 'cursor': 5}
+
+    reopened = make_index(tmp_path, source)
+    results = asyncio.run(reopened.search("refunds ten days", limit=3, min_relevance=0.3))
+    assert [r['id'] for r in results] == [2] and results[0]['content'] == "Refunds now take ten days."
+    assert source.remote_searches == 0
+
+def test_cluster_pruned_search_agrees_with_full_scan(tmp_path):
+    articles = [
+        {'id': i, 'content': f"topic {i % 7} article {i} about subject {i % 7}", 'updated_at': i}
+        for i in range(60)
+    ]
+    full = make_index(tmp_path / "full", FakeKnowledgeBase(articles))
+    pruned = make_index(tmp_path / "ivf", FakeKnowledgeBase(articles), ivf_lists=4, ivf_probes=4, ivf_min_rows=10)
+
+    async def run(index):
+        await index.refresh()
+        return await index.search_many(["subject 3 topic 3", "article 10"], limit=5, min_relevance=0.0)
+
+    assert pruned.stats()['ivf_lists'] == 0
+    assert asyncio.run(run(pruned)) == asyncio.run(run(full))
+    assert pruned.stats()['ivf_lists'] == 4
+
+def test_support_threshold_with_a_sentence_model(tmp_path):
+    index = KnowledgeBaseIndex(FakeKnowledgeBase(ARTICLES), str(tmp_path / "kb"), embedder=TopicEmbedder())
+
+    async def run():
+        await index.refresh()
+        # SupportAgent's own limit and cut-off
+        return await index.search("I can't log in, how do I reset my password?", limit=3, min_relevance=0.7)
+
+    results = asyncio.run(run())
+    assert [r['id'] for r in results] == [1] and results[0]['relevance'] >= 0.7
+
+def test_hashed_embeddings_keep_searching_the_source(tmp_path):
+    source = FakeKnowledgeBase(ARTICLES)
+    index = KnowledgeBaseIndex(source, str(tmp_path / "kb"), embedder=TextEmbedder(dim=384))
+
+    async def run():
+        await index.refresh()
+        return await index.search("I can't log in, how do I reset my password?", limit=3, min_relevance=0.7)
+
+    # Word-hash cosines sit far below 0.7, so the local index would return nothing
+    assert asyncio.run(run()) == [{'id': 'remote'}]
+    assert source.remote_searches == 1
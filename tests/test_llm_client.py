@@ -0,0 +1,203 @@
+import asyncio
+import json
+import time
+import pytest
+from ml_models.llm_client import LLMClient, LLMError, TokenBucket
+
+class FakeCompletionServer:
+    """Tiny keep-alive HTTP/1.1 server speaking the completions API"""
+
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.connections = 0
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode().strip()
+                    if not line:
+                        break
+                    name, value = line.split(':', 1)
+                    headers[name.lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers['content-length'])))
+                self.requests.append((body, headers))
+
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                await asyncio.sleep(self.delay)
+                self.in_flight -= 1
+
+                status = self.failures.pop(0) if self.failures else 200
+                text = f"  reply to {body['prompt']}  "
+                if status == 200 and body.get('stream'):
+                    events = [{'choices': [{'text': word}]} for word in text.split(' ')]
+                    data = ''.join(f"data: {json.dumps(event)}\n\n" for event in events)
+                    data = (data + "data: [DONE]\n\n").encode()
+                    content_type = "text/event-stream"
+                else:
+                    payload = {'choices': [{'text': text}], 'usage': {'total_tokens': 10}}
+                    data = json.dumps(payload if status == 200 else {'error': 'busy'}).encode()
+                    content_type = "application/json"
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+def make_client(url, **kwargs):
+    options = dict(api_key="secret", requests_per_minute=0, tokens_per_minute=0, backoff_base=0.01)
+    options.update(kwargs)
+    return LLMClient(url, **options)
+
+def test_completions_reuse_pooled_connections():
+    async def run():
+        async with FakeCompletionServer() as server:
+            client = make_client(server.url)
+            replies = [await client.complete(f"email {i}") for i in range(5)]
+            await client.close()
+            return server, replies
+
+    server, replies = asyncio.run(run())
+    assert replies[0] == "reply to email 0"
+    assert server.connections == 1
+    body, headers = server.requests[0]
+    assert body['model'] == "deepseek-r1" and body['max_tokens'] == 500
+    assert headers['authorization'] == "Bearer secret"
+
+def test_concurrency_is_capped():
+    async def run():
+        async with FakeCompletionServer(delay=0.02) as server:
+            client = make_client(server.url, max_concurrency=3)
+            await asyncio.gather(*(client.complete(f"email {i}") for i in range(10)))
+            await client.close()
+            return server.max_in_flight
+
+    assert asyncio.run(run()) == 3
+
+def test_throttling_and_server_errors_are_retried():
+    async def run():
+        async with FakeCompletionServer(failures=[429, 503]) as server:
+            client = make_client(server.url)
+            reply = await client.complete("hello")
+            await client.close()
+            return reply, len(server.requests)
+
+    assert asyncio.run(run()) == ("reply to hello", 3)
+
+def test_every_attempt_takes_rate_limit_budget():
+    async def run():
+        async with FakeCompletionServer(failures=[429, 503]) as server:
+            client = make_client(server.url, requests_per_minute=60)
+            await client.complete("hello")
+            await client.close()
+            return client.request_bucket._tokens
+
+    # Three attempts, three requests taken from the minute's budget
+    assert asyncio.run(run()) < 58
+
+def test_pool_of_a_finished_event_loop_is_closed():
+    async def run(client):
+        async with FakeCompletionServer() as server:
+            client.base_url = server.url
+            await client.complete("hello")
+            return client._client
+
+    client = make_client("http://unused")
+    first = asyncio.run(run(client))
+    assert not first.is_closed
+
+    async def rebind():
+        second = await run(client)
+        assert first.is_closed and not second.is_closed
+        await client.close()
+
+    asyncio.run(rebind())
+
+def test_client_errors_and_exhausted_retries_raise():
+    async def run(failures, **kwargs):
+        async with FakeCompletionServer(failures=failures) as server:
+            client = make_client(server.url, **kwargs)
+            try:
+                with pytest.raises(LLMError) as raised:
+                    await client.complete("hello")
+            finally:
+                await client.close()
+            return len(server.requests), raised.value.transient
+
+    # Only failures that may clear up later are marked for the durable queue to retry
+    assert asyncio.run(run([400])) == (1, False)
+    assert asyncio.run(run([500, 500, 500], max_retries=2)) == (3, True)
+
+def test_slow_responses_time_out():
+    async def run():
+        async with FakeCompletionServer(delay=0.5) as server:
+            client = make_client(server.url, max_retries=0)
+            try:
+                with pytest.raises(LLMError) as raised:
+                    await client.complete("hello", timeout=0.05)
+                assert raised.value.transient
+            finally:
+                await client.close()
+
+    asyncio.run(run())
+
+def test_stream_yields_chunks_and_retries_before_the_first():
+    async def run():
+        async with FakeCompletionServer(failures=[503]) as server:
+            client = make_client(server.url)
+            chunks = [chunk async for chunk in client.stream("hello")]
+            await client.close()
+            return chunks, server.requests
+
+    chunks, requests = asyncio.run(run())
+    assert ' '.join(chunks).strip() == "reply to hello"
+    assert len(requests) == 2 and requests[-1][0]['stream'] is True
+
+def test_slow_stream_reader_does_not_hold_a_concurrency_slot():
+    async def run():
+        async with FakeCompletionServer() as server:
+            client = make_client(server.url, max_concurrency=1)
+            stream = client.stream("slow")
+            first = await stream.__anext__()
+            # The stream's reader stalls here; another call still gets the only slot
+            reply = await asyncio.wait_for(client.complete("hello"), 1.0)
+            await stream.aclose()
+            await client.close()
+            return first, reply
+
+    first, reply = asyncio.run(run())
+    assert first and reply == "reply to hello"
+
+def test_token_bucket_paces_requests():
+    async def run():
+        bucket = TokenBucket(per_minute=600, capacity=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Two requests ride the burst, the other two wait 0.1s each
+    assert 0.15 < asyncio.run(run()) < 0.5
@@ -0,0 +1,63 @@
+from ml_models.registry import ModelRegistry
+
+def make_registry():
+    loads = []
+
+    def loader(model_name, num_labels):
+        loads.append((model_name, num_labels))
+        return f"model:{model_name}", f"tokenizer:{model_name}"
+
+    return ModelRegistry(loader=loader), loads
+
+def test_models_load_lazily_and_once_per_key():
+    registry, loads = make_registry()
+    first = registry.acquire("bert-base-uncased")
+    second = registry.acquire("bert-base-uncased")
+    assert loads == []
+
+    assert first.model == "model:bert-base-uncased"
+    assert second.tokenizer == "tokenizer:bert-base-uncased"
+    assert loads == [("bert-base-uncased", None)]
+    assert registry.stats()["bert-base-uncased:None:fp32"]["ref_count"] == 2
+
+def test_distinct_label_counts_are_distinct_models():
+    registry, loads = make_registry()
+    registry.acquire("deepseek", num_labels=4).model
+    registry.acquire("deepseek", num_labels=5).model
+    assert len(loads) == 2
+
+def test_idle_models_unload_once_released_and_reload_on_demand():
+    registry, loads = make_registry()
+    handle = registry.acquire("bert-base-uncased")
+    handle.model
+
+    # A live handle keeps its model loaded however long it sits idle
+    assert registry.unload_idle(max_idle_seconds=0) == []
+    assert registry.stats()["bert-base-uncased:None:fp32"]["loaded"] is True
+
+    handle.release()
+    assert registry.unload_idle(max_idle_seconds=0) == [("bert-base-uncased", None, "fp32")]
+    handle.model
+    assert len(loads) == 2
+
+def test_models_in_use_are_not_unloaded():
+    registry, loads = make_registry()
+    handle = registry.acquire("bert-base-uncased")
+    handle.model
+    handle.release()
+
+    entry = registry._entries[("bert-base-uncased", None, "fp32")]
+    with entry.lock:
+        # Another thread is reading or loading the model
+        assert registry.unload_idle(max_idle_seconds=0) == []
+    assert registry.stats()["bert-base-uncased:None:fp32"]["loaded"] is True
+
+def test_released_models_are_dropped_when_idle():
+    registry, _ = make_registry()
+    handle = registry.acquire("bert-base-uncased")
+    handle.model
+    handle.release()
+    handle.release()
+
+    registry.unload_idle(max_idle_seconds=0)
+    assert registry.stats() == {}
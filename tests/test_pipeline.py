@@ -0,0 +1,81 @@
+import asyncio
+import time
+from workflow.pipeline import EmailPipeline
+
+class FakeOrchestrator:
+    def __init__(self, agent_delay=0.0):
+        self.agent_mapping = {"SUPPORT": None, "MEETING": None}
+        self.agent_delay = agent_delay
+        self.max_in_flight = 0
+        self.in_flight = 0
+
+    async def run_intake(self, email_data):
+        if email_data.get('malformed'):
+            return {'status': 'error', 'error': 'unparseable'}
+        return {'status': 'success', 'parsed_data': dict(email_data)}
+
+    async def run_classification(self, intake_result):
+        if intake_result['parsed_data'].get('explode'):
+            raise RuntimeError("model crashed")
+        category = intake_result['parsed_data']['category']
+        return {'status': 'success', 'classification': {'category': category}}
+
+    def route(self, classification_result):
+        return classification_result['classification']['category']
+
+    async def run_agent(self, intake_result, classification_result):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.agent_delay)
+        self.in_flight -= 1
+        return {'status': 'success', 'id': intake_result['parsed_data']['id']}
+
+def run_pipeline(orchestrator, emails, **kwargs):
+    async def run():
+        async with EmailPipeline(orchestrator, **kwargs) as pipeline:
+            return await pipeline.process_many(emails)
+    return asyncio.run(run())
+
+def test_results_come_back_in_input_order():
+    emails = [{'id': i, 'category': 'SUPPORT' if i % 2 else 'MEETING'} for i in range(20)]
+    results = run_pipeline(FakeOrchestrator(), emails)
+    assert [r['id'] for r in results] == list(range(20))
+
+def test_responders_run_concurrently():
+    orchestrator = FakeOrchestrator(agent_delay=0.05)
+    emails = [{'id': i, 'category': 'SUPPORT'} for i in range(20)]
+
+    start = time.monotonic()
+    run_pipeline(orchestrator, emails, concurrency={'SUPPORT': 10})
+    assert time.monotonic() - start < 0.5
+    assert orchestrator.max_in_flight == 10
+
+def test_failures_do_not_stall_the_pipeline():
+    emails = [
+        {'id': 0, 'category': 'SUPPORT'},
+        {'id': 1, 'malformed': True},
+        {'id': 2, 'category': 'SUPPORT', 'explode': True},
+        {'id': 3, 'category': 'UNKNOWN'},
+        {'id': 4, 'category': 'MEETING'},
+    ]
+    results = run_pipeline(FakeOrchestrator(), emails)
+    assert [r['status'] for r in results] == ['success', 'error', 'error', 'error', 'success']
+    assert results[2]['stage'] == 'classification'
+
+def test_full_queues_push_back_on_submitters():
+    orchestrator = FakeOrchestrator(agent_delay=0.05)
+
+    async def run():
+        concurrency = {'intake': 1, 'classification': 1, 'default': 1}
+        async with EmailPipeline(orchestrator, queue_size=1, concurrency=concurrency) as pipeline:
+            accepted = 0
+            for i in range(20):
+                try:
+                    await asyncio.wait_for(pipeline.submit({'id': i, 'category': 'SUPPORT'}), 0.01)
+                except asyncio.TimeoutError:
+                    break
+                accepted += 1
+            return accepted
+
+    # One slot per queue plus one per worker across the three stages
+    assert asyncio.run(run()) <= 6
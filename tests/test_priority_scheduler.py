@@ -0,0 +1,143 @@
+import asyncio
+import pytest
+from workflow.pipeline import EmailPipeline
+from workflow.priority_scheduler import PriorityScheduler
+
+def make_job(order, name, delay=0.01):
+    async def job():
+        await asyncio.sleep(delay)
+        order.append(name)
+        return name
+    return job
+
+def test_urgent_overtakes_a_low_backlog():
+    async def run():
+        scheduler = PriorityScheduler(concurrency=1, max_wait_seconds=60)
+        order = []
+        low = [await scheduler.submit("LOW", make_job(order, f"low-{i}")) for i in range(10)]
+        urgent = await scheduler.submit("URGENT", make_job(order, "urgent"))
+        await asyncio.gather(urgent, *low)
+        await scheduler.stop()
+        return order
+
+    order = asyncio.run(run())
+    # At most the job that was already running finishes first
+    assert order.index("urgent") <= 1
+
+def test_weights_share_slots_proportionally():
+    async def run():
+        scheduler = PriorityScheduler(concurrency=1, weights={"HIGH": 3, "LOW": 1}, max_wait_seconds=60)
+        order = []
+        futures = []
+        for i in range(12):
+            futures.append(await scheduler.submit("LOW", make_job(order, "LOW", 0)))
+            futures.append(await scheduler.submit("HIGH", make_job(order, "HIGH", 0)))
+        await asyncio.gather(*futures)
+        await scheduler.stop()
+        return order
+
+    first = asyncio.run(run())[:8]
+    assert first.count("HIGH") == 6
+    assert first.count("LOW") == 2
+
+def test_old_jobs_are_not_starved():
+    async def run():
+        scheduler = PriorityScheduler(concurrency=1, max_wait_seconds=0.05)
+        order = []
+        low = await scheduler.submit("LOW", make_job(order, "low"))
+        urgent = [await scheduler.submit("URGENT", make_job(order, f"urgent-{i}")) for i in range(20)]
+        await asyncio.gather(low, *urgent)
+        await scheduler.stop()
+        return order
+
+    assert asyncio.run(run()).index("low") < 15
+
+def test_reserved_slots_stay_free_for_urgent_mail():
+    async def run():
+        scheduler = PriorityScheduler(concurrency=3, reservations={"URGENT": 1}, max_wait_seconds=60)
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+
+        low = [await scheduler.submit("LOW", blocked) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        running_low = sum(scheduler._active.values())
+
+        result = await asyncio.wait_for(scheduler.run("URGENT", make_job([], "urgent", 0)), 1)
+        release.set()
+        await asyncio.gather(*low)
+        await scheduler.stop()
+        return running_low, result
+
+    assert asyncio.run(run()) == (2, "urgent")
+
+def test_failed_job_raises_to_its_caller_only():
+    async def run():
+        scheduler = PriorityScheduler(concurrency=2)
+
+        async def broken():
+            raise RuntimeError("agent crashed")
+
+        with pytest.raises(RuntimeError):
+            await scheduler.run("HIGH", broken)
+        result = await scheduler.run("HIGH", make_job([], "ok", 0))
+        await scheduler.stop()
+        return result
+
+    assert asyncio.run(run()) == "ok"
+
+class ScheduledOrchestrator:
+    def __init__(self):
+        self.agent_mapping = {"SUPPORT": None}
+        self.scheduler = PriorityScheduler(concurrency=2)
+
+    async def run_intake(self, email_data):
+        return {'status': 'success', 'parsed_data': dict(email_data)}
+
+    async def run_classification(self, intake_result):
+        data = intake_result['parsed_data']
+        return {'status': 'success', 'classification': {'category': 'SUPPORT', 'priority': data['priority']}}
+
+    def route(self, classification_result):
+        return classification_result['classification']['category']
+
+    async def run_agent(self, intake_result, classification_result):
+        if intake_result['parsed_data'].get('explode'):
+            raise RuntimeError("agent crashed")
+        if intake_result['parsed_data'].get('cancel'):
+            raise asyncio.CancelledError()
+        return {'status': 'success', 'id': intake_result['parsed_data']['id']}
+
+def test_pipeline_routes_responders_through_the_scheduler():
+    emails = [
+        {'id': 0, 'priority': 'LOW'},
+        {'id': 1, 'priority': 'URGENT', 'explode': True},
+        {'id': 2, 'priority': 'HIGH'},
+    ]
+
+    async def run():
+        orchestrator = ScheduledOrchestrator()
+        async with EmailPipeline(orchestrator) as pipeline:
+            assert 'SUPPORT' not in pipeline.stages
+            results = await pipeline.process_many(emails)
+        await orchestrator.scheduler.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert [r['status'] for r in results] == ['success', 'error', 'success']
+    assert results[1]['stage'] == 'responder'
+
+def test_cancelled_responder_jobs_resolve_as_errors():
+    emails = [{'id': 0, 'priority': 'HIGH', 'cancel': True}, {'id': 1, 'priority': 'LOW'}]
+
+    async def run():
+        orchestrator = ScheduledOrchestrator()
+        async with EmailPipeline(orchestrator) as pipeline:
+            results = await asyncio.wait_for(pipeline.process_many(emails), 2.0)
+        await orchestrator.scheduler.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert [r['status'] for r in results] == ['error', 'success']
+    assert results[0]['error'] == "Responder job was cancelled"
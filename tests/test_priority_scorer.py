@@ -0,0 +1,79 @@
+import random
+from ml_models.priority_scorer import KeywordMatcher, PriorityScorer
+
+LEVELS = ["LOW", "MEDIUM", "HIGH", "URGENT"]
+
+LEGACY_KEYWORDS = {
+    'URGENT': ['urgent', 'asap', 'emergency', 'immediate'],
+    'HIGH': ['important', 'priority', 'critical'],
+    'MEDIUM': ['please', 'when possible', 'need'],
+    'LOW': ['fyi', 'update', 'newsletter']
+}
+
+def legacy_score(text):
+    """The per-keyword substring scorer the classification agent used before"""
+    text_lower = text.lower()
+    scores = {level: 0.0 for level in LEVELS}
+    for level, words in LEGACY_KEYWORDS.items():
+        for word in words:
+            if word in text_lower:
+                scores[level] += 1
+    max_priority = max(scores.items(), key=lambda x: x[1])
+    return {
+        'priority': max_priority[0],
+        'confidence': max_priority[1] / sum(scores.values()) if sum(scores.values()) > 0 else 0.5
+    }
+
+def test_matcher_respects_word_boundaries():
+    matcher = KeywordMatcher(["need", "update", "up", "when possible", "possible"], word_boundary=True)
+    assert matcher.find("Needle UPDATE, up-front when possible") == {"update", "up", "when possible", "possible"}
+    assert matcher.find("updates needed") == set()
+
+def test_matcher_without_boundaries_finds_nested_and_overlapping_keywords():
+    matcher = KeywordMatcher(["need", "needle", "update", "up", "date", "fyi"])
+    assert matcher.find("Needles UPDATED") == {"need", "needle", "update", "up", "date"}
+    assert matcher.find("fy i") == set()
+
+def test_default_rules_score_like_the_legacy_substring_scorer():
+    scorer = PriorityScorer.from_config(LEVELS)
+    words = ["needed", "updates", "urgently", "please", "when", "possible", "fyi:", "Critical",
+             "newsletters", "immediately", "ASAP!", "priority", "hello", "up", "date", "emergency"]
+    rng = random.Random(7)
+    texts = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 12))) for _ in range(500)]
+    texts += ["Updates needed when possible", "whenpossible", "fyi newsletter update"]
+    for text in texts:
+        assert scorer.score(text) == legacy_score(text), text
+
+def test_weights_decide_the_priority():
+    scorer = PriorityScorer(LEVELS, {
+        "URGENT": {"asap": 3.0},
+        "LOW": {"fyi": 1.0, "newsletter": 1.0}
+    })
+    result = scorer.score("FYI newsletter - reply asap")
+    assert result == {'priority': 'URGENT', 'confidence': 0.6}
+
+def test_no_keywords_matches_legacy_default():
+    scorer = PriorityScorer.from_config(LEVELS)
+    assert scorer.score("hello there") == {'priority': 'LOW', 'confidence': 0.5}
+
+def test_score_many_matches_score():
+    scorer = PriorityScorer.from_config(LEVELS)
+    texts = ["urgent: server down", "fyi weekly update", "please send the report"]
+    assert scorer.score_many(texts) == [scorer.score(text) for text in texts]
+
+def test_large_rule_sets_switch_to_the_compiled_scan():
+    keywords = ["need", "update", "up"] + [f"kw{i}" for i in range(60)]
+    small = KeywordMatcher(keywords[:3])
+    large = KeywordMatcher(keywords)
+    assert not small.use_regex and large.use_regex
+    assert large.find("Needles UPDATED, kw7") == {"need", "update", "up", "kw7"}
+    assert KeywordMatcher([], word_boundary=True).find("anything") == set()
+
+def test_find_many_matches_find_for_each_text():
+    texts = ["fyi update", "İstanbul needs an update", "", "fyi update", "kw3 asap"]
+    for matcher in (
+        KeywordMatcher(["fyi", "update", "need", "asap", "kw3"]),
+        KeywordMatcher(["fyi", "update", "need", "asap", "kw3"], max_substring_keywords=0),
+        KeywordMatcher(["fyi", "update", "need", "asap", "kw3"], word_boundary=True)
+    ):
+        assert matcher.find_many(texts) == [matcher.find(text) for text in texts]
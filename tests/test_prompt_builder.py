@@ -0,0 +1,89 @@
+import re
+from ml_models.prompt_builder import PromptBuilder, TokenCounter, TRIM_MARKER
+
+class WordCounter(TokenCounter):
+    """One token per word keeps budgets easy to reason about"""
+
+    def __init__(self, cache_size=4096):
+        super().__init__(cache_size=cache_size)
+        self.calls = 0
+        self.span_calls = []
+
+    def _count(self, text):
+        self.calls += 1
+        return len(text.split())
+
+    def spans(self, text):
+        self.span_calls.append(len(text))
+        return [match.span() for match in re.finditer(r"\S+", text)]
+
+def builder(**budgets):
+    return PromptBuilder(budgets=budgets, keep_recent_turns=2, counter=WordCounter())
+
+def message(content):
+    return {'content': content, 'timestamp': '2024-01-01'}
+
+def test_short_sections_pass_through_untouched():
+    built = builder().build('support', "my printer is broken", articles=[{'content': "restart the printer"}])
+    assert built.email == "my printer is broken"
+    assert built.articles == [{'content': "restart the printer"}]
+    assert built.tokens_saved == 0
+
+def test_long_email_keeps_head_and_tail():
+    email = "start " + "filler " * 500 + "end"
+    built = builder(email=20).build('support', email)
+    assert built.email.startswith("start") and built.email.endswith("end")
+    assert TRIM_MARKER in built.email
+    assert built.kept_tokens['email'] <= 20
+    assert built.tokens_saved == built.original_tokens['email'] - built.kept_tokens['email']
+
+def test_recent_turns_are_kept_and_older_ones_chosen_by_relevance():
+    history = [
+        message("latest reply " + "x " * 10),
+        message("second latest " + "y " * 10),
+        message("we discussed the invoice refund"),
+        message("lunch plans for friday"),
+        message("the refund for invoice 42 was approved"),
+    ]
+    built = builder(history=36).build('follow_up', "any news on my invoice refund?", history=history)
+    contents = [m['content'] for m in built.history]
+    assert contents[:2] == [history[0]['content'], history[1]['content']]
+    assert history[2]['content'] in contents
+    assert history[3]['content'] not in contents
+    assert built.kept_tokens['history'] <= 36
+
+def test_articles_are_ranked_and_the_last_one_trimmed():
+    articles = [
+        {'content': "low " * 40, 'relevance': 0.7},
+        {'content': "best " * 40, 'relevance': 0.95},
+        {'content': "good " * 40, 'relevance': 0.8},
+    ]
+    built = builder(kb=75).build('support', "help", articles=articles)
+    assert [a['relevance'] for a in built.articles] == [0.95, 0.8]
+    assert built.articles[0]['content'] == articles[1]['content']
+    assert TRIM_MARKER in built.articles[1]['content']
+    assert built.kept_tokens['kb'] <= 75
+
+def test_each_text_is_counted_once():
+    counter = WordCounter()
+    counter.count("same text")
+    counter.count("same text")
+    assert counter.calls == 1
+
+def test_trimming_tokenizes_each_end_once_and_bounds_long_bodies():
+    counter = WordCounter()
+    prompt_builder = PromptBuilder(budgets={'email': 20}, counter=counter)
+    email = "start " + "filler " * 200000 + "end"
+
+    built = prompt_builder.build('support', email)
+    assert built.email.startswith("start") and built.email.endswith("end")
+    assert built.kept_tokens['email'] <= 20
+    # One pass over a window at each end, never over the 1.4 MB body
+    assert len(counter.span_calls) == 2 and max(counter.span_calls) <= 20 * 16
+    assert built.original_tokens['email'] > 100000
+
+def test_count_cache_is_bounded():
+    counter = WordCounter(cache_size=2)
+    for text in ("one", "two", "three", "one"):
+        counter.count(text)
+    assert counter.calls == 4 and len(counter._counts) == 2
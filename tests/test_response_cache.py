@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import numpy as np
+from agents.follow_up_agent import FollowUpAgent
+from agents.inquiry_responder_agent import InquiryResponderAgent
+from ml_models.response_cache import MinHasher, ResponseCache, cached_completion, response_namespace
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, prompt, **kwargs):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+    async def stream(self, prompt, **kwargs):
+        self.calls += 1
+        for word in ["streamed", " answer"]:
+            yield word
+
+NAMESPACE = response_namespace("SupportAgent", "deepseek-r1", 800, 0.5)
+BODY = ("I cannot login to my account since this morning, the page keeps saying my password "
+        "is wrong even after I reset it twice. Please help me get back in as soon as possible.")
+
+def test_exact_hits_ignore_case_and_whitespace():
+    cache = ResponseCache()
+    cache.put(NAMESPACE, "Prompt:  " + BODY, BODY, "Try clearing cookies.")
+    hit = cache.get(NAMESPACE, "prompt: " + BODY.upper(), BODY)
+    assert hit['text'] == "Try clearing cookies." and hit['match'] == 'exact'
+
+def test_near_duplicates_hit_above_the_threshold_only():
+    cache = ResponseCache(similarity_threshold=0.5)
+    cache.put(NAMESPACE, "p1", BODY, "Try clearing cookies.")
+
+    reworded = BODY.replace("since this morning", "since today")
+    hit = cache.get(NAMESPACE, "p2", reworded)
+    assert hit['match'] == 'near' and 0.5 <= hit['similarity'] < 1.0
+
+    assert cache.get(NAMESPACE, "p3", "I was charged twice for my subscription last month") is None
+
+def test_similarity_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    same = hasher.signature("one two three four five six")
+    assert MinHasher.similarity(same, hasher.signature("One  two three four five six")) == 1.0
+    assert MinHasher.similarity(same, hasher.signature("seven eight nine ten eleven")) < 0.1
+
+def test_signatures_of_long_bodies_are_capped_and_chunked():
+    hasher = MinHasher(max_shingles=50, chunk_size=7)
+    words = [f"word{i}" for i in range(200000)]
+    long_signature = hasher.signature(" ".join(words))
+    # Only the first 50 shingles (52 words) count, and chunking does not change the minimum
+    assert np.array_equal(long_signature, MinHasher(max_shingles=50).signature(" ".join(words[:52])))
+    assert not np.array_equal(long_signature, hasher.signature(" ".join(words[:51])))
+
+def test_cached_completion_hashes_the_body_once_off_the_loop(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / "responses.db"))
+    signatures = []
+    original = cache.hasher.signature
+
+    def traced(text):
+        signatures.append(threading.current_thread())
+        return original(text)
+
+    cache.hasher.signature = traced
+    asyncio.run(cached_completion(cache, CountingLLM(), NAMESPACE, "prompt", BODY))
+    assert len(signatures) == 1 and signatures[0] is not threading.main_thread()
+    assert ResponseCache(disk_path=str(tmp_path / "responses.db")).get(NAMESPACE, "prompt", BODY) is not None
+
+def test_namespaces_are_isolated():
+    cache = ResponseCache()
+    cache.put(NAMESPACE, "prompt", BODY, "support answer")
+    other = response_namespace("InquiryResponderAgent", "deepseek-r1", 500, 0.7)
+    assert cache.get(other, "prompt", BODY) is None
+
+def test_entries_are_bounded_and_expire():
+    cache = ResponseCache(max_entries=2)
+    for i in range(3):
+        cache.put(NAMESPACE, f"prompt {i}", f"unrelated email number {i} about topic {i}", str(i))
+    assert cache.stats()['entries'] == 2
+    assert cache.get(NAMESPACE, "prompt 0", "unrelated email number 0 about topic 0") is None
+
+    expired = ResponseCache(ttl_seconds=0)
+    expired.put(NAMESPACE, "prompt", BODY, "stale")
+    assert expired.get(NAMESPACE, "prompt", BODY) is None
+
+def test_disk_tier_survives_restarts(tmp_path):
+    path = str(tmp_path / "responses.db")
+    ResponseCache(disk_path=path).put(NAMESPACE, "prompt", BODY, "Try clearing cookies.")
+    reloaded = ResponseCache(disk_path=path)
+    assert reloaded.get(NAMESPACE, "another prompt", BODY)['text'] == "Try clearing cookies."
+
+def test_completions_are_generated_once():
+    cache = ResponseCache()
+    llm = CountingLLM()
+
+    async def run():
+        first = await cached_completion(cache, llm, NAMESPACE, "prompt", BODY, max_tokens=800)
+        second = await cached_completion(cache, llm, NAMESPACE, "prompt", BODY, max_tokens=800)
+        return first, second
+
+    (text, source), (cached_text, cached_source) = asyncio.run(run())
+    assert llm.calls == 1 and cached_text == text
+    assert source == {'type': 'generated'}
+    assert cached_source['type'] == 'cache' and cached_source['match'] == 'exact'
+
+def test_agent_responses_are_tagged_with_their_source():
+    llm = CountingLLM()
+    agent = InquiryResponderAgent(llm_client=llm)
+    agent.generation.cache = ResponseCache()
+    email = {'sender': 'jane.doe@example.com', 'subject': 'Login', 'body': BODY}
+
+    async def run():
+        streamed = [event async for event in agent.process_stream(email)]
+        return streamed[-1], await agent.process(email)
+
+    done, result = asyncio.run(run())
+    assert done['response']['source'] == {'type': 'generated'}
+    assert result['response']['source']['type'] == 'cache'
+    assert result['response']['content'] == done['response']['content']
+    assert llm.calls == 1
+
+def test_follow_ups_are_not_shared_between_customers():
+    llm = CountingLLM()
+    agent = FollowUpAgent(vector_db_client=None, llm_client=llm)
+    agent.generation.cache = ResponseCache(similarity_threshold=0.5)
+
+    async def run(sender, body, history):
+        return await agent._generate_follow_up({'sender': sender, 'body': body}, history)
+
+    first = asyncio.run(run("a@example.com", BODY, {'conversation_id': "<1@x>", 'messages': [{'content': "Order 1"}]}))
+    reworded = BODY.replace("since this morning", "since today")
+    other = asyncio.run(run("b@example.com", reworded, {'conversation_id': "<2@x>", 'messages': [{'content': "Order 2"}]}))
+    same = asyncio.run(run("A@Example.com", reworded, {'conversation_id': "<1@x>", 'messages': [{'content': "Order 1"}]}))
+
+    assert first[1] == other[1] == {'type': 'generated'} and llm.calls == 2
+    assert same[0] == first[0] and same[1]['match'] == 'near'
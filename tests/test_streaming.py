@@ -0,0 +1,55 @@
+import asyncio
+from agents.inquiry_responder_agent import InquiryResponderAgent
+from agents.streaming import ResponseStream
+
+class FakeLLM:
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    async def stream(self, prompt, **kwargs):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("connection reset")
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def complete(self, prompt, **kwargs):
+        return ''.join(self.chunks).strip()
+
+EMAIL = {'sender': 'jane.doe@example.com', 'subject': 'Pricing', 'body': 'How much is it?'}
+
+def collect(events):
+    async def run():
+        return [event async for event in events]
+    return asyncio.run(run())
+
+def test_template_is_formatted_around_the_streamed_text():
+    async def chunks():
+        for chunk in ["\n ", "Hello", " there", " "]:
+            yield chunk
+
+    async def run():
+        stream = ResponseStream("Agent", chunks(), lambda content: f"Dear Jane,\n{content}\n-- Bob")
+        return [text async for text in stream], stream
+
+    texts, stream = asyncio.run(run())
+    assert texts == ["Dear Jane,\n", "Hello", " there", " ", "\n-- Bob"]
+    assert stream.content == "Hello there"
+    assert stream.text == "Dear Jane,\nHello there\n-- Bob"
+
+def test_inquiry_stream_matches_the_blocking_response():
+    agent = InquiryResponderAgent(llm_client=FakeLLM([" Our", " plans", " start", " at", " $10."]))
+    events = collect(agent.process_stream(EMAIL))
+
+    assert [event['type'] for event in events[:2]] == ['delta', 'delta']
+    assert events[-1]['type'] == 'done'
+    streamed = ''.join(event['text'] for event in events if event['type'] == 'delta')
+    expected = asyncio.run(agent.process(EMAIL))['response']['content']
+    assert events[-1]['response']['content'] == expected
+    assert streamed.strip() == expected.strip()
+
+def test_stream_failure_ends_with_an_error_event():
+    agent = InquiryResponderAgent(llm_client=FakeLLM(["Our", " plans"], fail_after=1))
+    events = collect(agent.process_stream(EMAIL))
+    assert events[-1] == {'type': 'error', 'status': 'error', 'error': "connection reset"}
@@ -0,0 +1,52 @@
+from ml_models.text_preparation import TextPreparer, TRUNCATION_MARKER
+
+class WhitespaceTokenizer:
+    """Minimal stand-in: one token per word, wrapped in [CLS]=0 ... [SEP]=1"""
+    name_or_path = "whitespace"
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text, truncation=False):
+        self.calls += 1
+        return {'input_ids': [0] + [len(word) + 1 for word in text.split()] + [1]}
+
+    def get_special_tokens_mask(self, ids, already_has_special_tokens=True):
+        return [1 if i in (0, len(ids) - 1) else 0 for i in range(len(ids))]
+
+def test_short_text_is_untouched():
+    prepared = TextPreparer().prepare("Hello", "short body")
+    assert prepared.text == "Hello\n\nshort body"
+    assert not prepared.truncated
+
+def test_long_text_keeps_head_and_tail_windows():
+    preparer = TextPreparer(max_tokens=10, chars_per_token=2.0, safety_margin=1.0, head_fraction=0.5)
+    prepared = preparer.prepare_text("H" * 50 + "x" * 1000 + "T" * 50)
+    assert prepared.truncated
+    assert prepared.original_length == 1100
+    assert len(prepared.text) == preparer.max_chars
+    assert prepared.text.startswith("H") and prepared.text.endswith("T")
+    assert TRUNCATION_MARKER in prepared.text
+
+def test_token_ids_are_windowed_and_computed_once():
+    tokenizer = WhitespaceTokenizer()
+    preparer = TextPreparer(max_tokens=6, chars_per_token=100.0, head_fraction=0.5)
+    prepared = preparer.prepare_text("a bb ccc dddd eeeee ffffff")
+
+    ids = preparer.token_ids(prepared, tokenizer)
+    assert ids == [0, 2, 3, 6, 7, 1]
+    assert preparer.token_ids(prepared, tokenizer) is ids
+    assert tokenizer.calls == 1
+
+def test_priority_rules_see_the_middle_of_long_emails():
+    import asyncio
+    from agents.classification_agent import ClassificationAgent
+
+    agent = ClassificationAgent()
+    body = "log line\n" * 5000 + "This is urgent, the site is down.\n" + "log line\n" * 5000
+    assert "urgent" not in agent.text_preparer.prepare("Outage", body).text
+    # Skip the transformer: only the priority path is under test
+    agent.category_cache.put("Outage", body, {'category': 'SUPPORT', 'confidence': 0.9})
+
+    result = asyncio.run(agent.process({'subject': "Outage", 'body': body}))
+    assert result['classification']['priority'] == 'URGENT'
@@ -0,0 +1,99 @@
+import asyncio
+from agents.follow_up_agent import FollowUpAgent
+from workflow.conversation_store import ConversationStore
+from workflow.thread_summarizer import ThreadSummarizer
+
+class FakeLLM:
+    def __init__(self, delay=0.0):
+        self.prompts = []
+        self.delay = delay
+
+    async def complete(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        return f" summary v{len(self.prompts)} "
+
+def add_messages(store, count, start=0):
+    for i in range(start, start + count):
+        store.append({
+            'sender': 'jane@example.com',
+            'subject': 'Order',
+            'body': f"message {i} " + "details " * 20,
+            'timestamp': i + 1,
+            'message_id_header': f"<{i}@x>",
+            'references': "<0@x>" if i else None
+        })
+
+def test_only_aged_out_messages_are_folded_into_the_summary(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    llm = FakeLLM()
+    summarizer = ThreadSummarizer(store, llm, keep_recent=5, batch_size=4)
+    add_messages(store, 12)
+
+    assert asyncio.run(summarizer.update("<0@x>"))
+    # Seven messages aged out of the recent window, folded four at a time
+    assert len(llm.prompts) == 2
+    assert "message 6 " in llm.prompts[1] and "message 7 " not in llm.prompts[1]
+    assert store.summary("<0@x>")['summary'] == "summary v2"
+
+    add_messages(store, 1, start=12)
+    assert asyncio.run(summarizer.update("<0@x>"))
+    assert "summary v2" in llm.prompts[2] and "message 7 " in llm.prompts[2] and "message 6 " not in llm.prompts[2]
+    assert not asyncio.run(summarizer.update("<0@x>"))
+    assert len(llm.prompts) == 3
+
+def test_updates_run_in_the_background_and_coalesce(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    llm = FakeLLM(delay=0.01)
+    summarizer = ThreadSummarizer(store, llm, keep_recent=2)
+    add_messages(store, 4)
+
+    async def run():
+        for i in range(4, 8):
+            add_messages(store, 1, start=i)
+            summarizer.schedule("<0@x>")
+            await asyncio.sleep(0.002)
+        assert len(summarizer._running) == 1
+        await summarizer.join()
+
+    asyncio.run(run())
+    # One update for the first schedule, one more for everything that arrived meanwhile
+    assert len(llm.prompts) == 2
+    assert store.summary("<0@x>")['covered_seq'] == 6
+
+def test_follow_up_prompt_stays_flat_as_the_thread_grows(tmp_path):
+    sizes = []
+    for length in (8, 60):
+        store = ConversationStore(str(tmp_path / f"conversations-{length}.db"))
+        add_messages(store, length)
+        asyncio.run(ThreadSummarizer(store, FakeLLM(), keep_recent=5).update("<0@x>"))
+
+        agent = FollowUpAgent(vector_db_client=None, llm_client=FakeLLM(), conversation_store=store)
+        current = {'sender': 'jane@example.com', 'body': "Any news?", 'thread_id': "<0@x>",
+                   'message_id_header': f"<{length - 1}@x>", 'message_seq': length}
+        history = asyncio.run(agent._get_conversation_history(current))
+        assert history['summary'].startswith("summary v")
+        sizes.append(len(agent._create_follow_up_prompt(current, history)))
+
+    assert abs(sizes[0] - sizes[1]) < 20
+
+def test_out_of_order_mail_is_summarized_once_it_ages_out(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    llm = FakeLLM()
+    summarizer = ThreadSummarizer(store, llm, keep_recent=3)
+    add_messages(store, 3)
+    # Filed early but dated ahead (sender clock skew): stays in the recent window while later rows age out
+    store.append({'sender': 'jane@example.com', 'subject': 'Order', 'body': "skewed message",
+                  'timestamp': 100, 'message_id_header': "<skewed@x>", 'references': "<0@x>"})
+    add_messages(store, 6, start=3)
+
+    assert asyncio.run(summarizer.update("<0@x>"))
+    assert "skewed message" not in ''.join(llm.prompts)
+
+    for i in range(3):
+        store.append({'sender': 'jane@example.com', 'subject': 'Order', 'body': f"newest {i}",
+                      'timestamp': 200 + i, 'message_id_header': f"<newest{i}@x>", 'references': "<0@x>"})
+    assert asyncio.run(summarizer.update("<0@x>"))
+    folded = ''.join(llm.prompts)
+    assert "skewed message" in folded
+    assert all(f"message {i} " in folded for i in range(9)) and "newest" not in folded
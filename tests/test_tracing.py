@@ -0,0 +1,63 @@
+import asyncio
+import json
+from agents.base_agent import BaseAgent
+from prometheus_client import REGISTRY
+from monitoring.tracing import Tracer
+
+class EchoAgent(BaseAgent):
+    async def process(self, data):
+        with self.span("format", size=len(data)):
+            result = {'status': 'success', 'echo': data}
+        await self.log_processing(data, result)
+        return result
+
+def span_count(agent, span):
+    labels = {'agent': agent, 'span': span}
+    return REGISTRY.get_sample_value('agent_span_duration_seconds_count', labels) or 0
+
+def test_process_and_sub_steps_are_timed(tmp_path):
+    agent = EchoAgent()
+    agent.tracer = Tracer(keep_events=True)
+    before = span_count("EchoAgent", "process")
+
+    asyncio.run(agent.process({'id': 1}))
+
+    after = span_count("EchoAgent", "process")
+    assert after == before + 1
+    names = [event['name'] for event in agent.tracer.events()]
+    assert names == ["format", "process"]
+
+    path = agent.tracer.export_chrome_trace(str(tmp_path / "trace.json"))
+    with open(path) as f:
+        trace = json.load(f)
+    format_event, process_event = trace['traceEvents']
+    assert format_event['ph'] == 'X' and format_event['args'] == {'size': 1}
+    # The sub-step nests inside process() on the same row
+    assert format_event['tid'] == process_event['tid']
+    assert process_event['ts'] <= format_event['ts']
+    assert format_event['ts'] + format_event['dur'] <= process_event['ts'] + process_event['dur']
+
+def test_failed_span_is_flagged():
+    tracer = Tracer(keep_events=True)
+    try:
+        with tracer.span("Agent", "llm_call"):
+            raise TimeoutError()
+    except TimeoutError:
+        pass
+    assert tracer.events()[0]['args'] == {'error': True}
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False, keep_events=True)
+    with tracer.span("Agent", "forward"):
+        pass
+    assert tracer.events() == []
+
+def test_successful_emails_are_logged_by_sample(caplog):
+    agent = EchoAgent()
+    agent.tracer = Tracer(log_sample_rate=0.0)
+    with caplog.at_level("INFO"):
+        asyncio.run(agent.process({'id': 1}))
+        asyncio.run(agent.log_processing({'id': 2}, {'status': 'error'}))
+    assert [record.getMessage() for record in caplog.records] == [
+        "Processing completed - Input: 2 Result: error"
+    ]
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyAgents(Mapping):
+    """Agents registered as factories and built on first use.
+
+    Behaves like the ``{category: agent}`` dict the orchestrator used to
+    build eagerly, but constructing an agent (loading a transformer,
+    discovering the Calendar API) only happens when it is first needed or
+    when ``warm_up`` builds it in the background.
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[], Any]]):
+        self._factories = dict(factories)
+        self._agents: Dict[str, Any] = {}
+        self._locks = {name: threading.Lock() for name in self._factories}
+
+    def __getitem__(self, name: str) -> Any:
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        factory = self._factories[name]
+        # Warm-up threads and request handlers may race for the same agent
+        with self._locks[name]:
+            if name not in self._agents:
+                logger.info(f"Building agent {name}")
+                self._agents[name] = factory()
+            return self._agents[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def is_built(self, name: str) -> bool:
+        return name in self._agents
+
+    async def warm_up(self, names: Optional[Iterable[str]] = None):
+        """Build agents in worker threads so the event loop keeps serving requests"""
+        loop = asyncio.get_running_loop()
+        names = list(self._factories if names is None else names)
+        results = await asyncio.gather(
+            *(loop.run_in_executor(None, self._warm, name) for name in names),
+            return_exceptions=True
+        )
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                # Left unbuilt; the first real request retries and surfaces the error
+                logger.error(f"Warm-up of agent {name} failed: {str(result)}")
+
+    def _warm(self, name: str):
+        agent = self[name]
+        if hasattr(agent, 'warm_up'):
+            agent.warm_up()
@@ -0,0 +1,288 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import parseaddr, parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from monitoring.metrics import conversation_store_lookups
+
+_MESSAGE_ID = re.compile(r"<[^<>]+>")
+
+# (epoch seconds, message) pairs, newest first
+_Recent = List[Tuple[float, Dict[str, Any]]]
+
+
+def parse_message_ids(header: Optional[str]) -> List[str]:
+    """Message-IDs from a Message-ID, In-Reply-To or References header, in order"""
+    if not header:
+        return []
+    ids = _MESSAGE_ID.findall(header)
+    return ids or header.split()
+
+
+def normalize_sender(sender: Optional[str]) -> str:
+    address = parseaddr(sender or '')[1] or (sender or '')
+    return address.strip().lower()
+
+
+class _CachedMessages:
+    __slots__ = ('messages', 'complete')
+
+    def __init__(self, messages: _Recent, complete: bool):
+        self.messages = messages
+        self.complete = complete
+
+
+class ConversationStore:
+    """Local, append-only history of every email, keyed by sender and thread.
+
+    Threads are identified from the ``Message-ID``, ``In-Reply-To`` and
+    ``References`` headers: a reply joins the thread of the first message
+    it references. SQLite indexes (sender, timestamp) and (thread,
+    timestamp), and an LRU holds the newest ``cache_depth`` messages of
+    the ``cache_size`` most recently used senders and threads, so "last N
+    messages" rarely touches disk.
+    """
+
+    def __init__(self, path: str, cache_size: int = 1024, cache_depth: int = 20):
+        self.path = path
+        self.cache_size = cache_size
+        self.cache_depth = cache_depth
+        self._cache: 'OrderedDict[Tuple[str, str], _CachedMessages]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " message_id TEXT,"
+            " thread_id TEXT NOT NULL,"
+            " sender TEXT NOT NULL,"
+            " subject TEXT,"
+            " content TEXT,"
+            " timestamp REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS messages_sender_time ON messages (sender, timestamp)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS messages_thread_time ON messages (thread_id, timestamp)")
+        self._db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS messages_message_id ON messages (message_id)"
+            " WHERE message_id IS NOT NULL"
+        )
+        # Rolling summary of everything before the newest messages, one row per thread
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS thread_summaries ("
+            " thread_id TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL,"
+            " covered_seq INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_settings(cls) -> 'ConversationStore':
+        return cls(
+            settings.CONVERSATION_STORE_PATH,
+            cache_size=settings.CONVERSATION_CACHE_SIZE,
+            cache_depth=settings.CONVERSATION_CACHE_DEPTH
+        )
+
+    def append(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a parsed email; returns the stored message with its ``seq`` and ``thread_id``"""
+        message_ids = parse_message_ids(email_data.get('message_id_header'))
+        message_id = message_ids[0] if message_ids else None
+        timestamp = self._epoch(email_data.get('timestamp'))
+        with self._lock:
+            thread_id = self._thread_for(
+                message_id,
+                parse_message_ids(email_data.get('in_reply_to')),
+                parse_message_ids(email_data.get('references'))
+            )
+            message = {
+                'message_id': message_id,
+                'thread_id': thread_id,
+                'sender': normalize_sender(email_data.get('sender')),
+                'subject': email_data.get('subject'),
+                'content': email_data.get('body') or '',
+                'timestamp': datetime.fromtimestamp(timestamp).isoformat()
+            }
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO messages (message_id, thread_id, sender, subject, content, timestamp)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (message_id, thread_id, message['sender'], message['subject'], message['content'], timestamp)
+            )
+            self._db.commit()
+            if cursor.rowcount:
+                message['seq'] = cursor.lastrowid
+                self._cache_append(('sender', message['sender']), timestamp, message)
+                self._cache_append(('thread', thread_id), timestamp, message)
+            else:
+                # Redelivered message: keep the row and thread it was first filed under
+                message['seq'], message['thread_id'] = self._db.execute(
+                    "SELECT seq, thread_id FROM messages WHERE message_id = ?", (message_id,)
+                ).fetchone()
+        return message
+
+    def recent(
+        self,
+        sender: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        limit: int = 5,
+        exclude: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Newest ``limit`` messages of a thread (or else of a sender), newest first.
+
+        ``exclude`` is the ``seq`` of a message to leave out, usually the one being answered.
+        """
+        if thread_id is not None:
+            key = ('thread', thread_id)
+        elif sender:
+            key = ('sender', normalize_sender(sender))
+        else:
+            return []
+        wanted = limit + (1 if exclude is not None else 0)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and (cached.complete or len(cached.messages) >= wanted):
+                self._cache.move_to_end(key)
+                conversation_store_lookups.labels(result='hit').inc()
+                messages = cached.messages
+            else:
+                conversation_store_lookups.labels(result='miss').inc()
+                messages = self._load(key, max(wanted, self.cache_depth))
+        return [message for _, message in messages if message['seq'] != exclude][:limit]
+
+    def summary(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """The thread's rolling summary and the last message ``seq`` folded into it"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, covered_seq, updated_at FROM thread_summaries WHERE thread_id = ?",
+                (thread_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'summary': row[0], 'covered_seq': row[1], 'updated_at': row[2]}
+
+    def save_summary(self, thread_id: str, summary: str, covered_seq: int):
+        """Store a summary unless one covering later messages is already there"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO thread_summaries (thread_id, summary, covered_seq, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (thread_id) DO UPDATE SET"
+                " summary = excluded.summary, covered_seq = excluded.covered_seq, updated_at = excluded.updated_at"
+                " WHERE excluded.covered_seq > thread_summaries.covered_seq",
+                (thread_id, summary, covered_seq, time.time())
+            )
+            self._db.commit()
+
+    def unsummarized(self, thread_id: str, after_seq: int, keep_recent: int) -> List[Dict[str, Any]]:
+        """Messages past ``after_seq`` filed before the newest ``keep_recent``, in ``seq`` order.
+
+        The recent window is the newest messages by timestamp; only rows filed
+        before its oldest row are returned, so a late message with an old
+        timestamp waits until the window has moved past it instead of being
+        skipped for good once ``after_seq`` overtakes it.
+        """
+        with self._lock:
+            window = [row[0] for row in self._db.execute(
+                "SELECT seq FROM messages WHERE thread_id = ? ORDER BY timestamp DESC, seq DESC LIMIT ?",
+                (thread_id, keep_recent)
+            )]
+            if keep_recent > 0 and len(window) < keep_recent:
+                return []
+            boundary = min(window) if window else None
+            rows = self._db.execute(
+                "SELECT seq, message_id, thread_id, sender, subject, content, timestamp FROM messages"
+                " WHERE thread_id = ? AND seq > ? AND (? IS NULL OR seq < ?) ORDER BY seq",
+                (thread_id, after_seq, boundary, boundary)
+            ).fetchall()
+        return [self._row_message(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return {'messages': count, 'cached_keys': len(self._cache)}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _thread_for(self, message_id: Optional[str], in_reply_to: List[str], references: List[str]) -> str:
+        # References lists the thread root first; clients that only set In-Reply-To are looked up
+        for parent in references + in_reply_to:
+            known = self._known_thread(parent)
+            if known:
+                return known
+        if references:
+            return references[0]
+        if in_reply_to:
+            return in_reply_to[0]
+        return message_id or f"<{uuid.uuid4().hex}@local>"
+
+    def _known_thread(self, message_id: str) -> Optional[str]:
+        row = self._db.execute("SELECT thread_id FROM messages WHERE message_id = ?", (message_id,)).fetchone()
+        return row[0] if row else None
+
+    def _load(self, key: Tuple[str, str], limit: int) -> _Recent:
+        column = 'thread_id' if key[0] == 'thread' else 'sender'
+        rows = self._db.execute(
+            f"SELECT seq, message_id, thread_id, sender, subject, content, timestamp FROM messages"
+            f" WHERE {column} = ? ORDER BY timestamp DESC, seq DESC LIMIT ?",
+            (key[1], limit)
+        ).fetchall()
+        messages = [(row[-1], self._row_message(row)) for row in rows]
+        self._cache[key] = _CachedMessages(messages[:self.cache_depth], len(rows) < limit and len(rows) <= self.cache_depth)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return messages
+
+    def _row_message(self, row: Tuple) -> Dict[str, Any]:
+        seq, message_id, thread_id, sender, subject, content, timestamp = row
+        return {
+            'seq': seq,
+            'message_id': message_id,
+            'thread_id': thread_id,
+            'sender': sender,
+            'subject': subject,
+            'content': content,
+            'timestamp': datetime.fromtimestamp(timestamp).isoformat()
+        }
+
+    def _cache_append(self, key: Tuple[str, str], timestamp: float, message: Dict[str, Any]):
+        cached = self._cache.get(key)
+        if cached is None:
+            return
+        position = 0
+        # Mail can arrive out of order; keep the newest-first ordering
+        while position < len(cached.messages) and cached.messages[position][0] > timestamp:
+            position += 1
+        cached.messages.insert(position, (timestamp, message))
+        if len(cached.messages) > self.cache_depth:
+            del cached.messages[self.cache_depth:]
+            cached.complete = False
+
+    def _epoch(self, timestamp: Any) -> float:
+        if isinstance(timestamp, (int, float)):
+            return float(timestamp)
+        if isinstance(timestamp, datetime):
+            return timestamp.timestamp()
+        if timestamp:
+            try:
+                return parsedate_to_datetime(timestamp).timestamp()
+            except (TypeError, ValueError):
+                try:
+                    return datetime.fromisoformat(timestamp).timestamp()
+                except ValueError:
+                    pass
+        return time.time()
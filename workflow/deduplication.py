@@ -0,0 +1,187 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.settings import settings
+from monitoring.metrics import duplicate_messages_suppressed
+
+logger = logging.getLogger(__name__)
+
+
+class RotatingBloomFilter:
+    """Bloom filter over the most recent ``capacity`` to ``2 * capacity`` keys.
+
+    Keys go into the current generation; once it holds ``capacity`` keys
+    the previous generation is dropped and a fresh one started, so memory
+    stays fixed while the false-positive rate stays at ``error_rate``.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 1e-6):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._current = bytearray((self.num_bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+
+    def add(self, key: str):
+        if self._count >= self.capacity:
+            self._previous, self._current = self._current, bytearray(len(self._current))
+            self._count = 0
+        for bit in self._bits(key):
+            self._current[bit >> 3] |= 1 << (bit & 7)
+        self._count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits(key)
+        return (
+            all(self._current[bit >> 3] & (1 << (bit & 7)) for bit in bits)
+            or all(self._previous[bit >> 3] & (1 << (bit & 7)) for bit in bits)
+        )
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'count': self._count,
+            'current': base64.b64encode(bytes(self._current)).decode('ascii'),
+            'previous': base64.b64encode(bytes(self._previous)).decode('ascii')
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'RotatingBloomFilter':
+        bloom = cls(state['capacity'], state['error_rate'])
+        bloom._current = bytearray(base64.b64decode(state['current']))
+        bloom._previous = bytearray(base64.b64decode(state['previous']))
+        bloom._count = state['count']
+        return bloom
+
+    def _bits(self, key: str) -> List[int]:
+        # Kirsch-Mitzenmacher: k indexes from two halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+
+class MessageDeduplicator:
+    """Single-flight execution keyed by Gmail ``message_id``.
+
+    Concurrent calls for the same id share one in-flight run. Successful
+    results are kept in an LRU and returned to later duplicates; ids that
+    fell out of the LRU are still recognised by the rotating Bloom filter
+    and answered with a ``duplicate`` status instead of being reprocessed.
+    Failed runs are not remembered, so retries go through.
+    """
+
+    def __init__(
+        self,
+        max_results: int = 10000,
+        bloom_capacity: int = 100000,
+        bloom_error_rate: float = 1e-6,
+        state_path: Optional[str] = None
+    ):
+        self.max_results = max_results
+        self.state_path = state_path
+        self.bloom = RotatingBloomFilter(bloom_capacity, bloom_error_rate)
+        self._results: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.suppressed = 0
+
+        if state_path and os.path.exists(state_path):
+            self.load(state_path)
+
+    @classmethod
+    def from_settings(cls) -> 'MessageDeduplicator':
+        return cls(
+            max_results=settings.DEDUP_RESULT_CACHE_SIZE,
+            bloom_capacity=settings.DEDUP_BLOOM_CAPACITY,
+            bloom_error_rate=settings.DEDUP_BLOOM_ERROR_RATE,
+            state_path=settings.DEDUP_STATE_PATH
+        )
+
+    async def run(
+        self,
+        message_id: Optional[str],
+        process: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Run ``process`` unless ``message_id`` is already running or done"""
+        if not message_id:
+            return await process()
+
+        result = self._results.get(message_id)
+        if result is not None:
+            self._results.move_to_end(message_id)
+            self._suppressed('completed')
+            return result
+
+        in_flight = self._in_flight.get(message_id)
+        if in_flight is not None:
+            self._suppressed('in_flight')
+            # Shielded: one impatient caller must not cancel the shared run
+            return await asyncio.shield(in_flight)
+
+        if message_id in self.bloom:
+            self._suppressed('recent')
+            return {'status': 'duplicate', 'message_id': message_id}
+
+        task = asyncio.ensure_future(process())
+        self._in_flight[message_id] = task
+        task.add_done_callback(lambda done: self._finish(message_id, done))
+        return await asyncio.shield(task)
+
+    def forget(self, message_id: str):
+        """Drop a remembered result so the message can be processed again"""
+        self._results.pop(message_id, None)
+
+    def save(self, path: Optional[str] = None):
+        """Persist the Bloom filter and result LRU (atomic replace)"""
+        path = path or self.state_path
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'bloom': self.bloom.state(), 'results': list(self._results.items())}, f, default=str)
+        os.replace(temp_path, path)
+
+    def load(self, path: str):
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            self.bloom = RotatingBloomFilter.from_state(state['bloom'])
+            self._results = OrderedDict(state['results'][-self.max_results:])
+        except Exception as e:
+            # Starting empty only costs re-processing a few duplicates
+            logger.error(f"Could not load deduplication state from {path}: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': len(self._in_flight),
+            'results': len(self._results),
+            'suppressed': self.suppressed
+        }
+
+    def _finish(self, message_id: str, done: asyncio.Future):
+        self._in_flight.pop(message_id, None)
+        if done.cancelled() or done.exception() is not None:
+            return
+        result = done.result()
+        if isinstance(result, dict) and result.get('status') == 'success':
+            self.bloom.add(message_id)
+            self._results[message_id] = result
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def _suppressed(self, reason: str):
+        self.suppressed += 1
+        duplicate_messages_suppressed.labels(reason=reason).inc()
@@ -0,0 +1,407 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from monitoring.metrics import durable_queue_depth, durable_queue_jobs
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Lease:
+    """A job checked out by one worker until ``expires_at``"""
+    job_id: str
+    payload: Dict[str, Any]
+    checkpoints: Dict[str, Any]
+    attempts: int
+    expires_at: float
+
+
+class DurableQueue:
+    """SQLite (WAL) work queue that remembers each email's per-stage output.
+
+    Workers ``lease`` jobs for ``visibility_timeout`` seconds; a job whose
+    worker died becomes visible again once its lease runs out and resumes
+    from its last checkpoint. Checkpoints and completions are buffered and
+    written in one transaction per ``group_commit_size`` writes or
+    ``group_commit_ms``, so a crash costs at most the stages finished in
+    that window, never a corrupted queue.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 5,
+        group_commit_size: int = 32,
+        group_commit_ms: float = 50.0,
+        worker_id: Optional[str] = None
+    ):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.group_commit_size = group_commit_size
+        self.group_commit_ms = group_commit_ms
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._pending: List[Tuple[str, tuple]] = []
+        self._oldest_pending = 0.0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " lease_owner TEXT,"
+            " lease_expires REAL NOT NULL DEFAULT 0,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, lease_expires, created_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " job_id TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " output TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, stage))"
+        )
+
+    @classmethod
+    def from_settings(cls) -> 'DurableQueue':
+        return cls(
+            settings.DURABLE_QUEUE_PATH,
+            visibility_timeout=settings.QUEUE_VISIBILITY_TIMEOUT_SECONDS,
+            max_attempts=settings.QUEUE_MAX_ATTEMPTS,
+            group_commit_size=settings.QUEUE_GROUP_COMMIT_SIZE,
+            group_commit_ms=settings.QUEUE_GROUP_COMMIT_MS
+        )
+
+    def enqueue(self, email_data: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        """Add an email; re-enqueueing a known message_id is a no-op"""
+        job_id = job_id or email_data.get('message_id') or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO jobs (id, payload, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(email_data, default=str), now, now)
+            ).rowcount
+        if inserted:
+            durable_queue_jobs.labels(event='enqueued').inc()
+        return job_id
+
+    def lease(self, limit: int = 1, job_id: Optional[str] = None) -> List[Lease]:
+        """Check out up to ``limit`` ready jobs (or just ``job_id``), oldest first"""
+        self.flush()
+        now = time.time()
+        expires_at = now + self.visibility_timeout
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # A job whose worker died on its last attempt never reaches fail(); park it here
+                parked = self._db.execute(
+                    "UPDATE jobs SET status = 'failed', lease_owner = NULL, updated_at = ?,"
+                    " error = COALESCE(error, 'lease expired on the last attempt')"
+                    " WHERE status = 'pending' AND lease_expires <= ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                ).rowcount
+                rows = self._db.execute(
+                    "SELECT id, payload, attempts FROM jobs"
+                    " WHERE status = 'pending' AND lease_expires <= ? AND (? IS NULL OR id = ?)"
+                    " ORDER BY created_at LIMIT ?",
+                    (now, job_id, job_id, limit)
+                ).fetchall()
+                leases = []
+                for job_id, payload, attempts in rows:
+                    self._db.execute(
+                        "UPDATE jobs SET lease_owner = ?, lease_expires = ?, attempts = attempts + 1,"
+                        " updated_at = ? WHERE id = ?",
+                        (self.worker_id, expires_at, now, job_id)
+                    )
+                    checkpoints = {
+                        stage: json.loads(output)
+                        for stage, output in self._db.execute(
+                            "SELECT stage, output FROM checkpoints WHERE job_id = ?", (job_id,)
+                        )
+                    }
+                    leases.append(Lease(job_id, json.loads(payload), checkpoints, attempts + 1, expires_at))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if parked:
+            durable_queue_jobs.labels(event='failed').inc(parked)
+        if leases:
+            durable_queue_jobs.labels(event='leased').inc(len(leases))
+            resumed = sum(1 for lease in leases if lease.checkpoints)
+            if resumed:
+                durable_queue_jobs.labels(event='resumed').inc(resumed)
+        return leases
+
+    def extend(self, lease: Lease) -> bool:
+        """Push a lease's deadline out again; False if another worker took the job"""
+        expires_at = time.time() + self.visibility_timeout
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'pending'",
+                (expires_at, lease.job_id, self.worker_id)
+            ).rowcount
+        if updated:
+            lease.expires_at = expires_at
+        return bool(updated)
+
+    def checkpoint(self, lease: Lease, stage: str, output: Any):
+        """Record a finished stage (group-committed)"""
+        lease.checkpoints[stage] = output
+        self._buffer(
+            "INSERT OR REPLACE INTO checkpoints (job_id, stage, output)"
+            " SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ? AND lease_owner = ?)",
+            (lease.job_id, stage, json.dumps(output, default=str), lease.job_id, self.worker_id)
+        )
+
+    def complete(self, lease: Lease, result: Dict[str, Any]):
+        """Mark a job done with its final result (group-committed)"""
+        self._buffer(
+            "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, updated_at = ?"
+            " WHERE id = ? AND lease_owner = ?",
+            (json.dumps(result, default=str), time.time(), lease.job_id, self.worker_id)
+        )
+        durable_queue_jobs.labels(event='completed').inc()
+
+    def fail(self, lease: Lease, error: str, retry: bool = True):
+        """Give the job back for a retry, or park it once it ran out of attempts (or ``retry`` is False)"""
+        self.flush()
+        exhausted = not retry or lease.attempts >= self.max_attempts
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = 0, updated_at = ?"
+                " WHERE id = ? AND lease_owner = ?",
+                ('failed' if exhausted else 'pending', error, time.time(), lease.job_id, self.worker_id)
+            )
+        durable_queue_jobs.labels(event='failed' if exhausted else 'retried').inc()
+
+    def flush(self):
+        """Write all buffered checkpoints and completions in one transaction"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for statement, params in pending:
+                    self._db.execute(statement, params)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                self._pending = pending + self._pending
+                raise
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self.flush()
+        with self._lock:
+            row = self._db.execute("SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def error(self, job_id: str) -> Optional[str]:
+        """The last error of a parked job, or None if it is not parked"""
+        with self._lock:
+            row = self._db.execute("SELECT error FROM jobs WHERE id = ? AND status = 'failed'", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, int]:
+        self.flush()
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        for status in ('pending', 'done', 'failed'):
+            counts.setdefault(status, 0)
+            durable_queue_depth.labels(status=status).set(counts[status])
+        return counts
+
+    def purge_done(self, older_than_seconds: float = 86400) -> int:
+        """Delete finished jobs and their checkpoints"""
+        self.flush()
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                "DELETE FROM checkpoints WHERE job_id IN"
+                " (SELECT id FROM jobs WHERE status = 'done' AND updated_at < ?)",
+                (cutoff,)
+            )
+            deleted = self._db.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND updated_at < ?", (cutoff,)
+            ).rowcount
+            self._db.execute("COMMIT")
+        return deleted
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def _buffer(self, statement: str, params: tuple):
+        with self._lock:
+            if not self._pending:
+                self._oldest_pending = time.monotonic()
+            self._pending.append((statement, params))
+            due = (
+                len(self._pending) >= self.group_commit_size
+                or (time.monotonic() - self._oldest_pending) * 1000 >= self.group_commit_ms
+            )
+        if due:
+            self.flush()
+
+
+class DurableWorker:
+    """Drains a ``DurableQueue`` through an ``EmailOrchestrator``.
+
+    Each stage's output is checkpointed, so a job re-leased after a crash
+    skips straight past the intake, classification or response it already
+    paid for. Several processes can run a worker against the same file.
+    ``submit`` enqueues one email and processes it in the caller's task;
+    ``run`` picks up whatever a crash or a failed attempt left behind.
+    """
+
+    def __init__(
+        self,
+        orchestrator,
+        queue: DurableQueue,
+        concurrency: int = 4,
+        poll_interval: float = 0.5
+    ):
+        self.orchestrator = orchestrator
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._stopping = False
+
+    async def run(self):
+        """Process jobs until ``stop`` is called"""
+        self._stopping = False
+        flusher = asyncio.get_running_loop().create_task(self._flush_periodically())
+        try:
+            await asyncio.gather(*(self._work() for _ in range(self.concurrency)))
+        finally:
+            flusher.cancel()
+            await asyncio.gather(flusher, return_exceptions=True)
+            await self._call(self.queue.flush)
+
+    async def drain(self) -> int:
+        """Process jobs until none are ready; returns how many were handled"""
+        handled = 0
+        while True:
+            leases = await self._call(self.queue.lease, self.concurrency)
+            if not leases:
+                await self._call(self.queue.flush)
+                return handled
+            await asyncio.gather(*(self.process(lease) for lease in leases))
+            handled += len(leases)
+
+    def stop(self):
+        self._stopping = True
+
+    async def submit(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Enqueue an email and process it now; if this process dies, another worker resumes it"""
+        job_id = await self._call(self.queue.enqueue, email_data)
+        leases = await self._call(self.queue.lease, 1, job_id)
+        if not leases:
+            # Already finished, parked, or being worked on elsewhere
+            result = await self._call(self.queue.result, job_id)
+            if result is not None:
+                return result
+            error = await self._call(self.queue.error, job_id)
+            if error is not None:
+                return {'status': 'error', 'error': error, 'job_id': job_id}
+            return {'status': 'queued', 'job_id': job_id}
+        return await self.process(leases[0])
+
+    async def process(self, lease: Lease) -> Dict[str, Any]:
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(lease))
+        try:
+            result = await self._run_stages(lease)
+            if result.get('status') == 'success':
+                await self._call(self.queue.complete, lease, result)
+            else:
+                # Agents report failures as results rather than raising; only those they
+                # mark transient (LLM timeouts, 5xx) can succeed on a later attempt
+                await self._call(
+                    self.queue.fail,
+                    lease,
+                    str(result.get('error', 'unknown error')),
+                    bool(result.get('transient'))
+                )
+            return result
+        except Exception as e:
+            logger.error(f"Durable job {lease.job_id} failed: {str(e)}")
+            await self._call(self.queue.fail, lease, str(e))
+            return {'status': 'error', 'error': str(e)}
+        finally:
+            heartbeat.cancel()
+
+    async def _run_stages(self, lease: Lease) -> Dict[str, Any]:
+        checkpoints = lease.checkpoints
+        if 'response' in checkpoints:
+            return checkpoints['response']
+
+        intake_result = checkpoints.get('intake')
+        if intake_result is None:
+            intake_result = await self.orchestrator.run_intake(lease.payload)
+            if intake_result['status'] != 'success':
+                return intake_result
+            await self._call(self.queue.checkpoint, lease, 'intake', intake_result)
+
+        classification_result = checkpoints.get('classification')
+        if classification_result is None:
+            classification_result = await self.orchestrator.run_classification(intake_result)
+            if classification_result['status'] != 'success':
+                return classification_result
+            await self._call(self.queue.checkpoint, lease, 'classification', classification_result)
+
+        response = await self.orchestrator.respond(intake_result, classification_result)
+        if response.get('status') == 'success':
+            await self._call(self.queue.checkpoint, lease, 'response', response)
+        return response
+
+    async def _work(self):
+        while not self._stopping:
+            leases = await self._call(self.queue.lease, 1)
+            if not leases:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self.process(leases[0])
+
+    async def _heartbeat(self, lease: Lease):
+        # Long LLM calls must not let the lease lapse and hand the job to another worker
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            if not await self._call(self.queue.extend, lease):
+                logger.warning(f"Lost lease on durable job {lease.job_id}")
+                return
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.queue.group_commit_ms / 1000)
+            await self._call(self.queue.flush)
+
+    async def _call(self, fn, *args):
+        # SQLite may wait on another process's write lock; keep that off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
@@ -1,58 +1,234 @@
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, AsyncIterator, Iterable, List
 from agents.email_intake_agent import EmailIntakeAgent
 from agents.classification_agent import ClassificationAgent
+from agents.embedding_agent import EmailEmbeddingAgent
 from agents.inquiry_responder_agent import InquiryResponderAgent
 from agents.support_agent import SupportAgent
 from agents.meeting_responder_agent import MeetingResponderAgent
 from agents.follow_up_agent import FollowUpAgent
+from config.settings import settings
+from ml_models.kb_index import KnowledgeBaseIndex
+from workflow.agent_registry import LazyAgents
+from workflow.conversation_store import ConversationStore
+from workflow.deduplication import MessageDeduplicator
+from workflow.durable_queue import DurableQueue, DurableWorker
+from workflow.pipeline import EmailPipeline
+from workflow.priority_scheduler import PriorityScheduler
+from workflow.thread_summarizer import ThreadSummarizer
 
 class EmailOrchestrator:
     def __init__(self, config: Dict[str, Any]):
-        self.intake_agent = EmailIntakeAgent()
-        self.classification_agent = ClassificationAgent()
-        self.inquiry_agent = InquiryResponderAgent()
-        self.support_agent = SupportAgent(config['knowledge_base_client'])
-        self.meeting_agent = MeetingResponderAgent(config['calendar_credentials'])
-        self.follow_up_agent = FollowUpAgent(config['vector_db_client'])
+        # Support answers search a local copy of the knowledge base, refreshed in the background;
+        # hashed word vectors never reach SupportAgent's relevance cut-off, so it needs a real model
+        self.kb_index = None
+        if (settings.KB_INDEX_ENABLED and settings.EMBEDDING_MODEL_NAME
+                and config.get('knowledge_base_client') is not None):
+            self.kb_index = KnowledgeBaseIndex.from_settings(config['knowledge_base_client'])
         
-        self.agent_mapping = {
-            "INQUIRY": self.inquiry_agent,
-            "SUPPORT": self.support_agent,
-            "MEETING": self.meeting_agent,
-            "FOLLOW_UP": self.follow_up_agent
+        # Every email is filed by sender and thread for follow-up history
+        self.conversation_store = ConversationStore.from_settings() if settings.CONVERSATION_STORE_ENABLED else None
+        # Long threads are folded into a rolling summary in the background
+        self.thread_summarizer = None
+        if self.conversation_store is not None and settings.THREAD_SUMMARIES_ENABLED:
+            self.thread_summarizer = ThreadSummarizer.from_settings(self.conversation_store)
+        
+        factories = {
+            "INQUIRY": InquiryResponderAgent,
+            "SUPPORT": lambda: SupportAgent(self.kb_index or config['knowledge_base_client']),
+            "MEETING": lambda: MeetingResponderAgent(config['calendar_credentials'], config.get('calendar_service')),
+            "FOLLOW_UP": lambda: FollowUpAgent(config['vector_db_client'], conversation_store=self.conversation_store)
         }
+        # Specialised workers only register, and so only ever load, their own categories
+        categories = config.get('categories') or settings.ORCHESTRATOR_CATEGORIES or list(factories)
+        unknown = set(categories) - set(factories)
+        if unknown:
+            raise ValueError(f"Unknown categories: {', '.join(sorted(unknown))}")
+        self.agent_mapping = LazyAgents({category: factories[category] for category in categories})
+        
+        # The local KB index is the only reader of the intake embedding; without it
+        # (or without the SUPPORT agent on this worker) emails are not embedded at all
+        self.embed_emails = (
+            settings.EMAIL_EMBEDDING_ENABLED
+            and self.kb_index is not None
+            and "SUPPORT" in categories
+        )
+        # Agents are built on first use (or by warm_up), never at construction
+        core_agents = {"intake": EmailIntakeAgent, "classification": ClassificationAgent}
+        if self.embed_emails:
+            core_agents["embedding"] = EmailEmbeddingAgent
+        self.core_agents = LazyAgents(core_agents)
+        
+        # Urgent mail overtakes the backlog for the expensive responder agents
+        self.scheduler = PriorityScheduler.from_settings() if settings.PRIORITY_SCHEDULING_ENABLED else None
+        
+        # Push notifications and retries redeliver the same message_id; run each once
+        self.deduplicator = MessageDeduplicator.from_settings() if settings.DEDUP_ENABLED else None
+        
+        # Stage outputs are checkpointed so a crash resumes an email instead of losing it
+        self.durable_worker = None
+        if settings.DURABLE_QUEUE_ENABLED:
+            self.durable_worker = DurableWorker(self, DurableQueue.from_settings())
+
+    @property
+    def intake_agent(self) -> EmailIntakeAgent:
+        return self.core_agents["intake"]
+
+    @property
+    def embedding_agent(self) -> EmailEmbeddingAgent:
+        return self.core_agents["embedding"]
+
+    @property
+    def classification_agent(self) -> ClassificationAgent:
+        return self.core_agents["classification"]
+
+    async def warm_up(self):
+        """Build every agent this worker handles in the background"""
+        await self.core_agents.warm_up()
+        await self.agent_mapping.warm_up()
 
     async def process_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        process = self._process_email if self.durable_worker is None else self.durable_worker.submit
+        if self.deduplicator is not None:
+            return await self.deduplicator.run(
+                email_data.get('message_id'),
+                lambda: process(email_data)
+            )
+        return await process(email_data)
+
+    async def _process_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # 1. Process incoming email
-            intake_result = await self.intake_agent.process(email_data)
+            intake_result = await self.run_intake(email_data)
             if intake_result['status'] != 'success':
                 return intake_result
                 
             # 2. Classify email
-            classification_result = await self.classification_agent.process(
-                intake_result['parsed_data']
-            )
+            classification_result = await self.run_classification(intake_result)
             if classification_result['status'] != 'success':
                 return classification_result
                 
-            # 3. Route to appropriate agent
-            category = classification_result['classification']['category']
-            agent = self.agent_mapping.get(category)
+            # 3. Route to appropriate agent and 4. process with it
+            return await self.respond(intake_result, classification_result)
             
+        except Exception as e:
+            return {'status': 'error', 'error': str(e)}
+
+    async def process_email_stream(self, email_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Like process_email, but yields the response as the agent generates it.
+
+        Emits a ``classification`` event, then ``delta`` events with response
+        text and a final ``done`` (or ``error``) event carrying the result.
+        Interactive streams bypass the priority scheduler and deduplicator.
+        """
+        try:
+            intake_result = await self.run_intake(email_data)
+            if intake_result['status'] != 'success':
+                yield {'type': 'error', **intake_result}
+                return
+                
+            classification_result = await self.run_classification(intake_result)
+            if classification_result['status'] != 'success':
+                yield {'type': 'error', **classification_result}
+                return
+            yield {'type': 'classification', 'classification': classification_result['classification']}
+            
+            category = self.route(classification_result)
+            agent = self.agent_mapping.get(category)
             if not agent:
-                return {
+                yield {
+                    'type': 'error',
                     'status': 'error',
                     'error': f"No agent found for category: {category}"
                 }
+                return
                 
-            # 4. Process with specific agent
-            result = await agent.process({
+            agent_input = {
                 **intake_result['parsed_data'],
                 **classification_result['classification']
-            })
-            
-            return result
-            
+            }
+            if hasattr(agent, 'process_stream'):
+                async for event in agent.process_stream(agent_input):
+                    yield event
+            else:
+                # Agents without an LLM step (e.g. meetings) answer in one piece
+                result = await agent.process(agent_input)
+                yield {'type': 'done' if result['status'] == 'success' else 'error', **result}
+                
         except Exception as e:
-            return {'status': 'error', 'error': str(e)} 
\ No newline at end of file
+            yield {'type': 'error', 'status': 'error', 'error': str(e)}
+
+    async def process_many(self, emails: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process a batch of emails concurrently through the staged pipeline"""
+        async with EmailPipeline(self) as pipeline:
+            if self.deduplicator is None:
+                return await pipeline.process_many(emails)
+
+            async def process(email_data: Dict[str, Any]) -> Dict[str, Any]:
+                return await (await pipeline.submit(email_data))
+
+            return await asyncio.gather(*(
+                self.deduplicator.run(email_data.get('message_id'), lambda email_data=email_data: process(email_data))
+                for email_data in emails
+            ))
+
+    async def respond(
+        self,
+        intake_result: Dict[str, Any],
+        classification_result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Stages 3 and 4, queued by priority when the scheduler is enabled"""
+        if self.scheduler is not None:
+            return await self.scheduler.run(
+                classification_result['classification'].get('priority'),
+                lambda: self.run_agent(intake_result, classification_result)
+            )
+        return await self.run_agent(intake_result, classification_result)
+
+    async def run_intake(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Stage 1: parse and clean the raw email, embed its body if used and file it in its thread"""
+        intake_result = await self.intake_agent.process(email_data)
+        if intake_result['status'] == 'success' and self.embed_emails:
+            # SupportAgent searches the local KB index with this vector instead of re-embedding
+            embedding_result = await self.embedding_agent.process(intake_result['parsed_data'])
+            if embedding_result['status'] == 'success':
+                intake_result['parsed_data']['embedding'] = embedding_result['embedding']
+        if intake_result['status'] == 'success' and self.conversation_store is not None:
+            message = await asyncio.get_running_loop().run_in_executor(
+                None,
+                self.conversation_store.append,
+                intake_result['parsed_data']
+            )
+            intake_result['parsed_data']['thread_id'] = message['thread_id']
+            intake_result['parsed_data']['message_seq'] = message['seq']
+            if self.thread_summarizer is not None:
+                self.thread_summarizer.schedule(message['thread_id'])
+        return intake_result
+
+    async def run_classification(self, intake_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Stage 2: classify the parsed email"""
+        return await self.classification_agent.process(intake_result['parsed_data'])
+
+    def route(self, classification_result: Dict[str, Any]) -> str:
+        """Stage 3: the category whose agent handles this email"""
+        return classification_result['classification']['category']
+
+    async def run_agent(
+        self,
+        intake_result: Dict[str, Any],
+        classification_result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Stage 4: generate the response with the category's agent"""
+        category = self.route(classification_result)
+        agent = self.agent_mapping.get(category)
+        
+        if not agent:
+            return {
+                'status': 'error',
+                'error': f"No agent found for category: {category}"
+            }
+            
+        return await agent.process({
+            **intake_result['parsed_data'],
+            **classification_result['classification']
+        }) 
\ No newline at end of file
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from config.settings import settings
+from monitoring.metrics import pipeline_items_processed, pipeline_queue_depth, pipeline_stage_duration
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkItem:
+    """One email travelling through the pipeline"""
+    email_data: Dict[str, Any]
+    future: asyncio.Future
+    intake_result: Optional[Dict[str, Any]] = None
+    classification_result: Optional[Dict[str, Any]] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    def resolve(self, result: Dict[str, Any]):
+        if not self.future.done():
+            self.future.set_result(result)
+
+
+class PipelineStage:
+    """A bounded queue drained by a fixed number of workers.
+
+    ``put`` blocks while the queue is full, so a slow stage pushes back on
+    whatever feeds it instead of buffering without limit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[WorkItem], Awaitable[None]],
+        concurrency: int = 1,
+        queue_size: int = 100,
+        queue: Optional[asyncio.Queue] = None
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.queue = queue if queue is not None else asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+
+    async def put(self, item: WorkItem):
+        await self.queue.put(item)
+        pipeline_queue_depth.labels(stage=self.name).set(self.queue.qsize())
+
+    def start(self):
+        self._workers = [
+            asyncio.get_running_loop().create_task(self._work())
+            for _ in range(self.concurrency)
+        ]
+
+    async def join(self):
+        await self.queue.join()
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self):
+        while True:
+            item = await self.queue.get()
+            pipeline_queue_depth.labels(stage=self.name).set(self.queue.qsize())
+            start = time.monotonic()
+            try:
+                await self.handler(item)
+                pipeline_items_processed.labels(stage=self.name, status='success').inc()
+            except Exception as e:
+                # One bad email must not take the worker down with it
+                logger.error(f"Pipeline stage {self.name} failed: {str(e)}")
+                pipeline_items_processed.labels(stage=self.name, status='error').inc()
+                item.resolve({'status': 'error', 'error': str(e), 'stage': self.name})
+            finally:
+                pipeline_stage_duration.labels(stage=self.name).observe(time.monotonic() - start)
+                self.queue.task_done()
+
+
+class EmailPipeline:
+    """Staged, concurrent version of ``EmailOrchestrator.process_email``.
+
+    Intake, classification and every responder agent run as separate
+    stages with their own bounded queue and worker count, so a batch takes
+    roughly as long as its slowest stage instead of the sum of all of them.
+    When the orchestrator has a priority scheduler, the responder agents
+    share its weighted-fair slots instead of per-category stages.
+    """
+
+    def __init__(
+        self,
+        orchestrator,
+        queue_size: Optional[int] = None,
+        concurrency: Optional[Dict[str, int]] = None
+    ):
+        self.orchestrator = orchestrator
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self.concurrency = {**settings.PIPELINE_CONCURRENCY, **(concurrency or {})}
+        self.stages: Dict[str, PipelineStage] = {}
+        self.scheduler = getattr(orchestrator, 'scheduler', None)
+
+    async def __aenter__(self) -> 'EmailPipeline':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        self.stages['intake'] = self._stage('intake', self._intake)
+        self.stages['classification'] = self._stage('classification', self._classify)
+        if self.scheduler is None:
+            for category in self.orchestrator.agent_mapping:
+                self.stages[category] = self._stage(category, self._respond)
+        for stage in self.stages.values():
+            stage.start()
+
+    async def close(self):
+        """Wait for in-flight emails to drain, then stop all workers"""
+        for stage in self.stages.values():
+            await stage.join()
+        if self.scheduler is not None:
+            await self.scheduler.join()
+        for stage in self.stages.values():
+            await stage.stop()
+
+    async def submit(self, email_data: Dict[str, Any]) -> asyncio.Future:
+        """Enqueue an email; blocks while the intake queue is full"""
+        item = WorkItem(email_data, asyncio.get_running_loop().create_future())
+        await self.stages['intake'].put(item)
+        return item.future
+
+    async def process_many(self, emails: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run every email through the pipeline, returning results in input order"""
+        futures = [await self.submit(email_data) for email_data in emails]
+        return await asyncio.gather(*futures)
+
+    def _stage(self, name: str, handler) -> PipelineStage:
+        return PipelineStage(
+            name,
+            handler,
+            concurrency=self.concurrency.get(name, self.concurrency.get('default', 1)),
+            queue_size=self.queue_size
+        )
+
+    async def _intake(self, item: WorkItem):
+        item.intake_result = await self.orchestrator.run_intake(item.email_data)
+        if item.intake_result['status'] != 'success':
+            item.resolve(item.intake_result)
+            return
+        await self.stages['classification'].put(item)
+
+    async def _classify(self, item: WorkItem):
+        item.classification_result = await self.orchestrator.run_classification(item.intake_result)
+        if item.classification_result['status'] != 'success':
+            item.resolve(item.classification_result)
+            return
+
+        category = self.orchestrator.route(item.classification_result)
+        if self.scheduler is not None and category in self.orchestrator.agent_mapping:
+            await self._schedule(item)
+            return
+
+        stage = self.stages.get(category)
+        if stage is None:
+            item.resolve({
+                'status': 'error',
+                'error': f"No agent found for category: {category}"
+            })
+            return
+        await stage.put(item)
+
+    async def _schedule(self, item: WorkItem):
+        """Hand the email to the priority scheduler without holding a classification worker"""
+        future = await self.scheduler.submit(
+            item.classification_result['classification'].get('priority'),
+            lambda: self.orchestrator.run_agent(item.intake_result, item.classification_result)
+        )
+
+        def resolve(done: asyncio.Future):
+            # exception() raises CancelledError on a cancelled future
+            if done.cancelled():
+                item.resolve({'status': 'error', 'error': "Responder job was cancelled", 'stage': 'responder'})
+            elif done.exception() is not None:
+                item.resolve({'status': 'error', 'error': str(done.exception()), 'stage': 'responder'})
+            else:
+                item.resolve(done.result())
+
+        future.add_done_callback(resolve)
+
+    async def _respond(self, item: WorkItem):
+        item.resolve(await self.orchestrator.run_agent(item.intake_result, item.classification_result))
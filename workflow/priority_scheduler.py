@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from config.settings import settings
+from monitoring.metrics import scheduler_queue_depth, scheduler_queue_latency
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LEVELS = ["LOW", "MEDIUM", "HIGH", "URGENT"]
+
+Job = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class _ScheduledJob:
+    priority: str
+    job: Job
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class PriorityScheduler:
+    """Weighted-fair scheduler for the expensive responder agents.
+
+    Each priority level has its own bounded FIFO. Levels share the worker
+    slots in proportion to their weights (smallest virtual time first), so
+    URGENT mail overtakes a backlog of newsletters without starving it:
+    any job waiting longer than ``max_wait_seconds`` is served next
+    regardless of weight. ``reservations`` keep a number of slots free
+    for a level and everything above it.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        weights: Optional[Dict[str, float]] = None,
+        reservations: Optional[Dict[str, int]] = None,
+        max_wait_seconds: float = 30.0,
+        queue_size: int = 100,
+        levels: List[str] = PRIORITY_LEVELS
+    ):
+        self.levels = levels
+        self.rank = {level: i for i, level in enumerate(levels)}
+        self.concurrency = concurrency
+        self.weights = {level: 1.0 for level in levels}
+        self.weights.update(weights or {})
+        self.reservations = {level: 0 for level in levels}
+        self.reservations.update(reservations or {})
+        if sum(self.reservations.values()) >= concurrency:
+            raise ValueError("Reservations must leave at least one shared slot")
+        self.max_wait_seconds = max_wait_seconds
+        self.queue_size = queue_size
+
+        self._queues: Dict[str, Deque[_ScheduledJob]] = {level: deque() for level in levels}
+        self._virtual_time = {level: 0.0 for level in levels}
+        self._active = {level: 0 for level in levels}
+        self._running: set = set()
+        self._changed: Optional[asyncio.Condition] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls) -> 'PriorityScheduler':
+        return cls(
+            concurrency=settings.SCHEDULER_CONCURRENCY,
+            weights=settings.SCHEDULER_PRIORITY_WEIGHTS,
+            reservations=settings.SCHEDULER_RESERVATIONS,
+            max_wait_seconds=settings.SCHEDULER_MAX_WAIT_SECONDS,
+            queue_size=settings.SCHEDULER_QUEUE_SIZE
+        )
+
+    async def submit(self, priority: Optional[str], job: Job) -> asyncio.Future:
+        """Queue ``job`` at ``priority``; blocks while that level's queue is full"""
+        self._ensure_started()
+        if priority not in self.rank:
+            priority = self.levels[0]
+        future = asyncio.get_running_loop().create_future()
+
+        async with self._changed:
+            await self._changed.wait_for(lambda: len(self._queues[priority]) < self.queue_size)
+            queue = self._queues[priority]
+            if not queue:
+                # A level returning from idle must not cash in credit from while it was empty
+                self._virtual_time[priority] = max(self._virtual_time[priority], self._current_virtual_time())
+            queue.append(_ScheduledJob(priority, job, future))
+            scheduler_queue_depth.labels(priority=priority).set(len(queue))
+            self._changed.notify_all()
+        return future
+
+    async def run(self, priority: Optional[str], job: Job) -> Any:
+        """Submit ``job`` and wait for its result"""
+        return await (await self.submit(priority, job))
+
+    async def join(self):
+        """Wait until every queued and running job has finished"""
+        if self._changed is None:
+            return
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self._running and not any(self._queues.values()))
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+    def depth(self) -> Dict[str, int]:
+        return {level: len(queue) for level, queue in self._queues.items()}
+
+    def _ensure_started(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._changed = asyncio.Condition()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._pick() is not None)
+                level = self._pick()
+                scheduled = self._queues[level].popleft()
+                self._virtual_time[level] += 1.0 / self.weights[level]
+                self._active[level] += 1
+                scheduler_queue_depth.labels(priority=level).set(len(self._queues[level]))
+                scheduler_queue_latency.labels(priority=level).observe(time.monotonic() - scheduled.enqueued_at)
+                task = asyncio.get_running_loop().create_task(self._execute(scheduled))
+                self._running.add(task)
+                self._changed.notify_all()
+
+    async def _execute(self, scheduled: _ScheduledJob):
+        try:
+            result = await scheduled.job()
+            if not scheduled.future.done():
+                scheduled.future.set_result(result)
+        except asyncio.CancelledError:
+            # Callers waiting on the job must not hang on a future that never resolves
+            scheduled.future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Scheduled {scheduled.priority} job failed: {str(e)}")
+            if not scheduled.future.done():
+                scheduled.future.set_exception(e)
+        finally:
+            async with self._changed:
+                self._active[scheduled.priority] -= 1
+                self._running.discard(asyncio.current_task())
+                self._changed.notify_all()
+
+    def _pick(self) -> Optional[str]:
+        """The level whose head job should start next, or None if nothing may start"""
+        eligible = [level for level in self.levels if self._queues[level] and self._has_slot(level)]
+        if not eligible:
+            return None
+
+        now = time.monotonic()
+        starving = [
+            level for level in eligible
+            if now - self._queues[level][0].enqueued_at >= self.max_wait_seconds
+        ]
+        if starving:
+            return min(starving, key=lambda level: self._queues[level][0].enqueued_at)
+
+        # Ties go to the more urgent level
+        return min(eligible, key=lambda level: (self._virtual_time[level], -self.rank[level]))
+
+    def _has_slot(self, level: str) -> bool:
+        busy = sum(self._active.values())
+        # Slots reserved for more urgent levels and not currently used by them
+        held_back = sum(
+            max(0, self.reservations[other] - self._active[other])
+            for other in self.levels
+            if self.rank[other] > self.rank[level]
+        )
+        return busy + held_back < self.concurrency
+
+    def _current_virtual_time(self) -> float:
+        backlogged = [self._virtual_time[level] for level in self.levels if self._queues[level]]
+        return min(backlogged) if backlogged else max(self._virtual_time.values())
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from config.settings import settings
+from ml_models.batching import iter_chunks
+from ml_models.llm_client import LLMClient, get_llm_client
+from monitoring.metrics import thread_summary_updates
+from workflow.conversation_store import ConversationStore
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadSummarizer:
+    """Keeps a rolling summary of each conversation thread, off the response path.
+
+    Everything but a thread's newest ``keep_recent`` messages is folded
+    into its summary: each update only sends the previous summary plus the
+    messages that have aged out of the recent window since, so the cost of
+    an update, like the follow-up prompt built from summary + recent
+    messages, does not grow with the thread. Updates run as background
+    tasks; a thread scheduled again while updating is re-run once after.
+    """
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        llm: Optional[LLMClient] = None,
+        keep_recent: int = 5,
+        max_tokens: int = 200,
+        batch_size: int = 10,
+        max_concurrency: int = 2,
+        max_message_chars: int = 2000
+    ):
+        self.store = store
+        self.llm = llm or get_llm_client()
+        self.keep_recent = keep_recent
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_message_chars = max_message_chars
+
+        self._running: Dict[str, asyncio.Task] = {}
+        self._dirty: Set[str] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_settings(cls, store: ConversationStore) -> 'ThreadSummarizer':
+        return cls(
+            store,
+            keep_recent=settings.FOLLOW_UP_RECENT_MESSAGES,
+            max_tokens=settings.THREAD_SUMMARY_MAX_TOKENS,
+            batch_size=settings.THREAD_SUMMARY_BATCH_SIZE,
+            max_concurrency=settings.THREAD_SUMMARY_CONCURRENCY
+        )
+
+    def schedule(self, thread_id: Optional[str]):
+        """Bring the thread's summary up to date in the background"""
+        if not thread_id:
+            return
+        if thread_id in self._running:
+            self._dirty.add(thread_id)
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._running[thread_id] = asyncio.get_running_loop().create_task(self._run(thread_id))
+
+    async def update(self, thread_id: str) -> bool:
+        """Fold newly aged-out messages into the summary; False if there were none"""
+        loop = asyncio.get_running_loop()
+        current = await loop.run_in_executor(None, self.store.summary, thread_id)
+        summary, covered_seq = (current['summary'], current['covered_seq']) if current else ('', 0)
+        pending = await loop.run_in_executor(None, self.store.unsummarized, thread_id, covered_seq, self.keep_recent)
+        if not pending:
+            return False
+
+        for batch in iter_chunks(pending, self.batch_size):
+            summary = (await self.llm.complete(
+                self._create_prompt(summary, batch),
+                max_tokens=self.max_tokens,
+                temperature=0.3,
+                model="deepseek-r1"
+            )).strip()
+        await loop.run_in_executor(
+            None,
+            self.store.save_summary,
+            thread_id,
+            summary,
+            max(message['seq'] for message in pending)
+        )
+        thread_summary_updates.labels(result='success').inc()
+        return True
+
+    async def join(self):
+        """Wait for every scheduled update to finish"""
+        while self._running:
+            await asyncio.gather(*list(self._running.values()), return_exceptions=True)
+
+    async def _run(self, thread_id: str):
+        try:
+            while True:
+                self._dirty.discard(thread_id)
+                async with self._semaphore:
+                    await self.update(thread_id)
+                if thread_id not in self._dirty:
+                    return
+        except Exception as e:
+            # The next message in the thread retries; follow-ups still get recent messages
+            thread_summary_updates.labels(result='error').inc()
+            logger.error(f"Error summarizing thread {thread_id}: {str(e)}")
+        finally:
+            self._running.pop(thread_id, None)
+
+    def _create_prompt(self, summary: str, messages: List[Dict[str, Any]]) -> str:
+        """Create prompt for folding messages into the running summary"""
+        new_messages = "\n".join([
+            f"[{message['timestamp']}] {message['sender']}: {message['content'][:self.max_message_chars]}"
+            for message in messages
+        ])
+
+        return f"""
+        Update the running summary of this customer conversation:
+
+        Current Summary:
+        {summary or "No summary yet."}
+
+        New Messages (in the order received):
+        {new_messages}
+
+        Requirements:
+        - Keep requests, commitments, dates and open items
+        - Drop greetings and repeated content
+        - Stay under {self.max_tokens} tokens
+
+        Updated Summary:
+        """